@@ -42,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'pulse.middleware.MetricsMiddleware',  # first, so it times the whole stack
+    'pulse.middleware.StageTimingMiddleware',  # Server-Timing header (pulse.timing)
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -80,6 +82,19 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # WAL: readers never wait for the writer, and a commit appends to
+            # the log instead of rewriting pages. NORMAL sync is safe in WAL
+            # mode against process crashes (a power cut may lose the last
+            # commits).
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+            'timeout': 20,  # seconds a writer waits for the lock (busy timeout)
+            # Take the write lock at BEGIN, so a transaction that read first
+            # cannot fail to upgrade its lock with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+        },
+        'CONN_MAX_AGE': 600,        # keep connections open across requests
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -125,6 +140,58 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# ML model loading (see pulse.registry)
+MODEL_EAGER_LOAD = False        # load at startup instead of on first request
+MODEL_MMAP = True               # memory-map model arrays, shared across workers
+MODEL_CACHE_DIR = BASE_DIR / 'model_cache'  # joblib copies used for mmap
+MODEL_STORE_DIR = BASE_DIR / 'model_store'  # versioned artifacts (train_models.py)
+MODEL_RELOAD_INTERVAL = 5       # seconds between checks for a new version; 0 disables
+MODEL_COMPACT_INFERENCE = True  # serve tree ensembles from flattened arrays (tree_ensemble.py)
+MODEL_COMPACT_MAX_ROWS = 64     # larger batches go to sklearn, which is faster there
+MODEL_INFERENCE_THREADS = 1     # n_jobs of served models; training uses --workers
+BULK_SCORE_CHUNK_ROWS = 5000    # rows per chunk of /api/predict/bulk/ and score_csv
+INFERENCE_EXECUTOR_WORKERS = 2  # threads running predictions for the async views
+INFERENCE_MAX_CONCURRENCY = 2   # predictions running at once per process (pulse.inference)
+INFERENCE_MAX_QUEUE = 16        # more may wait; beyond that requests get 503
+INFERENCE_RETRY_AFTER = 1       # Retry-After of those 503s, seconds
+
+# Per-client rate limits (see pulse.throttle): scope -> (requests per second, burst)
+RATE_LIMITS = {
+    'predict': (5, 20),
+    'predict_batch': (1, 5),
+    'predict_bulk': (0.1, 3),
+    'contact': (1 / 60, 5),
+    'letusknow': (1 / 60, 5),
+    'feedback': (1 / 60, 5),
+}
+RATE_LIMIT_MAX_CLIENTS = 100000  # buckets kept per process, least recently used dropped
+RATE_LIMIT_TRUSTED_PROXIES = 0  # proxies appending to X-Forwarded-For in front of Django
+
+# Dam table (see pulse.dams; filled by manage.py load_dams)
+DAMS_VERSION_CHECK_INTERVAL = 2  # seconds between checks of the table for changes
+
+# Suitability heatmap tiles (see suitability_tiles.py / pulse.tiles)
+TILES_DIR = BASE_DIR / 'tile_cache'  # score grids and rendered tiles
+TILES_GRID_STEP = 0.02          # degrees between scored grid points
+TILES_MIN_ZOOM = 5
+TILES_MAX_ZOOM = 12
+TILES_WORKERS = None            # scoring processes; None = one per CPU
+TILES_MAX_AGE = 3600            # Cache-Control max-age of tiles, seconds
+TILES_MAX_RENDERED = 20000      # rendered tiles kept on disk per set
+
+# Metrics served at /api/metrics (see pulse.metrics)
+METRICS_DIR = BASE_DIR / 'metrics'  # per-process snapshots; None = this process only
+METRICS_FLUSH_INTERVAL = 1      # seconds between snapshot writes
+
+# Server-Timing stage timers (see pulse.timing; switch with POST /api/debug/timings)
+STAGE_TIMING = {'enabled': False, 'sample_rate': 0.0}  # state until first switched
+STAGE_TIMING_CHECK_INTERVAL = 1  # seconds between re-reads of the shared switch
+STAGE_TIMING_BUFFER_SIZE = 200  # sampled breakdowns kept per process
+
+# Prediction cache (LRU + TTL in front of model inference, per process)
+PREDICTION_CACHE_SIZE = 4096    # entries per model; 0 disables the cache
+PREDICTION_CACHE_TTL = 3600     # seconds
+
 # CORS Settings
 CORS_ALLOW_ALL_ORIGINS = True  # For development only
 CORS_ALLOW_CREDENTIALS = True
@@ -145,6 +212,22 @@ EMAIL_HOST_PASSWORD = 'jbvt hvjb uvqz uzmx'  # App password for Gmail
 DEFAULT_FROM_EMAIL = 'PlanetPulse <officialplanetpulse@gmail.com>'
 SERVER_EMAIL = 'officialplanetpulse@gmail.com'
 
+# Email outbox (form-submission emails are delivered in the background)
+OUTBOX_AUTOSTART = True         # start worker threads on first queued email
+OUTBOX_WORKERS = 2              # worker threads per process
+OUTBOX_BATCH_SIZE = 50          # messages sent per reused SMTP connection
+OUTBOX_POLL_INTERVAL = 30       # seconds between scans for due retries
+OUTBOX_MAX_ATTEMPTS = 5         # attempts before a message is dead-lettered
+OUTBOX_RETRY_BACKOFF = 60       # seconds before first retry, doubled each time
+OUTBOX_LEASE_SECONDS = 300      # claim lease, so crashed workers' mail is retried
+
+# Write-behind buffer of form submissions (see pulse/writebehind.py)
+FORM_BUFFER = True              # batch form inserts (False: one transaction each)
+FORM_BUFFER_SIZE = 100          # write as soon as this many are pending
+FORM_BUFFER_INTERVAL = 0.2      # or once the oldest has waited this many seconds
+FORM_BUFFER_MAX_PENDING = 1000  # requests write the buffer themselves beyond this
+FORM_BUFFER_WAIT = True         # answer after the batch commits (False: once buffered)
+
 import logging
 
 LOGGING = {
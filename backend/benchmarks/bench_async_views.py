@@ -0,0 +1,264 @@
+"""
+Throughput and latency of the prediction, dams and form endpoints under
+concurrent clients, served through Django's ASGI handler (one event loop,
+async views) and through its WSGI handler (one thread per client, as a
+threaded WSGI server would).
+
+Both handlers are driven in-process, with no server or sockets: ASGI
+requests are asyncio tasks on one loop, WSGI requests are calls from N
+client threads. Forms write to a throwaway SQLite file database; emails
+stay in the outbox (nothing is delivered). Rate limits are off (every
+client has the same address); the inference gate is on, so predictions
+beyond INFERENCE_MAX_QUEUE waiting are refused with 503. Latencies are of
+the 200 responses; "refused" counts the 429/503s.
+
+Run from the backend directory:
+    python benchmarks/bench_async_views.py [--clients 1,10,100,200] [--requests 400]
+        [--max-queue N]
+
+Running it on an older commit gives the baseline for the sync views.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from suite import SAMPLE_SITE  # noqa: E402
+
+
+def cases():
+    counter = iter(range(10**9))
+
+    def predict():
+        # A fresh latitude every call keeps the prediction cache cold
+        site = dict(SAMPLE_SITE, latitude=20 + next(counter) * 1e-6)
+        return "POST", "/api/predict/", json.dumps(site).encode()
+
+    def dams_csv():
+        return "GET", "/api/dams_csv/", b""
+
+    def feedback():
+        payload = {"name": "Bench", "email": "bench@example.com", "feedback": "x"}
+        return "POST", "/api/feedback/submit/", json.dumps(payload).encode()
+
+    return {"predict": predict, "dams_csv": dams_csv, "feedback": feedback}
+
+
+# ------------------------------------------------------
+# Handlers
+# ------------------------------------------------------
+def asgi_runner():
+    from django.core.handlers.asgi import ASGIHandler
+
+    handler = ASGIHandler()
+
+    async def request(method, path, body):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [
+                (b"host", b"localhost"),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+            "client": ("127.0.0.1", 50000),
+            "server": ("localhost", 80),
+        }
+        sent = False
+        status = None
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # The client stays connected until the response is sent
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        await handler(scope, receive, send)
+        return status
+
+    def run(make_request, clients, total):
+        async def client(count, latencies, statuses):
+            for _ in range(count):
+                start = time.perf_counter()
+                statuses.append(await request(*make_request()))
+                latencies.append(time.perf_counter() - start)
+
+        async def main():
+            latencies, statuses = [], []
+            await asyncio.gather(
+                *(client(share, latencies, statuses) for share in split(total, clients))
+            )
+            return latencies, statuses
+
+        return asyncio.run(main())
+
+    return run
+
+
+def wsgi_runner():
+    from io import BytesIO
+
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+
+    handler = WSGIHandler()
+
+    def request(method, path, body):
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "SCRIPT_NAME": "",
+            "QUERY_STRING": "",
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "REMOTE_ADDR": "127.0.0.1",
+            "HTTP_HOST": "localhost",
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": BytesIO(body),
+            "wsgi.url_scheme": "http",
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+            "wsgi.version": (1, 0),
+        }
+        status = []
+        response = handler(environ, lambda s, headers, exc_info=None: status.append(s))
+        for _ in response:
+            pass
+        response.close()
+        return int(status[0].split()[0])
+
+    def run(make_request, clients, total):
+        lock = threading.Lock()
+        latencies, statuses = [], []
+        start_gate = threading.Barrier(clients)
+
+        def client(count):
+            start_gate.wait()
+            try:
+                for _ in range(count):
+                    with lock:
+                        args = make_request()
+                    start = time.perf_counter()
+                    status = request(*args)
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        statuses.append(status)
+                        latencies.append(elapsed)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            list(pool.map(client, split(total, clients)))
+        return latencies, statuses
+
+    return run
+
+
+def split(total, clients):
+    share, extra = divmod(total, clients)
+    return [share + (i < extra) for i in range(clients)]
+
+
+# ------------------------------------------------------
+# Runner
+# ------------------------------------------------------
+def report(mode, case, clients, elapsed, latencies, statuses):
+    ordered = sorted(t for t, s in zip(latencies, statuses) if s == 200) or [0.0]
+    refused = sum(status in (429, 503) for status in statuses)
+    errors = sum(status not in (200, 429, 503) for status in statuses)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{mode:<6}{case:<10}{clients:>8}{len(statuses) / elapsed:>10,.0f}"
+        f"{statistics.median(ordered) * 1e3:>10.1f}{p99 * 1e3:>10.1f}"
+        f"{refused:>9}{errors:>8}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", default="1,10,100,200")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--modes", default="asgi,wsgi")
+    parser.add_argument("--only", default="", help="comma-separated case names")
+    parser.add_argument(
+        "--max-queue", type=int, default=None, help="INFERENCE_MAX_QUEUE override"
+    )
+    args = parser.parse_args()
+
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    settings.OUTBOX_AUTOSTART = False
+    settings.RATE_LIMITS = {}
+    if args.max_queue is not None:
+        settings.INFERENCE_MAX_QUEUE = args.max_queue
+    tmp = tempfile.TemporaryDirectory()
+    settings.DATABASES["default"]["TEST"] = {"NAME": str(Path(tmp.name) / "bench.db")}
+    django.setup()
+    from django.db import connection
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    from pulse.dams import import_dams
+
+    import_dams()
+    runners = {"asgi": asgi_runner, "wsgi": wsgi_runner}
+    wanted = [c for c in args.only.split(",") if c]
+    levels = [int(n) for n in args.clients.split(",")]
+    print(
+        f"{'mode':<6}{'case':<10}{'clients':>8}{'req/s':>10}{'p50 ms':>10}"
+        f"{'p99 ms':>10}{'refused':>9}{'errors':>8}"
+    )
+    try:
+        for mode in args.modes.split(","):
+            run = runners[mode]()
+            for case, make_request in cases().items():
+                if wanted and case not in wanted:
+                    continue
+                run(make_request, 1, 5)  # warm up: model loads, dataset parse
+                for clients in levels:
+                    start = time.perf_counter()
+                    latencies, statuses = run(
+                        make_request, clients, max(args.requests, clients)
+                    )
+                    elapsed = time.perf_counter() - start
+                    report(mode, case, clients, elapsed, latencies, statuses)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
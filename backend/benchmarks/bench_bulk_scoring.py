@@ -0,0 +1,76 @@
+"""
+Throughput and peak memory of bulk CSV scoring (pulse.bulk) as the input
+grows. Each size is scored by ``manage.py score_csv`` in a fresh process so
+its peak RSS can be read back; with chunked reading the peak should stay
+roughly constant while the file grows.
+
+Synthetic inputs are made by resampling Dams_Gujarat.csv.
+
+Run from the backend directory:
+    python benchmarks/bench_bulk_scoring.py [row counts ...]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def synthetic_csv(directory, rows):
+    base = pd.read_csv(BASE_DIR / "Dams_Gujarat.csv")
+    path = Path(directory) / f"sites_{rows}.csv"
+    # Written in slices so building the input does not dominate memory either
+    for start in range(0, rows, 50_000):
+        part = base.sample(
+            n=min(50_000, rows - start), replace=True, random_state=start
+        )
+        part.to_csv(path, mode="a", header=start == 0, index=False)
+    return path
+
+
+def score(path, chunk_rows):
+    command = [
+        sys.executable,
+        str(BASE_DIR / "manage.py"),
+        "score_csv",
+        str(path),
+        "--output",
+        os.devnull,
+        "--chunk-rows",
+        str(chunk_rows),
+    ]
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        command, cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    if status:
+        raise RuntimeError(f"score_csv failed on {path}")
+    # ru_maxrss is in kilobytes on Linux
+    return elapsed, usage.ru_maxrss / 1024
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [10_000, 100_000, 300_000]
+    chunk_rows = 5000
+    print(f"{'rows':>9}{'file MB':>10}{'seconds':>10}{'rows/s':>11}{'peak RSS MB':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            path = synthetic_csv(tmp, rows)
+            elapsed, peak_mb = score(path, chunk_rows)
+            print(
+                f"{rows:>9,}{path.stat().st_size / 2**20:>10.1f}{elapsed:>10.2f}"
+                f"{rows / elapsed:>11,.0f}{peak_mb:>13.1f}"
+            )
+            path.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Throughput of dam_scoring: row-wise DataFrame.apply rules versus the
+vectorized scoring engine used by process_dam_data.
+
+Synthetic datasets are built by resampling the rows of Dams_Gujarat.csv.
+
+Run from the backend directory:
+    python benchmarks/bench_dam_scoring.py [rows ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import dam_scoring  # noqa: E402
+
+# Row-wise apply is only timed up to this size; beyond it, it takes minutes
+ROW_WISE_LIMIT = 100_000
+
+
+def synthetic_frame(n_rows, seed=42):
+    base = pd.read_csv(BASE_DIR / "Dams_Gujarat.csv")
+    return base.sample(n=n_rows, replace=True, random_state=seed).reset_index(
+        drop=True
+    )
+
+
+def row_wise(df):
+    df["Geological_Suitability_Score"] = df.apply(
+        dam_scoring.calculate_geological_suitability_score, axis=1
+    )
+    df["Climatic_Effect_Score"] = df.apply(
+        dam_scoring.calculate_climatic_effect_score, axis=1
+    )
+    df["Overall_Suitability_Score"] = df.apply(
+        dam_scoring.calculate_overall_suitability_score, axis=1
+    )
+    df["Geological_Category"] = df["Geological_Suitability_Score"].apply(
+        dam_scoring.get_category
+    )
+    df["Climatic_Category"] = df["Climatic_Effect_Score"].apply(
+        dam_scoring.get_category
+    )
+    df["Overall_Category"] = df["Overall_Suitability_Score"].apply(
+        dam_scoring.get_category
+    )
+    return df
+
+
+def timed(fn, df):
+    start = time.perf_counter()
+    fn(df.copy())
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [505, 10_000, 100_000, 1_000_000]
+    print(f"{'rows':>10}{'row-wise (s)':>15}{'vectorized (s)':>16}{'rows/s':>14}")
+    for n in sizes:
+        df = synthetic_frame(n)
+        before = timed(row_wise, df) if n <= ROW_WISE_LIMIT else float("nan")
+        after = timed(dam_scoring.process_dam_data, df)
+        print(f"{n:>10}{before:>15.3f}{after:>16.4f}{n / after:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Per-request latency of predict_suitability feature assembly: the previous
+pandas path (mapping dict + two DataFrame.reindex calls) versus the
+precompiled NumPy FeatureRowBuilder, and the PipelineRowBuilder that also
+applies the saved feature pipeline (target encodings + derived columns).
+
+Run from the backend directory:
+    python benchmarks/bench_feature_rows.py [iterations]
+"""
+
+import os
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from feature_pipeline import FeaturePipeline  # noqa: E402
+from pulse.features import (  # noqa: E402
+    FeatureRowBuilder,
+    PipelineRowBuilder,
+    map_input_features,
+)
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+SITE = {
+    "latitude": 22.4066,
+    "longitude": 73.38,
+    "elevation": 66.0,
+    "damType": "Earthen",
+    "length": 4390.0,
+    "maxHeight": 17.07,
+    "slope": 3.6036,
+    "seismicZone": "3",
+    "mainSoilType": "Vertisols",
+    "secondarySoilType": "Cambisols",
+    "rainfall2020": 1197.1,
+    "rainfall2021": 1131.9,
+    "rainfall2022": 1055.2,
+    "rainfall2023": 1143.2,
+    "rainfall2024": 1606.7,
+    "rainfall5YearAvg": 1226.82,
+    "rainfallStdDev5yr": 218.31,
+    "maxAnnualRainfall": 1606.7,
+    "minAnnualRainfall": 1055.2,
+    "avgTemperature5yr": 27.19,
+    "maxTemperatureLast5yr": 39.26,
+    "temperatureStdDev5yr": 5.01,
+    "heatwaveDaysPerYear": 0,
+    "ensoImpactIndex": 0.0,
+    "climateVulnerabilityIndex": 0.177,
+    "ndvi2025": 0.88,
+    "riverFlowRate": 31.30,
+    "riverDistance": 0.0,
+}
+
+
+def legacy_rows(data, geo_features, clim_features):
+    mapped = map_input_features(data)
+    geo_df = pd.DataFrame([mapped]).reindex(columns=geo_features, fill_value=0)
+    clim_df = pd.DataFrame([mapped]).reindex(columns=clim_features, fill_value=0)
+    return geo_df, clim_df
+
+
+def per_call_us(fn, iterations):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    geo = joblib.load(os.path.join(BASE_DIR, "geological_model.pkl"))
+    clim = joblib.load(os.path.join(BASE_DIR, "climatic_model.pkl"))
+    geo_builder = FeatureRowBuilder(geo["features"])
+    clim_builder = FeatureRowBuilder(clim["features"])
+    geo_pipeline = PipelineRowBuilder(FeaturePipeline.from_state(geo["pipeline"]))
+    clim_pipeline = PipelineRowBuilder(FeaturePipeline.from_state(clim["pipeline"]))
+
+    def legacy_assembly():
+        legacy_rows(SITE, geo["features"], clim["features"])
+
+    def builder_assembly():
+        geo_builder.build_row(SITE)
+        clim_builder.build_row(SITE)
+
+    def pipeline_assembly():
+        geo_pipeline.build_row(SITE)
+        clim_pipeline.build_row(SITE)
+
+    def legacy_request():
+        geo_df, clim_df = legacy_rows(SITE, geo["features"], clim["features"])
+        geo["model"].predict(geo_df)
+        clim["model"].predict(clim_df)
+
+    def builder_request():
+        geo["model"].predict(geo_builder.build_row(SITE))
+        clim["model"].predict(clim_builder.build_row(SITE))
+
+    print(f"{'stage':<28}{'before (us)':>14}{'after (us)':>14}{'speedup':>10}")
+    for label, before, after in [
+        ("feature assembly", legacy_assembly, builder_assembly),
+        ("assembly + both predicts", legacy_request, builder_request),
+        ("feature pipeline assembly", legacy_assembly, pipeline_assembly),
+    ]:
+        b = per_call_us(before, iterations)
+        a = per_call_us(after, iterations)
+        print(f"{label:<28}{b:>14.1f}{a:>14.1f}{b / a:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
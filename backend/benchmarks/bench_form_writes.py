@@ -0,0 +1,200 @@
+"""
+Form submissions from concurrent writers sharing one SQLite file, as the
+worker processes of a server would.
+
+Each run forks --processes workers, each posting --requests submissions
+(Contact, LetUsKnow and Feedback in turn) through Django's WSGI handler
+from N client threads, against a freshly migrated database file. Emails
+stay in the outbox (nothing is delivered) and rate limits are off.
+
+Configurations:
+    default   SQLite defaults (rollback journal, 5 s busy timeout, deferred
+              transactions), a connection per request, a transaction per
+              submission: the settings before the write-behind buffer
+    tuned     the DATABASES options of settings.py (WAL, busy timeout,
+              immediate transactions) and persistent connections
+    group     tuned plus the write-behind buffer (FORM_BUFFER), each request
+              waiting for its batch to commit: the default settings
+    buffered  group, answering as soon as the submission is buffered
+              (FORM_BUFFER_WAIT = False)
+
+req/s counts every request over the time until all workers have exited
+(buffered rows included); "errors" are non-200 responses (mostly "database
+is locked") and "saved" the rows found in the file afterwards.
+
+Run from the backend directory:
+    python benchmarks/bench_form_writes.py [--processes 4] [--clients 1,4,16]
+        [--requests 200] [--configs default,tuned,buffered,group]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from bench_async_views import wsgi_runner  # noqa: E402
+
+FORM_TABLES = ["pulse_contact", "pulse_letusknow", "pulse_feedback"]
+
+
+def configs():
+    tuned = {
+        "OPTIONS": dict(settings.DATABASES["default"].get("OPTIONS", {})),
+        "CONN_MAX_AGE": settings.DATABASES["default"].get("CONN_MAX_AGE", 0),
+    }
+    return {
+        "default": ({"OPTIONS": {}, "CONN_MAX_AGE": 0}, {"FORM_BUFFER": False}),
+        "tuned": (tuned, {"FORM_BUFFER": False}),
+        "buffered": (tuned, {"FORM_BUFFER": True, "FORM_BUFFER_WAIT": False}),
+        "group": (tuned, {"FORM_BUFFER": True, "FORM_BUFFER_WAIT": True}),
+    }
+
+
+def form_requests():
+    forms = [
+        ("/api/contact/submit/", {"subject": "Bench", "message": "x"}),
+        ("/api/letusknow/submit/", {"organization": "Bench Dam", "message": "x"}),
+        ("/api/feedback/submit/", {"feedback": "x"}),
+    ]
+    counter = iter(range(10**9))
+
+    def make_request():
+        path, fields = forms[next(counter) % len(forms)]
+        payload = dict(fields, name="Bench", email="bench@example.com")
+        return "POST", path, json.dumps(payload).encode()
+
+    return make_request
+
+
+# ------------------------------------------------------
+# Worker process
+# ------------------------------------------------------
+def worker(database, overrides, clients, total, results):
+    from django.db import connections
+
+    from pulse.writebehind import form_buffer
+
+    # Connections are opened lazily from this (shared) settings dict
+    connections.databases["default"].update(database)
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    run = wsgi_runner()
+    # Warm up (URL resolver, views) with a request that writes nothing
+    run(lambda: ("POST", "/api/feedback/submit/", b"{"), 1, 1)
+    latencies, statuses = run(form_requests(), clients, total)
+    # multiprocessing exits without atexit handlers: flush as they would
+    form_buffer.close()
+    connections.close_all()
+    results.put((latencies, statuses))
+
+
+def run(template, database, overrides, processes, clients, total):
+    tmp = tempfile.mkdtemp()
+    try:
+        path = Path(tmp) / "forms.db"
+        shutil.copy(template, path)
+        # The journal mode persists in the file: switch it once, as a long
+        # running database would have, not in a race between the workers
+        init_command = database["OPTIONS"].get("init_command", "")
+        with sqlite3.connect(path) as db:
+            for command in init_command.split(";"):
+                if "journal_mode" in command:
+                    db.execute(command)
+        database = dict(database, NAME=str(path))
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(
+                target=worker, args=(database, overrides, clients, total, results)
+            )
+            for _ in range(processes)
+        ]
+        start = time.perf_counter()
+        for process in workers:
+            process.start()
+        collected = [results.get() for _ in workers]
+        for process in workers:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        with sqlite3.connect(path) as db:
+            saved = sum(
+                db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in FORM_TABLES
+            )
+        latencies = [t for lat, _ in collected for t in lat]
+        statuses = [s for _, stat in collected for s in stat]
+        return elapsed, latencies, statuses, saved
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def report(config, clients, elapsed, latencies, statuses, saved):
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    errors = sum(status != 200 for status in statuses)
+    print(
+        f"{config:<10}{clients:>8}{len(statuses) / elapsed:>10,.0f}"
+        f"{statistics.median(ordered) * 1e3:>10.1f}{p99 * 1e3:>10.1f}"
+        f"{errors:>8}{saved:>8}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--clients", default="1,4,16", help="threads per process")
+    parser.add_argument("--requests", type=int, default=200, help="per process")
+    parser.add_argument("--configs", default="default,tuned,buffered,group")
+    args = parser.parse_args()
+
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    settings.OUTBOX_AUTOSTART = False
+    settings.RATE_LIMITS = {}
+    available = configs()
+    tmp = tempfile.TemporaryDirectory()
+    template = Path(tmp.name) / "template.db"
+    settings.DATABASES["default"].update(NAME=str(template), OPTIONS={}, CONN_MAX_AGE=0)
+    django.setup()
+    from django.core.management import call_command
+    from django.db import connections
+
+    call_command("migrate", verbosity=0)
+    connections.close_all()  # nothing open is inherited by the workers
+
+    multiprocessing.set_start_method("fork")
+    print(
+        f"{'config':<10}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+        f"{'errors':>8}{'saved':>8}"
+    )
+    try:
+        for name in args.configs.split(","):
+            database, overrides = available[name]
+            for clients in [int(n) for n in args.clients.split(",")]:
+                total = max(args.requests, clients)
+                report(
+                    name,
+                    args.processes * clients,
+                    *run(template, database, overrides, args.processes, clients, total),
+                )
+    finally:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Model load time and per-process memory: plain pickle load versus the
+registry's memory-mapped joblib copies.
+
+Each mode runs in a fresh subprocess so import and load costs are measured
+cold. PSS (proportional set size, Linux only) shows how much of the RSS is
+private to the process once mapped pages are shared between workers.
+
+Run from the backend directory:
+    python benchmarks/bench_model_loading.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import json, os, sys, time
+sys.path.insert(0, {base!r})
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+from pulse.registry import ModelRegistry, current_rss_bytes
+import sklearn.ensemble  # keep library import cost out of the load timing
+
+def pss_bytes():
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+
+before = current_rss_bytes()
+start = time.perf_counter()
+registry = ModelRegistry(mmap={mmap})
+registry.load_all()
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "load_seconds": elapsed,
+    "rss_delta_mb": (current_rss_bytes() - before) / 2**20,
+    "pss_mb": (pss_bytes() or 0) / 2**20,
+}}))
+"""
+
+
+def run(mmap):
+    code = CHILD.format(base=str(BASE_DIR), mmap=mmap)
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+        env=dict(os.environ, PYTHONWARNINGS="ignore"),
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    run(True)  # build the memory-mapped copies once
+    print(f"{'mode':<10}{'load (s)':>10}{'RSS delta (MB)':>16}{'PSS (MB)':>10}")
+    for label, mmap in [("pickle", False), ("mmap", True)]:
+        r = run(mmap)
+        print(
+            f"{label:<10}{r['load_seconds']:>10.3f}"
+            f"{r['rss_delta_mb']:>16.1f}{r['pss_mb']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Rainfall-derived features in load_and_prepare_data: the per-row
+DataFrame.apply + scipy.stats.linregress trend versus the closed-form
+vectorized slope and batched NumPy columns (train_models.add_derived_features).
+
+Synthetic datasets are built by resampling the rainfall / river columns of
+Dams_Gujarat.csv.
+
+Run from the backend directory:
+    python benchmarks/bench_rainfall_features.py [rows ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import train_models  # noqa: E402
+
+RAINFALL_COLS = [f"Rainfall_{year}" for year in range(2020, 2025)]
+RIVER_COLS = ["RiverFlowRate(m/day)", "RiverDistance(km)", "Rainfall_5yr_Avg"]
+# The per-row path is only timed up to this size; beyond it, it takes minutes
+ROW_WISE_LIMIT = 100_000
+
+
+def synthetic_frame(n_rows, seed=42):
+    base = pd.read_csv(BASE_DIR / "Dams_Gujarat.csv", usecols=RAINFALL_COLS + RIVER_COLS)
+    return base.sample(n=n_rows, replace=True, random_state=seed).reset_index(
+        drop=True
+    )
+
+
+def row_wise(df):
+    df["Rainfall_Mean"] = df[RAINFALL_COLS].mean(axis=1)
+    df["Rainfall_StdDev"] = df[RAINFALL_COLS].std(axis=1)
+    df["Rainfall_Range"] = df[RAINFALL_COLS].max(axis=1) - df[RAINFALL_COLS].min(axis=1)
+
+    def calc_trend(row):
+        y = row[RAINFALL_COLS].values.astype(float)
+        if len(y) < 2 or np.all(y == y[0]):
+            return 0.0
+        slope = stats.linregress(np.arange(len(y)), y).slope
+        return float(slope) if not np.isnan(slope) else 0.0
+
+    df["Rainfall_Trend"] = df.apply(calc_trend, axis=1)
+    flow = df["RiverFlowRate(m/day)"].fillna(df["RiverFlowRate(m/day)"].median())
+    df["Flow_Rainfall_Ratio"] = flow / (df["Rainfall_5yr_Avg"] + 1e-6)
+    impact = (flow / df["RiverDistance(km)"]).replace([np.inf, -np.inf], np.nan)
+    df["River_Impact_Score"] = impact.fillna(impact.median())
+    return df
+
+
+def timed(fn, df):
+    start = time.perf_counter()
+    fn(df.copy())
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [505, 10_000, 100_000, 1_000_000]
+    print(f"{'rows':>10}{'row-wise (s)':>15}{'vectorized (s)':>16}{'rows/s':>14}")
+    for n in sizes:
+        df = synthetic_frame(n)
+        before = timed(row_wise, df) if n <= ROW_WISE_LIMIT else float("nan")
+        after = timed(train_models.add_derived_features, df)
+        print(f"{n:>10}{before:>15.3f}{after:>16.4f}{n / after:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Per-call model latency: sklearn's predict versus the flattened-array
+evaluator in tree_ensemble.py, for single rows and small batches.
+
+Uses the trained geological (HistGradientBoosting) and climatic
+(ExtraTrees, fitted with n_jobs=-1) pickles as they are stored.
+
+Run from the backend directory:
+    python benchmarks/bench_tree_inference.py [batch sizes ...]
+"""
+
+import statistics
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from tree_ensemble import export_ensemble  # noqa: E402
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+def median_us(fn, iterations=50):
+    fn()
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(times)
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [1, 10, 100, 1000]
+    rng = np.random.default_rng(0)
+    print(
+        f"{'model':<12}{'rows':>6}{'sklearn (us)':>15}{'compact (us)':>15}{'speedup':>9}"
+    )
+    for name in ("geological", "climatic"):
+        model = joblib.load(BASE_DIR / f"{name}_model.pkl")["model"]
+        compact = export_ensemble(model)
+        for n in sizes:
+            X = rng.normal(size=(n, compact.n_features)) * 100
+            before = median_us(lambda: model.predict(X))
+            after = median_us(lambda: compact.predict(X))
+            print(
+                f"{name:<12}{n:>6}{before:>15,.1f}{after:>15,.1f}{before / after:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
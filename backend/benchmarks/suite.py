@@ -0,0 +1,339 @@
+"""
+Offline microbenchmark suite for the backend hot paths.
+
+Everything runs in-process: views through Django's test client against a
+throwaway in-memory test database with the locmem email backend, and the
+data pipeline functions as direct calls on synthetic datasets made by
+resampling Dams_Gujarat.csv. No server or network is needed.
+
+Results are written as JSON (one record per case with per-call timings in
+microseconds) so runs from different commits can be compared:
+
+    python benchmarks/suite.py --output before.json
+    git checkout <other commit>
+    python benchmarks/suite.py --output after.json --compare before.json
+
+Run from the backend directory. ``--only`` takes a comma-separated list of
+case-name prefixes; ``--scales`` sets the dataset sizes as multiples of the
+505-row CSV.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+SAMPLE_SITE = {
+    "latitude": 22.4066,
+    "longitude": 73.38,
+    "elevation": 66.0,
+    "damType": "Earthen",
+    "length": 4390.0,
+    "maxHeight": 17.07,
+    "slope": 3.6036,
+    "seismicZone": "3",
+    "mainSoilType": "Vertisols",
+    "secondarySoilType": "Cambisols",
+    "rainfall2020": 1197.1,
+    "rainfall2021": 1131.9,
+    "rainfall2022": 1055.2,
+    "rainfall2023": 1143.2,
+    "rainfall2024": 1606.7,
+    "rainfall5YearAvg": 1226.82,
+    "rainfallStdDev5yr": 218.31,
+    "maxAnnualRainfall": 1606.7,
+    "minAnnualRainfall": 1055.2,
+    "avgTemperature5yr": 27.19,
+    "maxTemperatureLast5yr": 39.26,
+    "temperatureStdDev5yr": 5.01,
+    "heatwaveDaysPerYear": 0,
+    "ensoImpactIndex": 0.0,
+    "climateVulnerabilityIndex": 0.177,
+    "ndvi2025": 0.88,
+    "riverFlowRate": 31.30,
+    "riverDistance": 0.0,
+}
+
+FORMS = [
+    ("contact", "/api/contact/submit/", {"subject": "Hi", "message": "Hello"}),
+    ("letusknow", "/api/letusknow/submit/", {"organization": "Dam", "message": "x"}),
+    ("feedback", "/api/feedback/submit/", {"feedback": "Great work"}),
+]
+
+
+# ------------------------------------------------------
+# Harness
+# ------------------------------------------------------
+def measure(fn, iterations, warmup=2):
+    """Per-call wall times in microseconds"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1e6)
+    return times
+
+
+def summarize(name, times, **extra):
+    ordered = sorted(times)
+    return dict(
+        name=name,
+        iterations=len(times),
+        min_us=round(ordered[0], 2),
+        median_us=round(statistics.median(ordered), 2),
+        mean_us=round(statistics.fmean(ordered), 2),
+        p95_us=round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        **extra,
+    )
+
+
+def environment():
+    import numpy
+    import pandas
+    import sklearn
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "django": django.get_version(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+# ------------------------------------------------------
+# Cases
+# ------------------------------------------------------
+def view_cases(client):
+    from pulse.views import prediction_cache
+
+    def post(url, payload):
+        response = client.post(
+            url, json.dumps(payload), content_type="application/json"
+        )
+        assert response.status_code == 200, (url, response.status_code)
+
+    counter = iter(range(10**9))
+
+    def predict_unique():
+        # A fresh latitude every call keeps the prediction cache cold
+        post("/api/predict/", dict(SAMPLE_SITE, latitude=20 + next(counter) * 1e-6))
+
+    yield "predict_suitability", predict_unique, {}
+
+    prediction_cache.clear()
+    yield "predict_suitability_cached", lambda: post("/api/predict/", SAMPLE_SITE), {}
+
+    batch = [dict(SAMPLE_SITE, latitude=20 + i * 0.01) for i in range(100)]
+    yield "predict_batch_100", lambda: post("/api/predict/batch/", batch), {
+        "sites": 100
+    }
+
+    def dams_csv():
+        response = client.get("/api/dams_csv/")
+        assert response.status_code == 200
+
+    yield "dams_csv", dams_csv, {}
+
+    def dams_csv_columnar_gzip():
+        response = client.get(
+            "/api/dams_csv/", {"format": "columnar"}, HTTP_ACCEPT_ENCODING="gzip"
+        )
+        assert response["Content-Encoding"] == "gzip"
+
+    yield "dams_csv_columnar_gzip", dams_csv_columnar_gzip, {}
+
+    etag = client.get("/api/dams_csv/")["ETag"]
+
+    def dams_csv_304():
+        response = client.get("/api/dams_csv/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+    yield "dams_csv_not_modified", dams_csv_304, {}
+
+    def dams_csv_filtered():
+        # A district map view: one district, the fields it draws, best first
+        response = client.get(
+            "/api/dams_csv/",
+            {
+                "district": "Kachchh",
+                "min_overall_score": 60,
+                "fields": "Name,Latitude,Longitude,Overall_Suitability_Score",
+                "sort": "-Overall_Suitability_Score",
+            },
+        )
+        assert response.status_code == 200
+
+    yield "dams_csv_filtered", dams_csv_filtered, {}
+
+    for label, url, fields in FORMS:
+        payload = dict(fields, name="Bench", email="bench@example.com")
+        yield f"form_{label}", (lambda u=url, p=payload: post(u, p)), {}
+
+    from django.core import mail
+    from pulse.outbox import deliver_pending
+
+    def deliver():
+        deliver_pending()
+        mail.outbox = []
+
+    # Each form above queued two emails per call; drain them in one go
+    yield "outbox_deliver_backlog", deliver, {"iterations_override": 1}
+
+
+def synthetic_csv(directory, scale):
+    import pandas as pd
+
+    base = pd.read_csv(BASE_DIR / "Dams_Gujarat.csv")
+    df = base.sample(n=len(base) * scale, replace=True, random_state=scale)
+    path = Path(directory) / f"dams_x{scale}.csv"
+    df.to_csv(path, index=False)
+    return path, len(df)
+
+
+def pipeline_cases(directory, scales):
+    import pandas as pd
+
+    import dam_scoring
+    import train_models
+
+    for scale in scales:
+        path, rows = synthetic_csv(directory, scale)
+        df = pd.read_csv(path)
+        yield f"process_dam_data_x{scale}", (
+            lambda d=df: dam_scoring.process_dam_data(d.copy())
+        ), {"rows": rows}
+        yield f"load_and_prepare_data_x{scale}", (
+            lambda p=path: train_models.load_and_prepare_data(p)
+        ), {"rows": rows}
+
+
+# ------------------------------------------------------
+# Runner
+# ------------------------------------------------------
+def logging_disable():
+    import logging
+
+    logging.disable(logging.CRITICAL)
+
+
+def run(args):
+    from django.test.utils import (
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    settings.OUTBOX_AUTOSTART = False
+    settings.RATE_LIMITS = {}  # every case comes from one client address
+    logging_disable()
+    setup_test_environment()
+    from django.db import connection
+    from django.test import Client
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    from pulse.dams import import_dams
+
+    import_dams()
+    wanted = [p for p in args.only.split(",") if p] if args.only else None
+    results = []
+
+    def record(name, fn, extra):
+        if wanted and not any(name.startswith(p) for p in wanted):
+            return
+        iterations = extra.pop("iterations_override", None) or args.iterations
+        if "rows" in extra:
+            iterations = max(1, min(iterations, args.pipeline_iterations))
+        result = summarize(
+            name, measure(fn, iterations, warmup=0 if iterations == 1 else 2), **extra
+        )
+        results.append(result)
+        print(
+            f"{name:<34}{result['median_us']:>14,.1f} us"
+            f"{result['p95_us']:>14,.1f} us p95",
+            file=sys.stderr,
+        )
+
+    try:
+        client = Client()
+        for name, fn, extra in view_cases(client):
+            record(name, fn, extra)
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, fn, extra in pipeline_cases(tmp, args.scales):
+                record(name, fn, extra)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    return {"environment": environment(), "results": results}
+
+
+def compare(current, baseline_path):
+    baseline = {
+        r["name"]: r for r in json.loads(Path(baseline_path).read_text())["results"]
+    }
+    print(f"\n{'case':<34}{'baseline':>14}{'current':>14}{'change':>10}")
+    for result in current["results"]:
+        before = baseline.get(result["name"])
+        if not before:
+            continue
+        ratio = result["median_us"] / before["median_us"]
+        print(
+            f"{result['name']:<34}{before['median_us']:>14,.1f}"
+            f"{result['median_us']:>14,.1f}{(ratio - 1) * 100:>+9.1f}%"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--pipeline-iterations", type=int, default=3)
+    parser.add_argument(
+        "--scales",
+        type=lambda s: [int(x) for x in s.split(",")],
+        default=[1, 20],
+    )
+    parser.add_argument("--only", default="")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    args = parser.parse_args()
+
+    django.setup()
+    report = run(args)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload)
+    else:
+        print(payload)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
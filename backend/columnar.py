@@ -0,0 +1,213 @@
+"""
+Typed binary columnar cache for CSV datasets such as Dams_Gujarat.csv.
+
+The CSV is parsed once with pandas and written as one ``.npy`` file per
+column: numeric columns keep their dtype, string columns are stored as int32
+codes into a dictionary of distinct values (-1 marks a missing value). Later
+readers memory-map the arrays instead of re-parsing text, so opening the
+dataset costs a stat plus a small JSON read regardless of its size.
+
+Layout, next to the CSV:
+
+    columnar_cache/<csv stem>/current.json   pointer to the active version
+    columnar_cache/<csv stem>/<sha256[:16]>/  manifest.json + <i>.npy files
+
+The cache is rebuilt whenever the CSV's content hash changes; a matching
+(size, mtime) short-circuits the hash check.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR_NAME = "columnar_cache"
+FORMAT_VERSION = 1
+# Columns smaller than this are read into memory; mapping them costs more
+MMAP_MIN_BYTES = 1 << 20
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json(path, data):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _cache_root(csv_path, cache_dir=None):
+    csv_path = Path(csv_path)
+    return Path(cache_dir or csv_path.parent / CACHE_DIR_NAME) / csv_path.stem
+
+
+def build_columnar(csv_path, out_dir, source_sha256):
+    """Parse csv_path with pandas and write its columns into out_dir"""
+    # round_trip parsing gives the same floats as Python's float()
+    df = pd.read_csv(csv_path, float_precision="round_trip")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        entry = {"name": name, "file": f"{i}.npy"}
+        if series.dtype.kind in "biuf":
+            entry["kind"] = "numeric"
+            values = series.to_numpy()
+        else:
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            entry["kind"] = "string"
+            entry["dictionary"] = [str(u) for u in uniques]
+            values = codes.astype(np.int32)
+        np.save(out_dir / entry["file"], values)
+        entry["dtype"] = str(series.dtype)
+        entry["nbytes"] = int(values.nbytes)
+        columns.append(entry)
+    _write_json(
+        out_dir / "manifest.json",
+        {
+            "format": FORMAT_VERSION,
+            "source_sha256": source_sha256,
+            "rows": len(df),
+            "columns": columns,
+        },
+    )
+
+
+def ensure_columnar(csv_path, cache_dir=None):
+    """
+    Return the directory holding an up-to-date columnar copy of csv_path,
+    building it if the CSV changed. Safe to call from concurrent processes.
+    """
+    csv_path = Path(csv_path)
+    root = _cache_root(csv_path, cache_dir)
+    pointer_path = root / "current.json"
+    stat = os.stat(csv_path)
+    signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    try:
+        pointer = json.loads(pointer_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        pointer = None
+    if (
+        pointer
+        and pointer.get("format") == FORMAT_VERSION
+        and all(pointer.get(k) == v for k, v in signature.items())
+        and (root / pointer["dir"] / "manifest.json").exists()
+    ):
+        return root / pointer["dir"]
+
+    source_sha256 = _sha256(csv_path)
+    version_dir = root / source_sha256[:16]
+    if not (version_dir / "manifest.json").exists():
+        root.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(dir=root, prefix=".build-"))
+        try:
+            build_columnar(csv_path, tmp_dir, source_sha256)
+            try:
+                os.rename(tmp_dir, version_dir)
+            except OSError:
+                # Another process published the same version first
+                if not (version_dir / "manifest.json").exists():
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    _write_json(
+        pointer_path,
+        dict(signature, format=FORMAT_VERSION, dir=version_dir.name),
+    )
+    for stale in root.iterdir():
+        if stale.is_dir() and stale != version_dir and not stale.name.startswith("."):
+            shutil.rmtree(stale, ignore_errors=True)
+    return version_dir
+
+
+class ColumnarTable:
+    """Read access to one columnar version directory"""
+
+    def __init__(self, version_dir, mmap=True):
+        self.path = Path(version_dir)
+        self.manifest = json.loads(
+            (self.path / "manifest.json").read_text(encoding="utf-8")
+        )
+        self.mmap_mode = "r" if mmap else None
+        self._columns = {c["name"]: c for c in self.manifest["columns"]}
+
+    @property
+    def version(self):
+        return self.manifest["source_sha256"]
+
+    @property
+    def num_rows(self):
+        return self.manifest["rows"]
+
+    @property
+    def names(self):
+        return list(self._columns)
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def kind(self, name):
+        return self._columns[name]["kind"]
+
+    def raw(self, name):
+        """Stored array: values for numeric columns, codes for string columns"""
+        entry = self._columns[name]
+        mmap_mode = self.mmap_mode if entry["nbytes"] >= MMAP_MIN_BYTES else None
+        return np.load(self.path / entry["file"], mmap_mode=mmap_mode)
+
+    def dictionary(self, name):
+        return self._columns[name].get("dictionary")
+
+    def column(self, name):
+        """Decoded column: numeric array, or object array with NaN for missing"""
+        entry = self._columns[name]
+        data = self.raw(name)
+        if entry["kind"] == "numeric":
+            return data
+        lookup = np.array(entry["dictionary"] + [np.nan], dtype=object)
+        # code -1 (missing) indexes the trailing NaN
+        return lookup[data]
+
+    def to_dataframe(self, columns=None):
+        """DataFrame equal to pd.read_csv of the source (optionally a subset)"""
+        names = self.names if columns is None else list(columns)
+        return pd.DataFrame({name: self.column(name) for name in names})
+
+
+def open_table(csv_path, cache_dir=None, mmap=True):
+    return ColumnarTable(ensure_columnar(csv_path, cache_dir), mmap=mmap)
+
+
+def read_dataframe(csv_path, columns=None, cache_dir=None):
+    """
+    Drop-in replacement for pd.read_csv(csv_path) backed by the columnar
+    cache. Falls back to parsing the CSV when the cache cannot be written.
+    """
+    try:
+        table = open_table(csv_path, cache_dir)
+    except OSError:
+        df = pd.read_csv(csv_path, float_precision="round_trip")
+        return df if columns is None else df[list(columns)]
+    return table.to_dataframe(columns)
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:] or ["Dams_Gujarat.csv"]:
+        table = open_table(path)
+        print(
+            f"{path}: {table.num_rows} rows, {len(table.names)} columns -> {table.path}"
+        )
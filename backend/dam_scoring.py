@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 def calculate_geological_suitability_score(row):
@@ -122,6 +123,121 @@ def get_category(score):
     elif score >= 50: return "Fair"
     else: return "Poor"
 
+# ==================================================
+# Vectorized scoring engine
+# ==================================================
+# Column-wise equivalents of the row-wise rules above. Each rule is evaluated
+# over the whole column with NumPy masks / bin lookups; a missing (NaN) value
+# contributes 0 points, exactly like the pd.notna() guards above.
+
+# Input columns read by the rules
+SCORING_COLUMNS = [
+    'Seismic_Zone', 'SoilType_Main', 'SoilType_Secondary', 'Elevation', 'Slope(%)',
+    'Max Height above Foundation (m)', 'Rainfall_5yr_Avg', 'MonsoonIntensityAvg(mm/wet_day)',
+    'Rainfall_StdDev_5yr', 'NDVI_2025(avg)', 'Temperature_StdDev_5yr', 'Heatwave_Days_PerYear',
+    'Flood_Risk_Index', 'Cyclone_Exposure',
+]
+SEISMIC_POINTS = {1: 25, 2: 20, 3: 15, 4: 10, 5: 5}
+# Checked in order: the first soil found in either soil column wins
+SOIL_POINTS = [('vertisol', 20), ('cambisol', 15), ('luvisol', 10), ('leptosol', 8), ('arenosol', 5)]
+CATEGORY_THRESHOLDS = np.array([50, 60, 70, 80])
+CATEGORY_LABELS = np.array(["Poor", "Fair", "Moderate", "Good", "Excellent"], dtype=object)
+
+def _values(df, col):
+    return df[col].to_numpy(dtype=float, na_value=np.nan)
+
+def _points(values, conditions, choices, default):
+    """np.select over the rule's conditions, with 0 points for NaN values"""
+    with np.errstate(invalid='ignore'):
+        points = np.select(conditions, choices, default)
+    return np.where(np.isnan(values), 0, points)
+
+def _threshold_points(values, upper_bounds, choices, right_closed=True):
+    """Bin lookup for one-sided rules like `if x <= 2 ... elif x <= 5 ...`"""
+    side = 'left' if right_closed else 'right'
+    points = np.asarray(choices)[np.searchsorted(upper_bounds, values, side=side)]
+    return np.where(np.isnan(values), 0, points)
+
+def _seismic_points(zone):
+    if pd.api.types.is_numeric_dtype(zone):
+        z = zone.to_numpy(dtype=float, na_value=np.nan)
+        points = np.select([z == k for k in SEISMIC_POINTS], list(SEISMIC_POINTS.values()), 10)
+    else:
+        points = zone.map(SEISMIC_POINTS).fillna(10).to_numpy(dtype=float)
+    return np.where(zone.isna().to_numpy(), 0, points)
+
+def _soil_points(main, secondary):
+    # Substring checks run once per distinct soil name, then broadcast by code
+    main_codes, main_uniques = pd.factorize(main, use_na_sentinel=False)
+    sec_codes, sec_uniques = pd.factorize(secondary, use_na_sentinel=False)
+    main_names = [str(u).lower() for u in main_uniques]
+    sec_names = [str(u).lower() for u in sec_uniques]
+    conditions = [
+        np.array([soil in n for n in main_names], dtype=bool)[main_codes]
+        | np.array([soil in n for n in sec_names], dtype=bool)[sec_codes]
+        for soil, _ in SOIL_POINTS
+    ]
+    return np.select(conditions, [points for _, points in SOIL_POINTS], 10)
+
+def geological_suitability_scores(df):
+    """Vectorized calculate_geological_suitability_score over every row of df"""
+    elevation = _values(df, 'Elevation')
+    slope = _values(df, 'Slope(%)')
+    max_height = _values(df, 'Max Height above Foundation (m)')
+    score = (
+        _seismic_points(df['Seismic_Zone'])
+        + _soil_points(df['SoilType_Main'], df['SoilType_Secondary'])
+        + _points(elevation,
+                  [(50 <= elevation) & (elevation <= 200),
+                   ((20 <= elevation) & (elevation < 50)) | ((200 < elevation) & (elevation <= 300))],
+                  [15, 12], 8)
+        + _threshold_points(slope, [2, 5, 10], [15, 12, 8, 5])
+        + _points(max_height,
+                  [(10 <= max_height) & (max_height <= 30),
+                   ((5 <= max_height) & (max_height < 10)) | ((30 < max_height) & (max_height <= 50))],
+                  [10, 8], 5)
+    )
+    return pd.Series(np.minimum(score, 100).astype(np.int64), index=df.index)
+
+def climatic_effect_scores(df):
+    """Vectorized calculate_climatic_effect_score over every row of df"""
+    rainfall_5yr = _values(df, 'Rainfall_5yr_Avg')
+    monsoon = _values(df, 'MonsoonIntensityAvg(mm/wet_day)')
+    ndvi = _values(df, 'NDVI_2025(avg)')
+    cyclone = _values(df, 'Cyclone_Exposure')
+    score = (
+        _points(rainfall_5yr,
+                [(800 <= rainfall_5yr) & (rainfall_5yr <= 1200),
+                 (600 <= rainfall_5yr) & (rainfall_5yr <= 1500),
+                 (400 <= rainfall_5yr) & (rainfall_5yr <= 1800)],
+                [25, 20, 15], 10)
+        + _points(monsoon,
+                  [(15 <= monsoon) & (monsoon <= 20),
+                   (10 <= monsoon) & (monsoon <= 25),
+                   (5 <= monsoon) & (monsoon <= 30)],
+                  [20, 15, 10], 5)
+        + _threshold_points(_values(df, 'Rainfall_StdDev_5yr'), [100, 200], [15, 10, 5], right_closed=False)
+        + _points(ndvi,
+                  [(0.3 <= ndvi) & (ndvi <= 0.6), (0.1 <= ndvi) & (ndvi <= 0.8)],
+                  [15, 10], 5)
+        + _threshold_points(_values(df, 'Temperature_StdDev_5yr'), [2, 4], [10, 8, 5], right_closed=False)
+        + _threshold_points(_values(df, 'Heatwave_Days_PerYear'), [5, 10], [10, 7, 5], right_closed=False)
+        + _threshold_points(_values(df, 'Flood_Risk_Index'), [0.3, 0.6], [10, 7, 5], right_closed=False)
+        + _points(cyclone, [cyclone == 0, cyclone == 1], [5, 3], 2)
+    )
+    return pd.Series(np.minimum(score, 100).astype(np.int64), index=df.index)
+
+def overall_suitability_scores(geological, climatic):
+    """Vectorized calculate_overall_suitability_score"""
+    return (geological * 0.6 + climatic * 0.4).round(1)
+
+def categories(scores):
+    """Vectorized get_category: bin lookup on the category thresholds"""
+    values = np.asarray(scores, dtype=float)
+    codes = np.searchsorted(CATEGORY_THRESHOLDS, values, side='right')
+    codes[np.isnan(values)] = 0
+    return pd.Series(CATEGORY_LABELS[codes], index=getattr(scores, 'index', None))
+
 def process_dam_data(df):
     """
     Process dam data by calculating scores and categories.
@@ -132,22 +248,24 @@ def process_dam_data(df):
     Returns:
         DataFrame: Processed dataframe with additional score and category columns
     """
-    # Calculate scores
-    df['Geological_Suitability_Score'] = df.apply(calculate_geological_suitability_score, axis=1)
-    df['Climatic_Effect_Score'] = df.apply(calculate_climatic_effect_score, axis=1)
-    df['Overall_Suitability_Score'] = df.apply(calculate_overall_suitability_score, axis=1)
+    # Calculate scores (column-wise, same results as the row-wise functions)
+    df['Geological_Suitability_Score'] = geological_suitability_scores(df)
+    df['Climatic_Effect_Score'] = climatic_effect_scores(df)
+    df['Overall_Suitability_Score'] = overall_suitability_scores(
+        df['Geological_Suitability_Score'], df['Climatic_Effect_Score'])
     
     # Add categories
-    df['Geological_Category'] = df['Geological_Suitability_Score'].apply(get_category)
-    df['Climatic_Category'] = df['Climatic_Effect_Score'].apply(get_category)
-    df['Overall_Category'] = df['Overall_Suitability_Score'].apply(get_category)
+    df['Geological_Category'] = categories(df['Geological_Suitability_Score'])
+    df['Climatic_Category'] = categories(df['Climatic_Effect_Score'])
+    df['Overall_Category'] = categories(df['Overall_Suitability_Score'])
     
     return df
 
 # Example usage:
 if __name__ == "__main__":
-    # Load your data
-    # df = pd.read_csv('Dams_Gujarat.csv')
+    # Load your data (from the typed columnar cache of the CSV)
+    # from columnar import read_dataframe
+    # df = read_dataframe('Dams_Gujarat.csv')
     
     # Process the data
     # processed_df = process_dam_data(df)
@@ -0,0 +1,247 @@
+"""
+Feature pipeline shared by training (train_models.py) and serving (pulse).
+
+A fitted pipeline holds everything needed to turn raw dam attributes into a
+model's feature matrix:
+
+    features    column order the model was trained on
+    stats       training-set statistics used by the derived features
+                (imputation medians, the temperature mean)
+    encodings   per categorical column, the fitted target encoding of every
+                category plus the fallback for unseen / missing values
+
+It is stored with the model as a plain dict (``state()``) and rebuilt with
+``FeaturePipeline.from_state``. Training and serving call the same
+``derive_features`` over NumPy columns, so engineered columns such as
+Rainfall_Trend or Climate_Risk_Score are computed identically for a 500k-row
+training frame and a single request.
+"""
+
+import numpy as np
+
+PIPELINE_VERSION = 1
+
+RAINFALL_COLUMNS = [f"Rainfall_{year}" for year in range(2020, 2025)]
+CATEGORICAL_COLUMNS = ["SoilType_Main", "SoilType_Secondary", "Type"]
+# Raw columns the derived features are computed from
+DERIVED_INPUTS = RAINFALL_COLUMNS + [
+    "Rainfall_5yr_Avg",
+    "RiverFlowRate(m/day)",
+    "RiverDistance(km)",
+    "Avg_Temperature_5yr",
+    "Heatwave_Days_PerYear",
+    "Flood_Risk_Index",
+    "Climate_Vulnerability_Index",
+    "Extreme_Rainfall_Days",
+]
+DERIVED_FEATURES = [
+    "Rainfall_Mean",
+    "Rainfall_StdDev",
+    "Rainfall_Range",
+    "Rainfall_Trend",
+    "Flow_Rainfall_Ratio",
+    "River_Impact_Score",
+    "Temp_Anomaly",
+    "Heat_Stress_Index",
+    "Flood_Risk_Adjusted",
+    "Climate_Risk_Score",
+]
+
+
+def rainfall_trend(rain):
+    """
+    Least-squares slope of each row of `rain` against x = 0..n-1, in closed
+    form over the whole matrix: sum((x - x̄)(y - ȳ)) / sum((x - x̄)²).
+    Constant rows and rows containing NaN get 0.0, as with the previous
+    per-row scipy.stats.linregress.
+    """
+    n_rows, n_years = rain.shape
+    if n_years < 2:
+        return np.zeros(n_rows)
+    x = np.arange(n_years, dtype=float)
+    x -= x.mean()
+    slope = (rain - rain.mean(axis=1, keepdims=True)) @ x / (x @ x)
+    slope[(rain == rain[:, :1]).all(axis=1) | np.isnan(slope)] = 0.0
+    return slope
+
+
+def _river_impact(flow, distance):
+    with np.errstate(all="ignore"):
+        impact = flow / distance
+    impact[np.isinf(impact)] = np.nan
+    return impact
+
+
+def fit_stats(columns):
+    """Training-set statistics used by derive_features"""
+    stats = {}
+    with np.errstate(all="ignore"):
+        if "RiverFlowRate(m/day)" in columns:
+            flow = columns["RiverFlowRate(m/day)"]
+            stats["river_flow_median"] = float(np.nanmedian(flow))
+            if "RiverDistance(km)" in columns:
+                flow = np.where(np.isnan(flow), stats["river_flow_median"], flow)
+                impact = _river_impact(flow, columns["RiverDistance(km)"])
+                stats["river_impact_median"] = float(np.nanmedian(impact))
+        if "Avg_Temperature_5yr" in columns:
+            stats["avg_temperature_mean"] = float(
+                np.nanmean(columns["Avg_Temperature_5yr"])
+            )
+    return stats
+
+
+def derive_features(columns, stats):
+    """
+    Engineered columns, computed from whichever raw inputs are present.
+
+    columns maps raw column name -> float64 array; returns a new dict with
+    the derived columns added (and RiverFlowRate imputed with the training
+    median).
+    """
+    out = dict(columns)
+    with np.errstate(all="ignore"):
+        rainfall = [c for c in RAINFALL_COLUMNS if c in columns]
+        if rainfall:
+            rain = np.stack([columns[c] for c in rainfall], axis=1)
+            if np.isnan(rain).any():
+                out["Rainfall_Mean"] = np.nanmean(rain, axis=1)
+                out["Rainfall_StdDev"] = np.nanstd(rain, axis=1, ddof=1)
+                out["Rainfall_Range"] = np.nanmax(rain, axis=1) - np.nanmin(
+                    rain, axis=1
+                )
+            else:
+                # Same values; the nan-aware reductions cost ~3x on small batches
+                out["Rainfall_Mean"] = rain.mean(axis=1)
+                out["Rainfall_StdDev"] = rain.std(axis=1, ddof=1)
+                out["Rainfall_Range"] = np.ptp(rain, axis=1)
+            out["Rainfall_Trend"] = rainfall_trend(rain)
+
+        if "RiverFlowRate(m/day)" in columns and "RiverDistance(km)" in columns:
+            flow = columns["RiverFlowRate(m/day)"]
+            flow = np.where(np.isnan(flow), stats["river_flow_median"], flow)
+            out["RiverFlowRate(m/day)"] = flow
+            if "Rainfall_5yr_Avg" in columns:
+                out["Flow_Rainfall_Ratio"] = flow / (columns["Rainfall_5yr_Avg"] + 1e-6)
+                impact = _river_impact(flow, columns["RiverDistance(km)"])
+                out["River_Impact_Score"] = np.where(
+                    np.isnan(impact), stats["river_impact_median"], impact
+                )
+
+        if "Avg_Temperature_5yr" in columns:
+            temperature = columns["Avg_Temperature_5yr"]
+            out["Temp_Anomaly"] = temperature - stats["avg_temperature_mean"]
+            if "Heatwave_Days_PerYear" in columns:
+                out["Heat_Stress_Index"] = columns["Heatwave_Days_PerYear"] * (
+                    temperature / 30.0
+                )
+
+        if "Flood_Risk_Index" in columns and "Rainfall_5yr_Avg" in columns:
+            out["Flood_Risk_Adjusted"] = columns["Flood_Risk_Index"] * (
+                columns["Rainfall_5yr_Avg"] / 1000
+            )
+
+        if (
+            "Climate_Vulnerability_Index" in columns
+            and "Extreme_Rainfall_Days" in columns
+        ):
+            out["Climate_Risk_Score"] = columns["Climate_Vulnerability_Index"] * (
+                1 + columns["Extreme_Rainfall_Days"] / 100
+            )
+    return out
+
+
+def _category_key(value):
+    return str(value).strip().casefold()
+
+
+class FeaturePipeline:
+    def __init__(self, features, stats, encodings=None):
+        self.features = list(features)
+        self.stats = dict(stats)
+        self.encodings = dict(encodings or {})
+        self.categorical = [c for c in self.features if c in self.encodings]
+        derived = [c for c in self.features if c in DERIVED_FEATURES]
+        # Raw numeric columns the transform reads, in a fixed order
+        needed = set(self.features) - set(derived) - set(self.categorical)
+        if derived:
+            needed |= set(DERIVED_INPUTS)
+        self.raw_columns = sorted(needed)
+        self._lookups = {
+            column: (
+                {k: float(v) for k, v in spec["categories"].items()},
+                spec["default"],
+            )
+            for column, spec in self.encodings.items()
+        }
+
+    @classmethod
+    def from_training(cls, features, stats, encoders=None):
+        """
+        Build from what training fitted: ``stats`` from fit_stats, and
+        ``encoders`` mapping categorical columns to their sklearn TargetEncoder.
+        """
+        encodings = {}
+        for column, encoder in (encoders or {}).items():
+            # Training assigns the encoder's output to a single column, which
+            # keeps its first output. The integer scores make sklearn infer a
+            # multiclass target, so that is the class-0 encoding; serve the
+            # same values the model was fitted on.
+            categories = {
+                _category_key(category): float(value)
+                for category, value in zip(
+                    encoder.categories_[0], encoder.encodings_[0]
+                )
+            }
+            encodings[column] = {
+                "categories": categories,
+                "default": float(np.ravel(encoder.target_mean_)[0]),
+            }
+        return cls(features, stats, encodings)
+
+    def state(self):
+        return {
+            "version": PIPELINE_VERSION,
+            "features": self.features,
+            "stats": self.stats,
+            "encodings": self.encodings,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        if state.get("version") != PIPELINE_VERSION:
+            raise ValueError(
+                f"Unsupported feature pipeline version {state.get('version')}"
+            )
+        return cls(state["features"], state["stats"], state["encodings"])
+
+    def encode(self, column, values):
+        """Target-encode raw category values; unseen or missing -> fallback"""
+        mapping, default = self._lookups[column]
+        return np.array(
+            [
+                default if value is None else mapping.get(_category_key(value), default)
+                for value in values
+            ],
+            dtype=np.float64,
+        )
+
+    def transform_columns(self, columns, categories):
+        """
+        Feature matrix from raw numeric columns (name -> float64 array) and
+        raw categorical values (name -> sequence of strings / None).
+        """
+        derived = derive_features(columns, self.stats)
+        for column in self.categorical:
+            derived[column] = self.encode(column, categories[column])
+        matrix = np.empty((len(derived[self.features[0]]), len(self.features)))
+        for i, column in enumerate(self.features):
+            matrix[:, i] = derived[column]
+        return matrix
+
+    def transform_frame(self, df):
+        """Feature matrix for a DataFrame of raw columns"""
+        columns = {c: df[c].to_numpy(dtype=np.float64) for c in self.raw_columns}
+        categories = {
+            c: [None if v != v else v for v in df[c].tolist()] for c in self.categorical
+        }
+        return self.transform_columns(columns, categories)
@@ -0,0 +1,164 @@
+"""
+Versioned store for trained model artifacts.
+
+Each training run publishes its pickle into a directory named after a hash
+of its inputs: the training CSV's content hash plus the model's
+hyperparameters and feature list. A per-model pointer selects the active
+version:
+
+    model_store/<name>/current.json            {"version": ...}
+    model_store/<name>/<version>/meta.json     data hash, params, metrics
+    model_store/<name>/<version>/<name>_model.pkl
+
+Versions are published with an atomic rename and activated by atomically
+replacing current.json, so readers (pulse.registry) never see a partial
+artifact. train_models.py skips retraining when a version for the same
+inputs already exists; ``python model_store.py activate <name> <version>``
+rolls a model back or forward.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+DEFAULT_ROOT = Path(__file__).resolve().parent / "model_store"
+# Older versions beyond this many are pruned on publish (the active one is kept)
+KEEP_VERSIONS = 5
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_version(name, data_sha256, params):
+    """Version id for a model trained on the given data with the given params"""
+    payload = json.dumps(
+        {"name": name, "data_sha256": data_sha256, "params": params},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _write_json(path, data):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data, indent=2, default=str), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class ModelStore:
+    def __init__(self, root=None):
+        self.root = Path(root or DEFAULT_ROOT)
+
+    def _dir(self, name, version):
+        return self.root / name / version
+
+    def meta(self, name, version):
+        try:
+            return json.loads(
+                (self._dir(name, version) / "meta.json").read_text(encoding="utf-8")
+            )
+        except (OSError, ValueError):
+            return None
+
+    def has(self, name, version):
+        return self.meta(name, version) is not None
+
+    def versions(self, name):
+        """Published versions of name, oldest first"""
+        metas = [
+            self.meta(name, d.name)
+            for d in (self.root / name).glob("*")
+            if d.is_dir() and not d.name.startswith(".")
+        ]
+        return sorted(
+            (m for m in metas if m), key=lambda m: (m["created_at"], m["version"])
+        )
+
+    def current_version(self, name):
+        try:
+            pointer = json.loads(
+                (self.root / name / "current.json").read_text(encoding="utf-8")
+            )
+        except (OSError, ValueError):
+            return None
+        return pointer.get("version")
+
+    def current(self, name):
+        """Metadata of the active version, or None if nothing is published"""
+        version = self.current_version(name)
+        return self.meta(name, version) if version else None
+
+    def artifact_path(self, name, meta):
+        return self._dir(name, meta["version"]) / meta["artifact"]
+
+    def publish(self, name, version, artifact, meta, activate=True):
+        """
+        Copy the artifact file into the store as ``version`` (no-op if that
+        version exists) and optionally make it the active one.
+        """
+        target = self._dir(name, version)
+        if not self.has(name, version):
+            (self.root / name).mkdir(parents=True, exist_ok=True)
+            tmp_dir = Path(tempfile.mkdtemp(dir=self.root / name, prefix=".build-"))
+            try:
+                shutil.copy2(artifact, tmp_dir / Path(artifact).name)
+                _write_json(
+                    tmp_dir / "meta.json",
+                    dict(
+                        meta,
+                        name=name,
+                        version=version,
+                        artifact=Path(artifact).name,
+                        artifact_sha256=file_sha256(artifact),
+                        created_at=time.time(),
+                    ),
+                )
+                shutil.rmtree(target, ignore_errors=True)
+                os.rename(tmp_dir, target)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        if activate:
+            self.activate(name, version)
+        self.prune(name)
+        return self.meta(name, version)
+
+    def activate(self, name, version):
+        if not self.has(name, version):
+            raise KeyError(f"{name} has no version {version}")
+        _write_json(
+            self.root / name / "current.json",
+            {"version": version, "activated_at": time.time()},
+        )
+
+    def prune(self, name, keep=KEEP_VERSIONS):
+        active = self.current_version(name)
+        stale = [m for m in self.versions(name) if m["version"] != active]
+        for meta in stale[: max(0, len(stale) - (keep - 1))]:
+            shutil.rmtree(self._dir(name, meta["version"]), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    store = ModelStore()
+    if sys.argv[1:2] == ["activate"] and len(sys.argv) == 4:
+        store.activate(sys.argv[2], sys.argv[3])
+        print(f"{sys.argv[2]}: now serving {sys.argv[3]}")
+    else:
+        for name in sys.argv[1:] or ["geological", "climatic"]:
+            active = store.current_version(name)
+            for meta in store.versions(name):
+                marker = "*" if meta["version"] == active else " "
+                print(
+                    f"{marker} {name} {meta['version']} "
+                    f"data={meta['data_sha256'][:12]} "
+                    f"trained={time.strftime('%Y-%m-%d %H:%M', time.localtime(meta['created_at']))}"
+                )
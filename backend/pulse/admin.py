@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Dam, Contact, LetUsKnow, Feedback
+from django.utils import timezone
+from .models import Dam, Contact, LetUsKnow, Feedback, OutboxEmail
 
 
 @admin.register(Contact)
@@ -28,4 +29,23 @@ class FeedbackAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at',)
 
 
-admin.site.register(Dam)
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject', 'recipient', 'last_error')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    actions = ['requeue']
+
+    @admin.action(description='Requeue selected emails')
+    def requeue(self, request, queryset):
+        queryset.update(status=OutboxEmail.STATUS_PENDING, attempts=0,
+                        next_attempt_at=timezone.now(), locked_until=None)
+
+
+@admin.register(Dam)
+class DamAdmin(admin.ModelAdmin):
+    list_display = ('name', 'district', 'type', 'overall_score', 'overall_category', 'updated_at')
+    list_filter = ('overall_category', 'district')
+    search_fields = ('name', 'district', 'river', 'nearest_city')
+    readonly_fields = ('position', 'updated_at')
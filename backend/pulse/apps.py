@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class PulseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pulse'
+
+    def ready(self):
+        from django.conf import settings
+
+        if getattr(settings, 'MODEL_EAGER_LOAD', False):
+            from .registry import model_registry
+
+            model_registry.load_all()
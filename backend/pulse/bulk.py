@@ -0,0 +1,189 @@
+"""
+Bulk scoring of site CSVs laid out like Dams_Gujarat.csv.
+
+The file is parsed ``BULK_SCORE_CHUNK_ROWS`` rows at a time, reading only
+the columns the models and the dam_scoring rules need. Each chunk goes
+through both models' feature pipelines as one matrix, is scored by the
+rules, and is serialized to NDJSON or CSV before the next one is read. Only
+one chunk is alive at a time, so memory use does not grow with the file.
+
+Used by /api/predict/bulk/ (streamed through StreamingHttpResponse) and by
+``python manage.py score_csv`` for offline runs.
+"""
+
+import json
+import logging
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+import dam_scoring
+from feature_pipeline import CATEGORICAL_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Output format -> content type
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+# Copied from the input to each result row when present
+ID_COLUMNS = ["Name", "Latitude", "Longitude"]
+# Rule-based scores, under the dataset's own column names
+RULE_COLUMNS = [
+    "Geological_Suitability_Score",
+    "Climatic_Effect_Score",
+    "Overall_Suitability_Score",
+    "Geological_Category",
+    "Climatic_Category",
+    "Overall_Category",
+]
+
+
+class BulkScoringError(ValueError):
+    """The upload cannot be scored (unreadable, or missing columns)"""
+
+
+class BulkScorer:
+    """
+    Scores a CSV with the given LoadedModels, chunk by chunk.
+
+    ``clim`` may be None, in which case the climatic and overall model
+    scores are left empty (the rule-based scores are still filled in).
+    With a ``gate`` (pulse.inference.InferenceGate) each chunk's predictions
+    wait for an inference slot.
+    """
+
+    def __init__(self, geo, clim=None, chunk_rows=None, gate=None):
+        self.geo = geo
+        self.clim = clim
+        self.gate = gate
+        self.chunk_rows = chunk_rows or getattr(settings, "BULK_SCORE_CHUNK_ROWS", 5000)
+        self.models = [
+            (label, model)
+            for label, model in (
+                ("geological_suitability", geo),
+                ("climate_impact", clim),
+            )
+            if model is not None
+        ]
+        required = set(dam_scoring.SCORING_COLUMNS)
+        for _, model in self.models:
+            required |= set(self._model_columns(model))
+        self.required = sorted(required)
+        self.text_columns = set(CATEGORICAL_COLUMNS) | {"Name"}
+        for _, model in self.models:
+            if model.pipeline is not None:
+                self.text_columns |= set(model.pipeline.categorical)
+        self._wanted = set(self.required) | set(ID_COLUMNS)
+
+    @staticmethod
+    def _model_columns(model):
+        if model.pipeline is not None:
+            return model.pipeline.raw_columns + model.pipeline.categorical
+        return model.features
+
+    def model_versions(self):
+        return {model.name: model.version for _, model in self.models}
+
+    def read(self, source):
+        """
+        Iterator of DataFrame chunks of ``source`` (path or binary file).
+
+        The first chunk is read up front so an unreadable file or missing
+        columns raise BulkScoringError before any output is produced.
+        """
+        try:
+            reader = pd.read_csv(
+                source,
+                chunksize=self.chunk_rows,
+                usecols=lambda column: column in self._wanted,
+                dtype={column: "object" for column in self.text_columns},
+            )
+            first = next(reader, None)
+        except (
+            pd.errors.ParserError,
+            pd.errors.EmptyDataError,
+            UnicodeDecodeError,
+        ) as e:
+            raise BulkScoringError(f"Could not parse CSV: {e}")
+        if first is None:
+            return iter(())
+        missing = [c for c in self.required if c not in first.columns]
+        if missing:
+            reader.close()
+            raise BulkScoringError(f"Missing columns: {', '.join(missing)}")
+
+        def chunks():
+            with reader:
+                yield first
+                yield from reader
+
+        return chunks()
+
+    def _matrix(self, model, df):
+        if model.pipeline is not None:
+            return model.pipeline.transform_frame(df)
+        # Legacy artifacts: raw feature columns, missing values as 0
+        return df.reindex(columns=model.features).fillna(0).to_numpy(dtype=np.float64)
+
+    def score_chunk(self, df, offset=0):
+        """Result frame for one chunk; ``offset`` is its first row's index"""
+        for column in df.columns:
+            if column not in self.text_columns and df[column].dtype == object:
+                df[column] = pd.to_numeric(df[column], errors="coerce")
+
+        out = pd.DataFrame({"index": np.arange(offset, offset + len(df))})
+        for column in ID_COLUMNS:
+            if column in df.columns:
+                out[column] = df[column].to_numpy()
+
+        scores = {}
+        with self.gate.slot(wait=True) if self.gate else nullcontext():
+            for label, model in self.models:
+                scores[label] = model.predict(self._matrix(model, df))
+        if self.clim is not None and len(df):
+            scores["overall_suitability"] = (
+                scores["geological_suitability"] * 0.6 + scores["climate_impact"] * 0.4
+            )
+        for label in (
+            "geological_suitability",
+            "climate_impact",
+            "overall_suitability",
+        ):
+            values = scores.get(label)
+            if values is None:
+                out[f"{label}_score"] = np.nan
+                out[f"{label}_level"] = None
+            else:
+                out[f"{label}_score"] = np.round(values, 2)
+                out[f"{label}_level"] = dam_scoring.categories(values).to_numpy()
+
+        rules = dam_scoring.process_dam_data(df[dam_scoring.SCORING_COLUMNS].copy())
+        for column in RULE_COLUMNS:
+            out[column] = rules[column].to_numpy()
+        return out
+
+    def stream(self, chunks, fmt="ndjson"):
+        """Serialized results of ``chunks``, one string per chunk"""
+        offset = 0
+        try:
+            for df in chunks:
+                out = self.score_chunk(df, offset)
+                if fmt == "csv":
+                    yield out.to_csv(index=False, header=offset == 0)
+                elif len(out):
+                    body = out.to_json(orient="records", lines=True)
+                    yield body if body.endswith("\n") else body + "\n"
+                offset += len(df)
+        except Exception as e:
+            # Headers are long gone; NDJSON clients get a final error record,
+            # CSV output ends after the last complete chunk
+            logger.error(f"Bulk scoring failed after {offset} rows: {e}", exc_info=True)
+            if fmt != "csv":
+                yield json.dumps(
+                    {
+                        "status": "error",
+                        "message": f"Scoring failed after {offset} rows",
+                    }
+                ) + "\n"
+        logger.info(f"Bulk scoring: {offset} rows")
@@ -0,0 +1,124 @@
+"""
+Bounded LRU/TTL cache for model predictions.
+
+Entries are keyed on a canonical hash of the sanitized feature row together
+with the version of the model artifact that produced them, so a retrained
+pickle never serves results computed by the previous one.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def file_version(path):
+    """Content hash identifying a model artifact on disk"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live.
+
+    ``maxsize=0`` disables caching (every lookup is a miss and nothing is
+    stored). Hit / miss / eviction / expiration counters are kept for
+    ``stats()``.
+    """
+
+    def __init__(self, maxsize=4096, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(model_version, row):
+        # +0.0 folds -0.0 into 0.0 so equal inputs always hash the same
+        row = np.ascontiguousarray(row, dtype=np.float64) + 0.0
+        digest = hashlib.blake2b(row.tobytes(), digest_size=16)
+        digest.update(str(model_version).encode())
+        return digest.digest()
+
+    def _lookup(self, key, now):
+        """(hit, value) for key, updating the counters"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+        return False, None
+
+    def _store(self, key, value, now):
+        with self._lock:
+            self._entries[key] = (value, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, model_version, row, compute):
+        """Return the cached value for (model_version, row), or compute it"""
+        if self.maxsize <= 0:
+            with self._lock:
+                self.misses += 1
+            return compute()
+
+        key = self.make_key(model_version, row)
+        now = time.monotonic()
+        hit, value = self._lookup(key, now)
+        if hit:
+            return value
+        value = compute()
+        self._store(key, value, now)
+        return value
+
+    async def aget_or_compute(self, model_version, row, compute):
+        """get_or_compute for async views; ``compute`` returns an awaitable"""
+        if self.maxsize <= 0:
+            with self._lock:
+                self.misses += 1
+            return await compute()
+
+        key = self.make_key(model_version, row)
+        now = time.monotonic()
+        hit, value = self._lookup(key, now)
+        if hit:
+            return value
+        value = await compute()
+        self._store(key, value, now)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
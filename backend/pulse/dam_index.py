@@ -0,0 +1,342 @@
+"""
+In-memory secondary indexes over one version of the Dam table, behind the
+filtered, sorted and paginated /api/dams_csv/ listings.
+
+A ``DamIndex`` is built once per table version (see pulse.dams.DamListing)
+from the rows of the full listing:
+
+- equality indexes (lower-cased value -> row numbers) for District and the
+  three suitability categories
+- range indexes (row numbers sorted by value) for the three scores
+- dense ranks of each sortable field, built on first use, so sorting the
+  matches is one ``np.lexsort``
+
+A query reads the rows of its most selective filter from that filter's
+index and checks the other filters on those rows only, so rows it does not
+select are never looked at. Pages are cut with a
+keyset cursor (the last row's sort values and pk): it stays valid when the
+table changes between pages, without skipping or repeating rows that did
+not move.
+"""
+
+import base64
+import binascii
+import json
+
+import numpy as np
+
+from .dataset import NUMERIC_FIELDS, REQUIRED_FIELDS
+
+# Query parameter -> field with an equality index
+EQUALITY_PARAMS = {
+    "district": "District",
+    "category": "Overall_Suitability_Category",
+    "geological_category": "Geological_Suitability_Category",
+    "climatic_category": "Climatic_Effect_Category",
+    "overall_category": "Overall_Suitability_Category",
+}
+# Score kind -> field with a range index (min_<kind>_score / max_<kind>_score)
+SCORE_FIELDS = {
+    "geological": "Geological_Suitability_Score",
+    "climatic": "Climatic_Effect_Score",
+    "overall": "Overall_Suitability_Score",
+}
+RANGE_PARAMS = {
+    f"{bound}_{kind}_score": (field, bound)
+    for kind, field in SCORE_FIELDS.items()
+    for bound in ("min", "max")
+}
+QUERY_PARAMS = {"fields", "sort", "limit", "cursor"}
+QUERY_PARAMS |= set(EQUALITY_PARAMS) | set(RANGE_PARAMS)
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+# Hidden sort key of the default (dataset) order
+POSITION = "position"
+
+
+class DamQueryError(ValueError):
+    """Invalid listing query parameters (reported as 400)"""
+
+
+def _normalize(value):
+    return "" if value is None else str(value).strip().lower()
+
+
+def _split(raw):
+    return [part.strip() for part in raw.split(",") if part.strip()]
+
+
+class DamQuery:
+    """Parsed listing parameters; ``from_params`` validates a QueryDict"""
+
+    def __init__(
+        self, equals=None, ranges=None, fields=None, sort=None, limit=None, cursor=None
+    ):
+        self.equals = equals or {}
+        self.ranges = ranges or {}
+        self.fields = fields or list(REQUIRED_FIELDS)
+        self.sort = sort or []
+        self.limit = limit or DEFAULT_LIMIT
+        self.cursor = cursor
+
+    @staticmethod
+    def applies(params):
+        """Whether the request asks for a filtered listing at all"""
+        return any(name in params for name in QUERY_PARAMS)
+
+    @classmethod
+    def from_params(cls, params):
+        equals = {}
+        for name, field in EQUALITY_PARAMS.items():
+            values = [v for raw in params.getlist(name) for v in _split(raw)]
+            if values:
+                wanted = {_normalize(v) for v in values}
+                # category= and overall_category= both select on one field
+                equals[field] = equals[field] & wanted if field in equals else wanted
+
+        ranges = {}
+        for name, (field, bound) in RANGE_PARAMS.items():
+            raw = params.get(name)
+            if raw in (None, ""):
+                continue
+            try:
+                value = float(raw)
+            except ValueError:
+                raise DamQueryError(f"Parameter '{name}' must be a number")
+            if not np.isfinite(value):
+                raise DamQueryError(f"Parameter '{name}' must be a number")
+            lo, hi = ranges.get(field, (-np.inf, np.inf))
+            ranges[field] = (value, hi) if bound == "min" else (lo, value)
+
+        fields = None
+        if params.get("fields"):
+            fields = list(dict.fromkeys(_split(params["fields"])))
+            unknown = [f for f in fields if f not in REQUIRED_FIELDS]
+            if unknown:
+                raise DamQueryError(f"Unknown fields: {', '.join(unknown)}")
+
+        sort = []
+        for key in _split(params.get("sort", "")):
+            field = key.lstrip("-")
+            if field not in REQUIRED_FIELDS:
+                raise DamQueryError(f"Cannot sort by '{field}'")
+            sort.append((field, key.startswith("-")))
+
+        limit = params.get("limit")
+        if limit not in (None, ""):
+            try:
+                limit = int(limit)
+            except ValueError:
+                raise DamQueryError("Parameter 'limit' must be an integer")
+            if not 1 <= limit <= MAX_LIMIT:
+                raise DamQueryError(
+                    f"Parameter 'limit' must be between 1 and {MAX_LIMIT}"
+                )
+
+        cursor = params.get("cursor") or None
+        if cursor is not None:
+            cursor = decode_cursor(cursor, len(sort or [(POSITION, False)]))
+        return cls(equals, ranges, fields, sort, limit, cursor)
+
+
+def encode_cursor(values, pk):
+    raw = json.dumps([values, pk], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, keys):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values, pk = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise DamQueryError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != keys or not isinstance(pk, int):
+        raise DamQueryError("Invalid cursor")
+    return values, pk
+
+
+class _Ranks:
+    """
+    Dense ranks of one field: equal values share a rank, missing ones rank
+    last. Text compares case-insensitively.
+    """
+
+    def __init__(self, values, numeric):
+        self.numeric = numeric
+        if not numeric:
+            values = [None if v is None else str(v).casefold() for v in values]
+        present = [v for v in values if v is not None]
+        self.uniques = np.unique(
+            np.asarray(present, dtype=float if numeric else object)
+        )
+        self.missing = len(self.uniques)
+        if numeric:
+            array = np.array([np.nan if v is None else v for v in values], dtype=float)
+            self.ranks = np.searchsorted(self.uniques, array).astype(float)
+            self.ranks[np.isnan(array)] = self.missing
+        else:
+            self.ranks = np.array([self.rank(v) for v in values], dtype=float)
+
+    def rank(self, value):
+        """Rank of ``value``; one not in this version falls between its neighbours"""
+        if value is None:
+            return float(self.missing)
+        if self.numeric and not isinstance(value, (int, float)):
+            raise DamQueryError("Invalid cursor")
+        if not self.numeric:
+            value = str(value).casefold()
+        i = int(np.searchsorted(self.uniques, value))
+        if i < len(self.uniques) and self.uniques[i] == value:
+            return float(i)
+        return i - 0.5
+
+    def key(self, ranks, descending):
+        # Missing values sort last in both directions
+        if not descending:
+            return ranks
+        return np.where(ranks == self.missing, np.inf, -ranks)
+
+
+class DamIndex:
+    """
+    Indexes over ``rows`` (REQUIRED_FIELDS dicts in dataset order) with
+    their Dam ``pks`` and import ``positions`` (None for hand-added dams).
+    """
+
+    def __init__(self, rows, pks, positions):
+        self.rows = rows
+        self.pks = np.asarray(pks, dtype=np.int64)
+        self.positions = list(positions)
+        self._equality = {
+            field: self._equality_index(field)
+            for field in set(EQUALITY_PARAMS.values())
+        }
+        self._ranges = {
+            field: self._range_index(field) for field in SCORE_FIELDS.values()
+        }
+        self._ranks = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _value(self, field, i):
+        value = self.positions[i] if field == POSITION else self.rows[i][field]
+        return None if value == "" else value
+
+    def _values(self, field):
+        return [self._value(field, i) for i in range(len(self.rows))]
+
+    def _equality_index(self, field):
+        """({value: code}, code per row, row numbers per code)"""
+        lookup, codes = {}, []
+        for value in self._values(field):
+            codes.append(lookup.setdefault(_normalize(value), len(lookup)))
+        codes = np.asarray(codes, dtype=np.intp)
+        order = np.argsort(codes, kind="stable")
+        groups = np.split(
+            order, np.cumsum(np.bincount(codes, minlength=len(lookup)))[:-1]
+        )
+        return lookup, codes, groups
+
+    def _range_index(self, field):
+        """(sorted values, row numbers in that order, value per row)"""
+        values = np.array(
+            [np.nan if v is None else v for v in self._values(field)], dtype=float
+        )
+        present = np.flatnonzero(~np.isnan(values))
+        order = present[np.argsort(values[present], kind="stable")]
+        return values[order], order, values
+
+    def ranks(self, field):
+        ranks = self._ranks.get(field)
+        if ranks is None:
+            numeric = field == POSITION or field in NUMERIC_FIELDS
+            ranks = self._ranks[field] = _Ranks(self._values(field), numeric)
+        return ranks
+
+    def _equality_filter(self, field, wanted):
+        """(size, rows(), check(rows)) of ``field`` in ``wanted``"""
+        lookup, codes, groups = self._equality[field]
+        wanted = np.array([lookup[v] for v in wanted if v in lookup], dtype=np.intp)
+
+        def rows():
+            if not len(wanted):
+                return np.empty(0, dtype=np.intp)
+            return np.sort(np.concatenate([groups[code] for code in wanted]))
+
+        def check(rows):
+            return np.isin(codes[rows], wanted)
+
+        return sum(len(groups[code]) for code in wanted), rows, check
+
+    def _range_filter(self, field, lo, hi):
+        """(size, rows(), check(rows)) of lo <= ``field`` <= hi"""
+        ordered, order, values = self._ranges[field]
+        start = np.searchsorted(ordered, lo, side="left")
+        stop = np.searchsorted(ordered, hi, side="right")
+
+        def rows():
+            return np.sort(order[start:stop])
+
+        def check(rows):
+            return (values[rows] >= lo) & (values[rows] <= hi)
+
+        return max(stop - start, 0), rows, check
+
+    def select(self, equals, ranges):
+        """
+        Row numbers (ascending) matching every filter. Only the most
+        selective filter's rows are read from its index; the other filters
+        are checked on those rows alone.
+        """
+        filters = [self._equality_filter(f, wanted) for f, wanted in equals.items()]
+        filters += [self._range_filter(f, lo, hi) for f, (lo, hi) in ranges.items()]
+        if not filters:
+            return np.arange(len(self), dtype=np.intp)
+
+        filters.sort(key=lambda f: f[0])
+        selected = filters[0][1]()
+        for _, _, check in filters[1:]:
+            if not len(selected):
+                break
+            selected = selected[check(selected)]
+        return selected
+
+    def query(self, query):
+        """(total matches, page of projected row dicts, next cursor or None)"""
+        selected = self.select(query.equals, query.ranges)
+        sort = query.sort or [(POSITION, False)]
+        keys = [
+            self.ranks(field).key(self.ranks(field).ranks[selected], descending)
+            for field, descending in sort
+        ]
+        pks = self.pks[selected]
+        # lexsort takes the most significant key last; pk breaks ties
+        order = np.lexsort([pks] + keys[::-1])
+        selected, pks = selected[order], pks[order]
+        keys = [key[order] for key in keys]
+
+        if query.cursor is not None:
+            values, cursor_pk = query.cursor
+            after = np.zeros(len(selected), dtype=bool)
+            equal = np.ones(len(selected), dtype=bool)
+            for key, (field, descending), value in zip(keys, sort, values):
+                ranks = self.ranks(field)
+                bound = ranks.key(np.array([ranks.rank(value)]), descending)[0]
+                after |= equal & (key > bound)
+                equal &= key == bound
+            after |= equal & (pks > cursor_pk)
+            start = int(np.argmax(after)) if after.any() else len(selected)
+        else:
+            start = 0
+
+        page = selected[start : start + query.limit]
+        results = [{f: self.rows[i][f] for f in query.fields} for i in page]
+        next_cursor = None
+        if start + query.limit < len(selected):
+            last = int(page[-1])
+            next_cursor = encode_cursor(
+                [self._value(field, last) for field, _ in sort], int(self.pks[last])
+            )
+        return len(selected), results, next_cursor
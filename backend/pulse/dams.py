@@ -0,0 +1,417 @@
+"""
+The Dam table: loading Dams_Gujarat.csv into it, and the queries behind the
+/api/dams_csv/, /api/dams/nearby/ and /api/dams/bbox/ endpoints.
+
+``import_dams`` upserts the CSV keyed on (name, district): new dams are
+inserted with ``bulk_create`` and changed ones rewritten with
+``bulk_update``, in batches, inside one transaction. Unchanged rows are not
+touched, so re-importing the same file is a no-op.
+
+The endpoints read ``values_list`` projections of the API fields only.
+Spatial queries narrow the candidates with the (latitude, longitude) index
+and compute exact great-circle distances on what is left.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, F, Max, Q
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+import columnar
+
+from . import encoding
+from .dam_index import DamIndex
+from .dataset import DAMS_CSV_PATH, REQUIRED_FIELDS
+from .metrics import CSV_LOAD_DURATION
+from .models import Dam
+from .spatial import EARTH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+NDVI_MONTHS = [
+    "Jan", "Feb", "Mar", "Apr", "May", "Jun",
+    "Jul", "Aug", "Sep", "Oct", "Nov", "Dec",
+]  # fmt: skip
+
+# CSV column -> Dam field
+CSV_FIELDS = {
+    "Name": "name",
+    "Latitude": "latitude",
+    "Longitude": "longitude",
+    "Purpose": "purpose",
+    "River": "river",
+    "Nearest City": "nearest_city",
+    "District": "district",
+    "Elevation": "elevation",
+    "Type": "type",
+    "Length (m)": "length_m",
+    "Max Height above Foundation (m)": "max_height_m",
+    "Slope(%)": "slope",
+    "Seismic_Zone": "seismic_zone",
+    "SoilType_Main": "soil_type_main",
+    "SoilType_Secondary": "soil_type_secondary",
+    "Rainfall_2020": "rainfall_2020",
+    "Rainfall_2021": "rainfall_2021",
+    "Rainfall_2022": "rainfall_2022",
+    "Rainfall_2023": "rainfall_2023",
+    "Rainfall_2024": "rainfall_2024",
+    "Rainfall_5yr_Avg": "rainfall_5yr_avg",
+    "MonsoonIntensityAvg(mm/wet_day)": "monsoon_intensity_avg",
+    "Geological_Suitability_Score": "geological_score",
+    "Climatic_Effect_Score": "climatic_score",
+    "Overall_Suitability_Score": "overall_score",
+    "Geological_Suitability_Category": "geological_category",
+    "Climatic_Effect_Category": "climatic_category",
+    "Overall_Suitability_Category": "overall_category",
+    "Rainfall_StdDev_5yr": "rainfall_stddev_5yr",
+    "Max_Annual_Rainfall": "max_annual_rainfall",
+    "Min_Annual_Rainfall": "min_annual_rainfall",
+    "Avg_Temperature_5yr": "avg_temperature_5yr",
+    "Max_Temperature_Last5yr": "max_temperature_last_5yr",
+    "Temperature_StdDev_5yr": "temperature_stddev_5yr",
+    "Heatwave_Days_PerYear": "heatwave_days_per_year",
+    "Flood_Risk_Index": "flood_risk_index",
+    "ENSO_Impact_Index": "enso_impact_index",
+    "Climate_Vulnerability_Index": "climate_vulnerability_index",
+    "Extreme_Rainfall_Days": "extreme_rainfall_days",
+    "Cyclone_Exposure": "cyclone_exposure",
+    "NearestRiver": "nearest_river",
+    "RiverDistance(km)": "river_distance_km",
+    "RiverFlowRate(m/day)": "river_flow_rate",
+    "NDVI_2025(avg)": "ndvi_2025_avg",
+    "Geological_Category": "rule_geological_category",
+    "Climatic_Category": "rule_climatic_category",
+    "Overall_Category": "rule_overall_category",
+}
+NDVI_COLUMNS = [f"{month} NDVI 2025" for month in NDVI_MONTHS]
+# Dam fields written by an import, besides the CSV_FIELDS ones
+IMPORT_FIELDS = list(CSV_FIELDS.values()) + ["ndvi_2025_monthly", "position"]
+
+# Dam fields behind REQUIRED_FIELDS, in response order
+API_FIELDS = [CSV_FIELDS[column] for column in REQUIRED_FIELDS]
+
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+# First search radius of a k-nearest query without radius_km
+INITIAL_SEARCH_KM = 25.0
+# Last-Modified of an empty table
+EPOCH = datetime.fromtimestamp(0, tz=dt_timezone.utc)
+
+
+class DamImportError(ValueError):
+    """The CSV cannot be imported (missing key columns or duplicate dams)"""
+
+
+# ------------------------------------------------------
+# Import
+# ------------------------------------------------------
+def _converter(field_name):
+    field = Dam._meta.get_field(field_name)
+    if isinstance(field, models.FloatField):
+
+        def convert(value):
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return None
+            return None if value != value else value
+
+    else:
+
+        def convert(value):
+            if value is None or (isinstance(value, float) and value != value):
+                return ""
+            return str(value)
+
+    return convert
+
+
+def read_records(path=DAMS_CSV_PATH):
+    """Dam field dicts for the rows of the CSV, in file order"""
+    df = columnar.read_dataframe(path)
+    missing = [c for c in ("Name", "Latitude", "Longitude") if c not in df.columns]
+    if missing:
+        raise DamImportError(f"Missing columns: {', '.join(missing)}")
+
+    columns = {}
+    for column, field_name in CSV_FIELDS.items():
+        if column in df.columns:
+            columns[field_name] = list(map(_converter(field_name), df[column]))
+    ndvi = [
+        (
+            list(map(_converter("ndvi_2025_avg"), df[column]))
+            if column in df.columns
+            else [None] * len(df)
+        )
+        for column in NDVI_COLUMNS
+    ]
+    has_ndvi = any(column in df.columns for column in NDVI_COLUMNS)
+
+    records = []
+    for i in range(len(df)):
+        record = {name: values[i] for name, values in columns.items()}
+        record["ndvi_2025_monthly"] = [month[i] for month in ndvi] if has_ndvi else []
+        record["position"] = i
+        if record["latitude"] is None or record["longitude"] is None:
+            raise DamImportError(f"Row {i + 2}: '{record['name']}' has no coordinates")
+        records.append(record)
+    return records
+
+
+def import_dams(path=DAMS_CSV_PATH, batch_size=500, prune=False):
+    """
+    Upsert the CSV into the Dam table; returns counts of created, updated,
+    unchanged and deleted dams. ``prune`` deletes dams the CSV does not list.
+    """
+    with CSV_LOAD_DURATION.time("import"):
+        records = read_records(path)
+    by_key = {}
+    for record in records:
+        key = (record["name"], record.get("district", ""))
+        if key in by_key:
+            raise DamImportError(f"Duplicate dam {key[0]!r} in district {key[1]!r}")
+        by_key[key] = record
+    fields = [f for f in IMPORT_FIELDS if records and f in records[0]]
+
+    now = timezone.now()
+    created, changed, unchanged = [], [], 0
+    with transaction.atomic():
+        existing = {
+            (row["name"], row["district"]): row
+            for row in Dam.objects.values(*dict.fromkeys(["pk", "district", *fields]))
+        }
+        for key, record in by_key.items():
+            row = existing.pop(key, None)
+            if row is None:
+                created.append(Dam(**record))
+            elif any(row[f] != record[f] for f in fields):
+                changed.append(Dam(pk=row["pk"], updated_at=now, **record))
+            else:
+                unchanged += 1
+
+        Dam.objects.bulk_create(created, batch_size=batch_size)
+        Dam.objects.bulk_update(changed, fields + ["updated_at"], batch_size=batch_size)
+        deleted = 0
+        if prune and existing:
+            stale = [row["pk"] for row in existing.values()]
+            for start in range(0, len(stale), batch_size):
+                deleted += Dam.objects.filter(
+                    pk__in=stale[start : start + batch_size]
+                ).delete()[0]
+    # Bulk operations send no signals
+    invalidate_version()
+
+    counts = dict(
+        created=len(created), updated=len(changed), unchanged=unchanged, deleted=deleted
+    )
+    logger.info(f"Imported {path}: {counts}")
+    return counts
+
+
+# ------------------------------------------------------
+# Queries
+# ------------------------------------------------------
+def _version(stats):
+    """(etag, last_modified) of the table from its row count and newest update"""
+    last_modified = stats["last_modified"] or EPOCH
+    digest = hashlib.sha256(
+        f"{stats['count']}:{last_modified.isoformat()}".encode()
+    ).hexdigest()[:32]
+    return f'"{digest}"', last_modified
+
+
+# (checked_at, (etag, last_modified)) of the last version query
+_version_cache = (0.0, None)
+
+
+def _recent_version():
+    checked_at, version = _version_cache
+    interval = getattr(settings, "DAMS_VERSION_CHECK_INTERVAL", 2)
+    if version is not None and time.monotonic() - checked_at < interval:
+        return version
+    return None
+
+
+def _remember(version):
+    global _version_cache
+    _version_cache = (time.monotonic(), version)
+    return version
+
+
+def invalidate_version(**kwargs):
+    """Forget the cached table version (on writes made by this process)"""
+    global _version_cache
+    _version_cache = (0.0, None)
+
+
+def table_version():
+    """
+    (etag, last_modified) of the Dam table. Queried at most every
+    ``DAMS_VERSION_CHECK_INTERVAL`` seconds, so imports run by another
+    process show up after that delay; writes in this process at once.
+    """
+    return _recent_version() or _remember(
+        _version(
+            Dam.objects.aggregate(count=Count("pk"), last_modified=Max("updated_at"))
+        )
+    )
+
+
+async def atable_version():
+    return _recent_version() or _remember(
+        _version(
+            await Dam.objects.aaggregate(
+                count=Count("pk"), last_modified=Max("updated_at")
+            )
+        )
+    )
+
+
+post_save.connect(invalidate_version, sender=Dam)
+post_delete.connect(invalidate_version, sender=Dam)
+
+
+def ordered(queryset):
+    """Dataset order; dams added by hand come after the imported ones"""
+    return queryset.order_by(F("position").asc(nulls_last=True), "pk")
+
+
+def api_rows(queryset):
+    """REQUIRED_FIELDS tuples of ``queryset``"""
+    return queryset.values_list(*API_FIELDS)
+
+
+def as_dict(row):
+    return dict(zip(REQUIRED_FIELDS, row))
+
+
+# Wire formats of the full listing (?format=)
+LISTING_FORMATS = ("rows", "columnar")
+
+
+class DamListing:
+    """
+    One version of the full listing: the serialized bodies of /api/dams_csv/
+    (each format, uncompressed and precompressed) and the in-memory indexes
+    behind its filtered queries
+    """
+
+    def __init__(self, etag, rows, pks, positions):
+        self.etag = etag
+        self.bodies = {
+            "rows": encoding.variants(json.dumps(rows).encode("utf-8")),
+            "columnar": encoding.variants(encoding.columnar(rows, REQUIRED_FIELDS)),
+        }
+        self.index = DamIndex(rows, pks, positions)
+
+    def body(self, fmt, coding):
+        """The ``fmt`` body in ``coding`` (one of encoding.variants' keys)"""
+        return self.bodies[fmt][coding]
+
+
+# Listing of the last table version seen, swapped as a single reference
+_listing = None
+
+
+def cached_listing(etag):
+    """The DamListing built for ``etag``, or None"""
+    listing = _listing
+    return listing if listing is not None and listing.etag == etag else None
+
+
+def build_listing(etag):
+    """Read every dam (dataset order) and remember the listing under ``etag``"""
+    global _listing
+    queryset = ordered(Dam.objects.all()).values_list("pk", "position", *API_FIELDS)
+    rows, pks, positions = [], [], []
+    for pk, position, *values in queryset:
+        rows.append(as_dict(values))
+        pks.append(pk)
+        positions.append(position)
+    _listing = DamListing(etag, rows, pks, positions)
+    return _listing
+
+
+def _box_filter(min_lat, min_lon, max_lat, max_lon):
+    lat = Q(latitude__gte=min_lat, latitude__lte=max_lat)
+    if min_lon <= max_lon:
+        return lat & Q(longitude__gte=min_lon, longitude__lte=max_lon)
+    # Box crosses the antimeridian
+    return lat & (Q(longitude__gte=min_lon) | Q(longitude__lte=max_lon))
+
+
+def bbox(min_lat, min_lon, max_lat, max_lon):
+    """Dam rows inside the box, in dataset order"""
+    queryset = Dam.objects.filter(_box_filter(min_lat, min_lon, max_lat, max_lon))
+    return [as_dict(row) for row in api_rows(ordered(queryset))]
+
+
+def haversine_km(lat, lon, lats, lons):
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = (
+        np.sin((lats - lat) / 2) ** 2
+        + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _within(lat, lon, radius_km):
+    """
+    (pks, distances) of dams at most radius_km away, in dataset order. Only
+    pk and coordinates are read, from the box around the circle.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = lat - dlat, lat + dlat
+    queryset = Dam.objects.all()
+    if min_lat > -90 and max_lat < 90:
+        # Widest longitude span of the circle, reached at its highest latitude
+        edge = np.radians(max(abs(min_lat), abs(max_lat)))
+        dlon = dlat / np.cos(edge)
+        if dlon < 180:
+            lons = ((lon - dlon + 180) % 360 - 180, (lon + dlon + 180) % 360 - 180)
+            queryset = queryset.filter(_box_filter(min_lat, lons[0], max_lat, lons[1]))
+        else:
+            queryset = queryset.filter(latitude__gte=min_lat, latitude__lte=max_lat)
+    elif min_lat > -90 or max_lat < 90:
+        queryset = queryset.filter(latitude__gte=min_lat, latitude__lte=max_lat)
+
+    points = np.array(
+        ordered(queryset).values_list("pk", "latitude", "longitude"), dtype=float
+    ).reshape(-1, 3)
+    distances = haversine_km(lat, lon, points[:, 1], points[:, 2])
+    inside = distances <= radius_km
+    return points[inside, 0].astype(np.int64), distances[inside]
+
+
+def nearby(lat, lon, radius_km=None, k=None):
+    """
+    [(row dict, distance_km), ...] sorted by distance: all dams within
+    ``radius_km``, or the ``k`` nearest (optionally capped by ``radius_km``).
+    """
+    if radius_km is None:
+        # Widen the search circle until it holds k dams, or the whole globe
+        radius = INITIAL_SEARCH_KM
+        while True:
+            pks, distances = _within(lat, lon, radius)
+            if len(pks) >= k or radius >= np.pi * EARTH_RADIUS_KM:
+                break
+            radius *= 4
+    else:
+        pks, distances = _within(lat, lon, radius_km)
+
+    order = np.argsort(distances, kind="stable")
+    if k is not None:
+        order = order[:k]
+    pks = pks[order].tolist()
+    rows = {
+        row[0]: row[1:]
+        for row in Dam.objects.filter(pk__in=pks).values_list("pk", *API_FIELDS)
+    }
+    return [(as_dict(rows[pk]), float(distances[i])) for pk, i in zip(pks, order)]
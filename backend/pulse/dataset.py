@@ -0,0 +1,183 @@
+"""
+In-memory cache of the Dams_Gujarat.csv dataset, used by the suitability
+tiles (see pulse.tiles). The /api/dams* endpoints read the Dam table that
+``manage.py load_dams`` fills from the same file (see pulse.dams).
+
+Rows are built from the typed columnar copy of the CSV (see ``columnar``).
+Each access costs one ``os.stat``; the data is only reloaded when the file's
+mtime or size changes, and only rebuilt when its content hash changes.
+"""
+
+import csv
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import columnar
+
+from .metrics import CSV_LOAD_DURATION
+from .spatial import DamSpatialIndex
+
+logger = logging.getLogger(__name__)
+
+DAMS_CSV_PATH = Path(__file__).resolve().parent.parent / "Dams_Gujarat.csv"
+
+# Fields returned to the frontend, in response order
+REQUIRED_FIELDS = [
+    "Name",
+    "Latitude",
+    "Longitude",
+    "Purpose",
+    "River",
+    "Nearest City",
+    "District",
+    "Elevation",
+    "Type",
+    "Length (m)",
+    "Max Height above Foundation (m)",
+    "Geological_Suitability_Score",
+    "Climatic_Effect_Score",
+    "Overall_Suitability_Score",
+    "Geological_Suitability_Category",
+    "Climatic_Effect_Category",
+    "Overall_Suitability_Category",
+    "NearestRiver",
+    "RiverDistance(km)",
+    "RiverFlowRate(m/day)",
+]
+
+NUMERIC_FIELDS = [
+    "Latitude",
+    "Longitude",
+    "Elevation",
+    "Length (m)",
+    "Max Height above Foundation (m)",
+    "Geological_Suitability_Score",
+    "Climatic_Effect_Score",
+    "Overall_Suitability_Score",
+    "RiverDistance(km)",
+    "RiverFlowRate(m/day)",
+]
+
+
+def parse_dams_csv(text):
+    """Parse CSV text into a list of dicts holding only REQUIRED_FIELDS"""
+    dams = []
+    for row in csv.DictReader(io.StringIO(text, newline="")):
+        dam_data = {field: row.get(field, None) for field in REQUIRED_FIELDS}
+        for numeric_field in NUMERIC_FIELDS:
+            if dam_data[numeric_field]:
+                try:
+                    dam_data[numeric_field] = float(dam_data[numeric_field])
+                except ValueError:
+                    dam_data[numeric_field] = None
+        dams.append(dam_data)
+    return dams
+
+
+def _parse_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _field_values(table, field):
+    """One REQUIRED_FIELDS column, with the same values parse_dams_csv yields"""
+    if field not in table:
+        return [None] * table.num_rows
+    if table.kind(field) == "numeric":
+        if field not in NUMERIC_FIELDS:
+            # The original text (e.g. "007") cannot be recovered from a number
+            raise ValueError(f"Text column '{field}' was stored as numeric")
+        return ["" if v != v else v for v in table.raw(field).astype(float).tolist()]
+    lookup = table.dictionary(field)
+    if field in NUMERIC_FIELDS:
+        lookup = [_parse_float(v) for v in lookup]
+    # Code -1 is an empty cell, which csv.DictReader reports as ""
+    lookup = lookup + [""]
+    return [lookup[code] for code in table.raw(field).tolist()]
+
+
+def rows_from_table(table):
+    """Build the dams_csv rows from a columnar.ColumnarTable"""
+    columns = [_field_values(table, field) for field in REQUIRED_FIELDS]
+    return [dict(zip(REQUIRED_FIELDS, values)) for values in zip(*columns)]
+
+
+class DamsSnapshot:
+    """One immutable parsed version of the dataset"""
+
+    def __init__(self, rows, version, last_modified):
+        self.rows = rows
+        self.spatial_index = DamSpatialIndex(rows)
+        self.version = version
+        self.etag = f'"{version}"'
+        self.last_modified = last_modified
+
+
+class DamsDataset:
+    """
+    Lazily loaded, self-invalidating view of the dams CSV.
+
+    ``get()`` returns the current DamsSnapshot, reloading it when the file's
+    (mtime, size) changes and re-parsing only if the content hash differs.
+    Snapshots are replaced atomically, so readers never see a partial load.
+    """
+
+    def __init__(self, path=DAMS_CSV_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        # (stat key, snapshot) swapped as a single reference
+        self._current = (None, None)
+
+    def get(self):
+        stat = os.stat(self.path)
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        current_key, snapshot = self._current
+        if snapshot is not None and stat_key == current_key:
+            return snapshot
+
+        with self._lock:
+            current_key, snapshot = self._current
+            if snapshot is not None and stat_key == current_key:
+                return snapshot
+            rows = None
+            start = time.perf_counter()
+            try:
+                table = columnar.open_table(self.path)
+                version = table.version[:32]
+                if snapshot is None or snapshot.version != version:
+                    rows = rows_from_table(table)
+            except (OSError, ValueError) as e:
+                # Cache not writable, or a column it cannot represent exactly
+                logger.warning(f"Columnar cache unavailable for {self.path}: {e}")
+                raw = self.path.read_bytes()
+                version = hashlib.sha256(raw).hexdigest()[:32]
+                if snapshot is None or snapshot.version != version:
+                    rows = parse_dams_csv(raw.decode("utf-8"))
+
+            if rows is not None:
+                CSV_LOAD_DURATION.observe(time.perf_counter() - start, "dataset")
+                snapshot = DamsSnapshot(
+                    rows=rows,
+                    version=version,
+                    last_modified=datetime.fromtimestamp(
+                        stat.st_mtime, tz=timezone.utc
+                    ),
+                )
+                logger.info(f"Loaded {len(rows)} dams from {self.path} ({version})")
+            self._current = (stat_key, snapshot)
+            return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._current = (None, None)
+
+
+dams_dataset = DamsDataset()
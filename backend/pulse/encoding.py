@@ -0,0 +1,115 @@
+"""
+Wire formats of the full dam listing.
+
+``columnar`` lays the rows out as one array per field instead of one object
+per dam, so field names are sent once; low-cardinality strings (District,
+Type, the categories, ...) are dictionary-encoded as distinct values plus
+one small integer per dam:
+
+    {
+      "count": 505,
+      "fields": ["Name", "Latitude", ...],
+      "columns": {
+        "Name": ["Aamli Chharchhoda Dam", ...],
+        "District": {"values": ["Dahod", "Amreli", ...], "codes": [0, 1, ...]},
+        ...
+      }
+    }
+
+``variants`` compresses a body once per dataset version (gzip, and brotli
+when the ``brotli`` package is installed); ``negotiate`` picks the variant
+a request's Accept-Encoding prefers.
+"""
+
+import gzip
+import json
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are built
+    brotli = None
+
+# Strings shared by many dams, sent once per distinct value
+DICTIONARY_FIELDS = [
+    "Purpose",
+    "Nearest City",
+    "District",
+    "Type",
+    "Geological_Suitability_Category",
+    "Climatic_Effect_Category",
+    "Overall_Suitability_Category",
+    "NearestRiver",
+]
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+IDENTITY = "identity"
+# Preferred first when Accept-Encoding ranks several codings equally
+CODINGS = ["br", "gzip", IDENTITY]
+# Codings ``variants`` builds in this process
+AVAILABLE = [c for c in CODINGS if c != "br" or brotli is not None]
+
+
+def columnar(rows, fields):
+    """Serialized columnar payload of ``rows`` (dicts holding ``fields``)"""
+    columns = {}
+    for field in fields:
+        values = [row[field] for row in rows]
+        if field in DICTIONARY_FIELDS:
+            lookup = {}
+            codes = [lookup.setdefault(value, len(lookup)) for value in values]
+            columns[field] = {"values": list(lookup), "codes": codes}
+        else:
+            columns[field] = values
+    payload = {"count": len(rows), "fields": list(fields), "columns": columns}
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def variants(body):
+    """{coding: bytes} of ``body`` for every coding available here"""
+    encoded = {
+        IDENTITY: body,
+        "gzip": gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+    }
+    if brotli is not None:
+        encoded["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return encoded
+
+
+def _accepted(header):
+    """{coding: q} listed in an Accept-Encoding header"""
+    accepted = {}
+    for part in header.split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+
+def negotiate(header, available=AVAILABLE):
+    """
+    The coding of ``available`` that an Accept-Encoding ``header`` prefers;
+    identity when nothing else is acceptable.
+    """
+    accepted = _accepted(header or "")
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = IDENTITY, 0.0
+    for coding in CODINGS:
+        if coding == IDENTITY or coding not in available:
+            continue
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    # A compressed coding wins unless identity is explicitly ranked higher
+    if best_q < accepted.get(IDENTITY, best_q):
+        return IDENTITY
+    return best
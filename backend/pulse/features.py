@@ -0,0 +1,154 @@
+"""
+Feature assembly for the prediction endpoints.
+
+Maps frontend request fields onto the training feature columns of each model
+and writes the sanitized values straight into a NumPy row, so the request
+path does not build pandas objects. Artifacts saved with a feature pipeline
+(feature_pipeline.py) also get their target encodings and derived columns
+applied, exactly as in training.
+"""
+
+import numpy as np
+
+# Frontend field name → training feature name
+FEATURE_MAPPING = {
+    # Geo
+    "latitude": "Latitude",
+    "longitude": "Longitude",
+    "elevation": "Elevation",
+    "slope": "Slope(%)",
+    "mainSoilType": "SoilType_Main",
+    "secondarySoilType": "SoilType_Secondary",
+    "seismicZone": "Seismic_Zone",
+    "damType": "Type",
+    "length": "Length (m)",
+    "maxHeight": "Max Height above Foundation (m)",
+    "riverDistance": "RiverDistance(km)",
+    "riverFlowRate": "RiverFlowRate(m/day)",
+    # Climate
+    "rainfall2020": "Rainfall_2020",
+    "rainfall2021": "Rainfall_2021",
+    "rainfall2022": "Rainfall_2022",
+    "rainfall2023": "Rainfall_2023",
+    "rainfall2024": "Rainfall_2024",
+    "rainfall5YearAvg": "Rainfall_5yr_Avg",
+    "rainfallStdDev5yr": "Rainfall_StdDev_5yr",
+    "maxAnnualRainfall": "Max_Annual_Rainfall",
+    "minAnnualRainfall": "Min_Annual_Rainfall",
+    "monsoonIntensity": "MonsoonIntensityAvg(mm/wet_day)",
+    "extremeRainfallDays": "Extreme_Rainfall_Days",
+    "floodRiskIndex": "Flood_Risk_Index",
+    "cycloneExposure": "Cyclone_Exposure",
+    "avgTemperature5yr": "Avg_Temperature_5yr",
+    "maxTemperatureLast5yr": "Max_Temperature_Last5yr",
+    "temperatureStdDev5yr": "Temperature_StdDev_5yr",
+    "heatwaveDaysPerYear": "Heatwave_Days_PerYear",
+    "ensoImpactIndex": "ENSO_Impact_Index",
+    "climateVulnerabilityIndex": "Climate_Vulnerability_Index",
+    "ndvi2025": "NDVI_2025(avg)",
+}
+
+
+def sanitize_value(val):
+    """Convert 'Unknown' / blank / non-numeric input values to 0"""
+    try:
+        if isinstance(val, str) and (
+            val.strip().lower() == "unknown" or not val.strip()
+        ):
+            return 0
+        return float(val)
+    except Exception:
+        return 0
+
+
+def map_input_features(data):
+    """Map frontend keys to training feature names and sanitize the values"""
+    return {v: sanitize_value(data[k]) for k, v in FEATURE_MAPPING.items() if k in data}
+
+
+class FeatureRowBuilder:
+    """
+    Precompiled request → feature-row builder for one model.
+
+    Built once from the model's training feature list. The mapping from
+    request key to column index is resolved up front, so each request only
+    sanitizes the values it actually carries and writes them into a zeroed
+    row. Columns the request does not provide stay 0, matching the previous
+    ``reindex(fill_value=0)`` behaviour.
+    """
+
+    def __init__(self, features, mapping=FEATURE_MAPPING):
+        self.features = list(features)
+        column_index = {feature: i for i, feature in enumerate(self.features)}
+        self.slots = tuple(
+            (key, column_index[feature])
+            for key, feature in mapping.items()
+            if feature in column_index
+        )
+        self.n_features = len(self.features)
+
+    def build_row(self, data):
+        """Return a (1, n_features) float64 array for a single request"""
+        row = np.zeros((1, self.n_features))
+        values = row[0]
+        for key, idx in self.slots:
+            if key in data:
+                values[idx] = sanitize_value(data[key])
+        return row
+
+    def build_matrix(self, sites):
+        """Return an (n_sites, n_features) float64 array for many requests"""
+        matrix = np.zeros((len(sites), self.n_features))
+        for values, data in zip(matrix, sites):
+            for key, idx in self.slots:
+                if key in data:
+                    values[idx] = sanitize_value(data[key])
+        return matrix
+
+
+class PipelineRowBuilder:
+    """
+    Request → feature-row builder for artifacts saved with a FeaturePipeline.
+
+    Numeric request fields are sanitized into the pipeline's raw columns
+    (missing ones are 0, as with FeatureRowBuilder). Categorical fields keep
+    their text and go through the fitted target encodings, unseen values
+    getting the training mean. The pipeline then adds the derived columns and
+    puts everything in the model's column order. Single rows and batches run
+    the same vectorized transform.
+    """
+
+    def __init__(self, pipeline, mapping=FEATURE_MAPPING):
+        self.pipeline = pipeline
+        self.features = pipeline.features
+        self.n_features = len(self.features)
+        raw_index = {column: i for i, column in enumerate(pipeline.raw_columns)}
+        self.slots = tuple(
+            (key, raw_index[column])
+            for key, column in mapping.items()
+            if column in raw_index
+        )
+        keys = {column: key for key, column in mapping.items()}
+        self.category_keys = tuple(
+            (column, keys.get(column)) for column in pipeline.categorical
+        )
+
+    def build_row(self, data):
+        """Return a (1, n_features) float64 array for a single request"""
+        return self.build_matrix([data])
+
+    def build_matrix(self, sites):
+        """Return an (n_sites, n_features) float64 array for many requests"""
+        raw = np.zeros((len(sites), len(self.pipeline.raw_columns)))
+        for values, data in zip(raw, sites):
+            for key, idx in self.slots:
+                if key in data:
+                    values[idx] = sanitize_value(data[key])
+        columns = {
+            column: raw[:, i] for i, column in enumerate(self.pipeline.raw_columns)
+        }
+        categories = {
+            column: [site.get(key) if key else None for site in sites]
+            for column, key in self.category_keys
+        }
+        return self.pipeline.transform_columns(columns, categories)
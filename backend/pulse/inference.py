@@ -0,0 +1,144 @@
+"""
+Bounded thread pool and admission control for model inference.
+
+Predictions are CPU-bound, so running them on the event loop would stall
+every other request on that worker. ``run_inference`` hands them to a
+fixed pool of ``INFERENCE_EXECUTOR_WORKERS`` threads instead (NumPy and
+sklearn release the GIL for most of the work); excess calls queue for a
+free thread rather than each getting their own. The pool is created on
+first use.
+
+Every prediction of the process, from the async pool or a sync view, also
+passes the ``InferenceGate``: at most ``INFERENCE_MAX_CONCURRENCY`` run at
+once and up to ``INFERENCE_MAX_QUEUE`` more wait. Beyond that a request is
+refused at once with InferenceOverloaded (the views answer 503 with
+Retry-After), so under overload the admitted requests keep a bounded
+latency instead of everyone queueing behind everyone else.
+"""
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .metrics import REJECTED
+
+_executor = None
+_gate = None
+_lock = threading.Lock()
+
+
+class InferenceOverloaded(Exception):
+    """Every inference slot is busy and the wait queue is full"""
+
+    def __init__(self, retry_after):
+        super().__init__("Inference is overloaded, retry later")
+        self.retry_after = retry_after
+
+
+class InferenceGate:
+    """
+    At most ``limit`` predictions run at once; up to ``queue`` more callers
+    wait for a slot and the rest are refused.
+    """
+
+    def __init__(self, limit, queue, retry_after=1):
+        self.limit = limit
+        self.queue = queue
+        self.retry_after = retry_after
+        self._slots = threading.Semaphore(limit)
+        self._lock = threading.Lock()
+        # Callers running or waiting
+        self._admitted = 0
+
+    def admit(self, wait=False):
+        """
+        Count a caller in, or raise InferenceOverloaded when the queue is
+        full. With ``wait`` the caller is never refused (work already
+        under way, such as the later chunks of a streamed upload).
+        """
+        with self._lock:
+            if not wait and self._admitted >= self.limit + self.queue:
+                REJECTED.inc("inference", "overloaded")
+                raise InferenceOverloaded(self.retry_after)
+            self._admitted += 1
+
+    def check(self):
+        """Raise InferenceOverloaded if a new caller would be refused now"""
+        with self._lock:
+            if self._admitted >= self.limit + self.queue:
+                REJECTED.inc("inference", "overloaded")
+                raise InferenceOverloaded(self.retry_after)
+
+    def leave(self):
+        with self._lock:
+            self._admitted -= 1
+
+    def run(self, fn, *args):
+        """fn(*args) once a slot is free; the caller must be admitted"""
+        with self._slots:
+            return fn(*args)
+
+    @contextmanager
+    def slot(self, wait=False):
+        """Admit, hold a slot for the block, then leave"""
+        self.admit(wait)
+        try:
+            with self._slots:
+                yield
+        finally:
+            self.leave()
+
+    def stats(self):
+        with self._lock:
+            admitted = self._admitted
+        return {"limit": self.limit, "queue": self.queue, "admitted": admitted}
+
+
+def inference_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "INFERENCE_EXECUTOR_WORKERS", 2),
+                    thread_name_prefix="inference",
+                )
+    return _executor
+
+
+def inference_gate():
+    global _gate
+    if _gate is None:
+        with _lock:
+            if _gate is None:
+                workers = getattr(settings, "INFERENCE_EXECUTOR_WORKERS", 2)
+                _gate = InferenceGate(
+                    limit=getattr(settings, "INFERENCE_MAX_CONCURRENCY", workers),
+                    queue=getattr(settings, "INFERENCE_MAX_QUEUE", 16),
+                    retry_after=getattr(settings, "INFERENCE_RETRY_AFTER", 1),
+                )
+    return _gate
+
+
+async def run_inference(fn, *args):
+    """
+    Run fn(*args) on the inference pool and await its result; raises
+    InferenceOverloaded when the gate's queue is full. Context variables
+    (such as the request's stage timer) carry over to the thread.
+    """
+    context = contextvars.copy_context()
+    gate = inference_gate()
+    gate.admit()
+    try:
+        future = inference_executor().submit(context.run, gate.run, fn, *args)
+    except BaseException:
+        gate.leave()
+        raise
+    # Leave once the work is done, not when the caller stops waiting: a
+    # cancelled request's prediction keeps its slot until it finishes
+    future.add_done_callback(lambda _: gate.leave())
+    return await asyncio.wrap_future(future)
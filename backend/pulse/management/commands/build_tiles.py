@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pulse.tiles import tile_service
+
+
+class Command(BaseCommand):
+    help = "Score the suitability grid for the active models and pre-render its tiles"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--no-prerender",
+            action="store_true",
+            help="Only build the score grids; tiles render on first request",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Scoring processes (default: TILES_WORKERS)",
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"]:
+            tile_service.workers = options["workers"]
+        try:
+            tile_set, scored = tile_service.build(prerender=not options["no_prerender"])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        manifest = tile_set.manifest
+        self.stdout.write(
+            f"Tile set {tile_set.key}: grid {manifest['shape'][0]}x{manifest['shape'][1]}, "
+            f"zoom {tile_set.min_zoom}-{tile_set.max_zoom}, "
+            f"rescored: {', '.join(scored) or 'none (cached)'}"
+        )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pulse.dams import DamImportError, import_dams
+from pulse.dataset import DAMS_CSV_PATH
+
+
+class Command(BaseCommand):
+    help = "Load or upsert Dams_Gujarat.csv into the Dam table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "csv", nargs="?", default=str(DAMS_CSV_PATH), help="CSV file to load"
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Delete dams that are not in the CSV",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            counts = import_dams(
+                options["csv"], batch_size=options["batch_size"], prune=options["prune"]
+            )
+        except (DamImportError, OSError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Dams: {created} created, {updated} updated, "
+                "{unchanged} unchanged, {deleted} deleted".format(**counts)
+            )
+        )
@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from pulse.outbox import deliver_pending
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails (once, or continuously with --loop)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling for due emails instead of exiting",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=getattr(settings, "OUTBOX_POLL_INTERVAL", 30),
+            help="Seconds between polls with --loop",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent = deliver_pending()
+            self.stdout.write(f"Sent {sent} email(s)")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pulse.bulk import FORMATS, BulkScorer, BulkScoringError
+from pulse.registry import model_registry
+
+
+class Command(BaseCommand):
+    help = "Score a CSV of candidate sites (Dams_Gujarat.csv layout) in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="CSV file to score")
+        parser.add_argument(
+            "--output",
+            "-o",
+            help="Write results to this file instead of stdout",
+        )
+        parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+        parser.add_argument(
+            "--chunk-rows",
+            type=int,
+            default=None,
+            help="Rows per chunk (default: BULK_SCORE_CHUNK_ROWS)",
+        )
+
+    def handle(self, *args, **options):
+        geo = model_registry.get("geological")
+        if geo is None:
+            raise CommandError("Geological model not loaded")
+        clim = model_registry.get("climatic")
+        if clim is None:
+            self.stderr.write("Climate model not loaded, skipping climate prediction")
+
+        scorer = BulkScorer(geo, clim, chunk_rows=options["chunk_rows"])
+        try:
+            chunks = scorer.read(options["input"])
+        except (BulkScoringError, OSError) as e:
+            raise CommandError(str(e))
+
+        out = (
+            open(options["output"], "w", encoding="utf-8", newline="")
+            if options["output"]
+            else None
+        )
+        try:
+            for part in scorer.stream(chunks, options["format"]):
+                if out:
+                    out.write(part)
+                else:
+                    self.stdout.write(part, ending="")
+        finally:
+            if out:
+                out.close()
+        versions = ", ".join(f"{k}={v}" for k, v in scorer.model_versions().items())
+        self.stderr.write(f"Scored {options['input']} ({versions})")
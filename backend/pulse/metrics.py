@@ -0,0 +1,466 @@
+"""
+In-process metrics: counters and fixed-bucket histograms, served at
+/api/metrics in the Prometheus text exposition format.
+
+Recording is cheap: an observation is one bisect over the bucket bounds and
+a few additions under the metric's lock. Views are timed by
+pulse.middleware.MetricsMiddleware; model inference, CSV loads and email
+sends are timed where they happen.
+
+Several worker processes each keep their own values. With ``METRICS_DIR``
+set, every process writes a snapshot of them to ``<METRICS_DIR>/<pid>-<token>
+.json`` every ``METRICS_FLUSH_INTERVAL`` seconds (and at exit), replacing the
+file atomically; /api/metrics sums the snapshots of all processes with the
+live values of the one answering. A registry reads ``METRICS_DIR`` once, on
+first use, and keeps writing there. A forked child starts from zero under a
+new file name.
+
+The snapshot of a process that has exited is folded into the snapshot of
+the process collecting (it claims the file by renaming it, so no other
+process counts it twice), so totals never go backwards and the directory
+holds about one file per live process. Liveness is checked on POSIX only;
+elsewhere files of exited processes stay and are still summed.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+import weakref
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds (and bytes) of the histogram buckets; +Inf is implied
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SIZE_BUCKETS = tuple(256 * 4**i for i in range(10))  # 256 B .. 64 MiB
+COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_UNSET = object()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        # label values tuple -> value(s)
+        self._values = {}
+        self._registry = registry if registry is not None else metrics_registry
+        self._registry.register(self)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), self._copy(v)] for labels, v in self._values.items()]
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+
+class Counter(_Metric):
+    """Monotonic total per label set (names end in _total)"""
+
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+        self._registry.changed()
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    @staticmethod
+    def merge(total, value):
+        return (total or 0) + value
+
+    def samples(self, labels, value):
+        yield self.name, (labels, value)
+
+
+class Histogram(_Metric):
+    """Observation counts per bucket, plus their sum, per label set"""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, **kw
+    ):
+        self.buckets = tuple(float(b) for b in buckets)
+        super().__init__(name, documentation, labelnames, **kw)
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                # One slot per bucket, one for +Inf, then the sum
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[i] += 1
+            counts[-1] += value
+        self._registry.changed()
+
+    def time(self, *labels):
+        """Context manager observing the duration of its block"""
+        return _Timer(self, labels)
+
+    @staticmethod
+    def _copy(value):
+        return list(value)
+
+    def merge(self, total, value):
+        if len(value) != len(self.buckets) + 2:
+            return total  # written with other bucket bounds
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def samples(self, labels, value):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), value):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _format(bound)
+            yield f"{self.name}_bucket", (labels + (("le", le),), cumulative)
+        yield f"{self.name}_sum", (labels, value[-1])
+        yield f"{self.name}_count", (labels, cumulative)
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by another user
+    return True
+
+
+def _format(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# ------------------------------------------------------
+# Registry
+# ------------------------------------------------------
+class MetricsRegistry:
+    """
+    The metrics of this process, their snapshot file and the exposition of
+    every process's values.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        # {name: {label values tuple: value}} folded in from exited processes
+        self._retired = {}
+        self._directory = _UNSET
+        self._dirty = False
+        self._writer = None
+        self._lock = threading.Lock()
+        # Serializes snapshot file writes and changes to _retired
+        self._flush_lock = threading.Lock()
+        self._token = uuid.uuid4().hex[:8]
+        ref = weakref.ref(self)
+
+        def after_fork():
+            registry = ref()
+            if registry is not None:
+                registry._after_fork()
+
+        os.register_at_fork(after_in_child=after_fork)
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+
+    def changed(self):
+        self._dirty = True
+        if self._writer is None:
+            self._start_writer()
+
+    def snapshot(self):
+        """
+        {name: [[label values, value], ...]} of this process, including the
+        exited processes it has taken over
+        """
+        snapshot = {}
+        for name, metric in self._metrics.items():
+            entries = metric.snapshot()
+            retired = self._retired.get(name)
+            if retired:
+                totals = dict(retired)
+                for labels, value in entries:
+                    labels = tuple(labels)
+                    merged = metric.merge(totals.get(labels), value)
+                    if merged is not None:
+                        totals[labels] = merged
+                entries = [[list(labels), value] for labels, value in totals.items()]
+            snapshot[name] = entries
+        return snapshot
+
+    def reset(self):
+        for metric in self._metrics.values():
+            metric.reset()
+        self._retired = {}
+        self._dirty = False
+
+    # -------- Per-process snapshot files --------
+    def directory(self):
+        """METRICS_DIR as it was when this registry was first used"""
+        if self._directory is _UNSET:
+            directory = _setting("METRICS_DIR", None)
+            self._directory = Path(directory) if directory else None
+        return self._directory
+
+    def file_name(self):
+        return f"{os.getpid()}-{self._token}.json"
+
+    def flush(self):
+        """Write this process's snapshot (if anything changed since the last)"""
+        directory = self.directory()
+        if directory is None or not self._dirty:
+            return
+        with self._flush_lock:
+            self._dirty = False
+            try:
+                directory.mkdir(parents=True, exist_ok=True)
+                path = directory / self.file_name()
+                tmp = path.with_name(f".{path.name}.tmp")
+                tmp.write_text(json.dumps(self.snapshot()), encoding="utf-8")
+                os.replace(tmp, path)
+            except OSError as e:
+                self._dirty = True
+                logger.warning(f"Writing metrics to {directory} failed: {e}")
+
+    def _start_writer(self):
+        with self._lock:
+            if self._writer is not None:
+                return
+            if self.directory() is None:
+                self._writer = False  # single process: nothing to write
+                return
+            self._writer = threading.Thread(
+                target=self._run_writer, name="metrics-writer", daemon=True
+            )
+            self._writer.start()
+            atexit.register(self.flush)
+        self.retire_exited()
+
+    def _run_writer(self):
+        interval = _setting("METRICS_FLUSH_INTERVAL", 1)
+        while True:
+            time.sleep(interval)
+            self.flush()
+
+    def retire_exited(self):
+        """Fold the snapshots of exited processes into this one's"""
+        directory = self.directory()
+        if directory is None or os.name != "posix" or not directory.is_dir():
+            return
+        claimed_files = []
+        for path in directory.glob("*.json"):
+            pid, _, _ = path.name.partition("-")
+            if not pid.isdigit() or _alive(int(pid)):
+                continue
+            claimed = path.with_name(f".{path.name}.{os.getpid()}.retiring")
+            try:
+                os.rename(path, claimed)  # fails if another process got it
+            except OSError:
+                continue
+            claimed_files.append(claimed)
+            try:
+                snapshot = json.loads(claimed.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            with self._flush_lock:
+                # Replaced, not updated in place: snapshot() reads it unlocked
+                retired = {name: dict(v) for name, v in self._retired.items()}
+                for name, entries in snapshot.items():
+                    metric = self._metrics.get(name)
+                    if metric is None:
+                        continue
+                    totals = retired.setdefault(name, {})
+                    for labels, value in entries:
+                        labels = tuple(labels)
+                        merged = metric.merge(totals.get(labels), value)
+                        if merged is not None:
+                            totals[labels] = merged
+                self._retired = retired
+                self._dirty = True
+        if claimed_files:
+            self.flush()
+            for claimed in claimed_files:
+                claimed.unlink(missing_ok=True)
+
+    def _after_fork(self):
+        # The child drops the values and writer thread inherited from the
+        # parent: it starts from zero and writes its own snapshot
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._writer = None
+        self._token = uuid.uuid4().hex[:8]
+        for metric in self._metrics.values():
+            metric._lock = threading.Lock()
+        self.reset()
+
+    # -------- Exposition --------
+    def collect(self):
+        """{name: {label values: value}} summed over every process"""
+        self.retire_exited()
+        snapshots = [self.snapshot()]
+        directory = self.directory()
+        if directory is not None and directory.is_dir():
+            own = self.file_name()
+            for path in directory.glob("*.json"):
+                if path.name == own:
+                    continue
+                try:
+                    snapshots.append(json.loads(path.read_text(encoding="utf-8")))
+                except (OSError, ValueError):
+                    continue  # removed, or not a snapshot
+
+        totals = {name: {} for name in self._metrics}
+        for snapshot in snapshots:
+            for name, entries in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                for labels, value in entries:
+                    labels = tuple(labels)
+                    merged = metric.merge(totals[name].get(labels), value)
+                    if merged is not None:
+                        totals[name][labels] = merged
+        return totals
+
+    def render(self):
+        """Prometheus text exposition of every metric"""
+        lines = []
+        for name, values in self.collect().items():
+            metric = self._metrics[name]
+            lines.append(f"# HELP {name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for labels in sorted(values):
+                pairs = tuple(zip(metric.labelnames, labels))
+                for sample, (sample_labels, value) in metric.samples(
+                    pairs, values[labels]
+                ):
+                    text = ",".join(f'{k}="{_escape(v)}"' for k, v in sample_labels)
+                    text = f"{{{text}}}" if text else ""
+                    lines.append(f"{sample}{text} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+# ------------------------------------------------------
+# Metrics
+# ------------------------------------------------------
+REQUEST_DURATION = Histogram(
+    "pulse_http_request_duration_seconds",
+    "Time from request to response, per view",
+    ["view", "method"],
+)
+REQUESTS = Counter(
+    "pulse_http_requests_total",
+    "Responses sent, per view and status code",
+    ["view", "method", "status"],
+)
+REQUEST_SIZE = Histogram(
+    "pulse_http_request_size_bytes",
+    "Request body size (Content-Length), per view",
+    ["view"],
+    buckets=SIZE_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "pulse_http_response_size_bytes",
+    "Response body size, per view (streamed responses are not counted)",
+    ["view"],
+    buckets=SIZE_BUCKETS,
+)
+INFERENCE_DURATION = Histogram(
+    "pulse_inference_duration_seconds",
+    "Model predict() time per call, per model",
+    ["model"],
+)
+INFERENCE_ROWS = Counter(
+    "pulse_inference_rows_total", "Feature rows scored, per model", ["model"]
+)
+INFERENCE_ERRORS = Counter(
+    "pulse_inference_errors_total", "Failed predict() calls, per model", ["model"]
+)
+CSV_LOAD_DURATION = Histogram(
+    "pulse_csv_load_duration_seconds",
+    "Time to load the dams CSV, per consumer",
+    ["source"],
+)
+EMAIL_SEND_DURATION = Histogram(
+    "pulse_email_send_duration_seconds", "Time to send one outbox email"
+)
+EMAILS = Counter("pulse_emails_total", "Outbox send attempts, per result", ["result"])
+REJECTED = Counter(
+    "pulse_rejected_requests_total",
+    "Requests refused by rate limiting or inference admission",
+    ["scope", "reason"],
+)
+FORM_BATCH_SIZE = Histogram(
+    "pulse_form_batch_size",
+    "Form submissions written per write-behind flush",
+    buckets=COUNT_BUCKETS,
+)
+FORM_WRITE_DURATION = Histogram(
+    "pulse_form_write_duration_seconds",
+    "Time to write one batch of buffered form submissions",
+)
@@ -0,0 +1,108 @@
+"""
+Request metrics (see pulse.metrics) and Server-Timing (see pulse.timing)
+middleware.
+
+Both are sync- and async-capable, so under ASGI the async views are timed
+without a thread hop. Put them first in MIDDLEWARE so the durations include
+the rest of the middleware stack.
+"""
+
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import REQUEST_DURATION, REQUEST_SIZE, REQUESTS, RESPONSE_SIZE
+from .timing import finish_request, stage_timing, start_request
+
+# View label of requests that match no URL pattern, so arbitrary paths do
+# not each become a label value
+UNMATCHED = "unmatched"
+
+
+def _view_name(request):
+    match = request.resolver_match
+    return match.view_name if match is not None else UNMATCHED
+
+
+def _record(request, response, elapsed):
+    view = _view_name(request)
+    method = request.method
+    REQUEST_DURATION.observe(elapsed, view, method)
+    REQUESTS.inc(view, method, str(response.status_code))
+    try:
+        request_size = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        request_size = 0
+    REQUEST_SIZE.observe(request_size, view)
+    if not response.streaming:
+        RESPONSE_SIZE.observe(len(response.content), view)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        _record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        _record(request, response, time.perf_counter() - start)
+        return response
+
+
+def _server_timing(request, response, timer):
+    total = timer.elapsed()
+    response["Server-Timing"] = timer.header(total)
+    stage_timing.record(
+        timer, total, _view_name(request), request.method, response.status_code
+    )
+
+
+class StageTimingMiddleware:
+    """Times each request's stages while stage timing is switched on"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not stage_timing.enabled():
+            return self.get_response(request)
+        timer, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            finish_request(token)
+        _server_timing(request, response, timer)
+        return response
+
+    async def __acall__(self, request):
+        if not stage_timing.enabled():
+            return await self.get_response(request)
+        timer, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            finish_request(token)
+        _server_timing(request, response, timer)
+        return response
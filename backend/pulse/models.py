@@ -37,6 +37,11 @@ class Feedback(models.Model):
 
 
 class Dam(models.Model):
+    """
+    One dam of Dams_Gujarat.csv (loaded by ``manage.py load_dams``, see
+    pulse.dams), or one entered through the admin.
+    """
+
     name = models.CharField(max_length=200)
     latitude = models.FloatField()
     longitude = models.FloatField()
@@ -48,5 +53,97 @@ class Dam(models.Model):
     purpose = models.CharField(max_length=200, blank=True)
     description = models.TextField(blank=True)
 
+    # Location and structure
+    nearest_city = models.CharField(max_length=100, blank=True)
+    district = models.CharField(max_length=100, blank=True, db_index=True)
+    elevation = models.FloatField(null=True, blank=True)
+    length_m = models.FloatField(null=True, blank=True)
+    max_height_m = models.FloatField(null=True, blank=True)
+    slope = models.FloatField(null=True, blank=True)
+    seismic_zone = models.FloatField(null=True, blank=True)
+    soil_type_main = models.CharField(max_length=100, blank=True)
+    soil_type_secondary = models.CharField(max_length=100, blank=True)
+
+    # Suitability scores and their categories
+    geological_score = models.FloatField(null=True, blank=True)
+    climatic_score = models.FloatField(null=True, blank=True)
+    overall_score = models.FloatField(null=True, blank=True)
+    geological_category = models.CharField(max_length=20, blank=True)
+    climatic_category = models.CharField(max_length=20, blank=True)
+    overall_category = models.CharField(max_length=20, blank=True, db_index=True)
+    # Categories assigned by the dam_scoring rules
+    rule_geological_category = models.CharField(max_length=20, blank=True)
+    rule_climatic_category = models.CharField(max_length=20, blank=True)
+    rule_overall_category = models.CharField(max_length=20, blank=True)
+
+    # Climate
+    rainfall_2020 = models.FloatField(null=True, blank=True)
+    rainfall_2021 = models.FloatField(null=True, blank=True)
+    rainfall_2022 = models.FloatField(null=True, blank=True)
+    rainfall_2023 = models.FloatField(null=True, blank=True)
+    rainfall_2024 = models.FloatField(null=True, blank=True)
+    rainfall_5yr_avg = models.FloatField(null=True, blank=True)
+    rainfall_stddev_5yr = models.FloatField(null=True, blank=True)
+    max_annual_rainfall = models.FloatField(null=True, blank=True)
+    min_annual_rainfall = models.FloatField(null=True, blank=True)
+    monsoon_intensity_avg = models.FloatField(null=True, blank=True)
+    avg_temperature_5yr = models.FloatField(null=True, blank=True)
+    max_temperature_last_5yr = models.FloatField(null=True, blank=True)
+    temperature_stddev_5yr = models.FloatField(null=True, blank=True)
+    heatwave_days_per_year = models.FloatField(null=True, blank=True)
+    flood_risk_index = models.FloatField(null=True, blank=True)
+    enso_impact_index = models.FloatField(null=True, blank=True)
+    climate_vulnerability_index = models.FloatField(null=True, blank=True)
+    extreme_rainfall_days = models.FloatField(null=True, blank=True)
+    cyclone_exposure = models.FloatField(null=True, blank=True)
+
+    # River and vegetation
+    nearest_river = models.CharField(max_length=100, blank=True)
+    river_distance_km = models.FloatField(null=True, blank=True)
+    river_flow_rate = models.FloatField(null=True, blank=True)
+    ndvi_2025_monthly = models.JSONField(default=list, blank=True)
+    ndvi_2025_avg = models.FloatField(null=True, blank=True)
+
+    # Row number in the imported CSV (None for dams added by hand)
+    position = models.PositiveIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['latitude', 'longitude'])]
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'district'], name='unique_dam_per_district')
+        ]
+
     def __str__(self):
         return self.name
+
+
+class OutboxEmail(models.Model):
+    """Email queued in the same transaction as the row that triggered it"""
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_DEAD, 'Dead letter'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipient = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.status})"
@@ -0,0 +1,209 @@
+"""
+Durable email outbox for the form endpoints.
+
+Form emails are saved in the same transaction as the Contact / LetUsKnow /
+Feedback row they belong to (see pulse.writebehind), and ``notify_outbox``
+wakes the workers on commit. A small pool of background threads delivers
+due messages over a single reused connection per batch, retrying failures
+with exponential backoff and dead-lettering after ``OUTBOX_MAX_ATTEMPTS``.
+Workers in several processes can share one database: each message is
+claimed with a conditional UPDATE and a time-limited lease before it is
+sent.
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .metrics import EMAIL_SEND_DURATION, EMAILS
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def build_email(subject, message, recipient, from_email=None):
+    """Unsaved outbox row of an email, or None when there is no recipient"""
+    if not recipient:
+        # Nothing to deliver; send_mail() silently skipped these as well
+        return None
+    return OutboxEmail(
+        subject=subject[:255],
+        message=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipient=recipient,
+    )
+
+
+def enqueue_email(subject, message, recipient, from_email=None):
+    """Record an email for background delivery (call inside the transaction)"""
+    outbox_email = build_email(subject, message, recipient, from_email)
+    if outbox_email is not None:
+        outbox_email.save()
+    return outbox_email
+
+
+def notify_outbox():
+    """Wake the worker pool once the current transaction commits"""
+    if _setting("OUTBOX_AUTOSTART", True):
+        transaction.on_commit(worker_pool.wake)
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2*base, 4*base, ... capped at one day"""
+    base = _setting("OUTBOX_RETRY_BACKOFF", 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 86400))
+
+
+def _claim_due(limit):
+    """Lease up to ``limit`` due messages to this worker, oldest first"""
+    now = timezone.now()
+    lease = now + timedelta(seconds=_setting("OUTBOX_LEASE_SECONDS", 300))
+    candidates = (
+        OutboxEmail.objects.filter(
+            status=OutboxEmail.STATUS_PENDING, next_attempt_at__lte=now
+        )
+        .filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+        .order_by("next_attempt_at", "id")
+        .values_list("id", "locked_until")[:limit]
+    )
+    claimed = []
+    for pk, locked_until in candidates:
+        # Only one worker can move the lease from the value it observed
+        if OutboxEmail.objects.filter(pk=pk, locked_until=locked_until).update(
+            locked_until=lease
+        ):
+            claimed.append(pk)
+    return list(OutboxEmail.objects.filter(pk__in=claimed).order_by("id"))
+
+
+def _record_failure(outbox_email, error):
+    outbox_email.attempts += 1
+    outbox_email.last_error = str(error)[:2000]
+    outbox_email.locked_until = None
+    if outbox_email.attempts >= _setting("OUTBOX_MAX_ATTEMPTS", 5):
+        outbox_email.status = OutboxEmail.STATUS_DEAD
+        logger.error(
+            f"Outbox email {outbox_email.pk} to {outbox_email.recipient} "
+            f"dead-lettered after {outbox_email.attempts} attempts: {error}"
+        )
+    else:
+        outbox_email.next_attempt_at = timezone.now() + retry_delay(
+            outbox_email.attempts
+        )
+        logger.warning(
+            f"Outbox email {outbox_email.pk} to {outbox_email.recipient} "
+            f"failed (attempt {outbox_email.attempts}): {error}"
+        )
+    outbox_email.save(
+        update_fields=[
+            "attempts",
+            "last_error",
+            "locked_until",
+            "status",
+            "next_attempt_at",
+        ]
+    )
+
+
+def deliver_pending(batch_size=None):
+    """
+    Deliver every due message, one batch at a time, over a reused connection.
+
+    Returns the number of messages sent.
+    """
+    batch_size = batch_size or _setting("OUTBOX_BATCH_SIZE", 50)
+    sent = 0
+    while True:
+        batch = _claim_due(batch_size)
+        if not batch:
+            return sent
+
+        connection = get_connection(fail_silently=False)
+        is_open = False
+        try:
+            for outbox_email in batch:
+                start = time.perf_counter()
+                try:
+                    if not is_open:
+                        connection.open()
+                        is_open = True
+                    EmailMessage(
+                        subject=outbox_email.subject,
+                        body=outbox_email.message,
+                        from_email=outbox_email.from_email,
+                        to=[outbox_email.recipient],
+                        connection=connection,
+                    ).send()
+                except Exception as e:
+                    EMAILS.inc("failed")
+                    _record_failure(outbox_email, e)
+                    # A failed send may leave the SMTP session unusable
+                    connection.close()
+                    is_open = False
+                    continue
+
+                EMAIL_SEND_DURATION.observe(time.perf_counter() - start)
+                EMAILS.inc("sent")
+                outbox_email.status = OutboxEmail.STATUS_SENT
+                outbox_email.attempts += 1
+                outbox_email.sent_at = timezone.now()
+                outbox_email.locked_until = None
+                outbox_email.save(
+                    update_fields=["status", "attempts", "sent_at", "locked_until"]
+                )
+                sent += 1
+        finally:
+            connection.close()
+
+
+class OutboxWorkerPool:
+    """
+    Daemon threads that drain the outbox when woken, and on a poll interval
+    so retries and messages left by a previous process are picked up.
+    """
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(_setting("OUTBOX_WORKERS", 2)):
+                thread = threading.Thread(
+                    target=self._run, name=f"outbox-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def wake(self):
+        self.start()
+        self._wake.set()
+
+    def _run(self):
+        poll_interval = _setting("OUTBOX_POLL_INTERVAL", 30)
+        while True:
+            self._wake.wait(poll_interval)
+            self._wake.clear()
+            try:
+                deliver_pending()
+            except Exception as e:
+                logger.error(f"Outbox worker error: {str(e)}", exc_info=True)
+            finally:
+                close_old_connections()
+
+
+worker_pool = OutboxWorkerPool()
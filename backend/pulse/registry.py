@@ -0,0 +1,369 @@
+"""
+Model registry: loads the geological / climatic model artifacts on first use
+and hot-reloads them when a new version is activated.
+
+The active artifact of each model is taken from the versioned model store
+(``model_store.py``, written by ``train_models.py``), falling back to the
+plain ``*_model.pkl`` files next to manage.py when nothing has been
+published. Every ``MODEL_RELOAD_INTERVAL`` seconds a lookup checks whether
+the active version changed (a small JSON read, or a stat for the plain
+files); if so, the new version is loaded in a background thread while
+requests keep being served by the old one, and then swapped in by replacing
+a single dict reference. Readers never take a lock.
+
+With ``MODEL_COMPACT_INFERENCE`` the fitted tree ensembles are also
+flattened into contiguous arrays (``tree_ensemble.py``) that serve
+predictions without sklearn's per-call validation and thread-pool
+dispatch. They win for small batches; calls with more than
+``MODEL_COMPACT_MAX_ROWS`` rows go to sklearn's compiled per-tree loops.
+``MODEL_INFERENCE_THREADS`` sets the serving thread count (``n_jobs`` of the
+sklearn estimators) independently of the training budget.
+
+With ``MODEL_MMAP`` enabled, each pickle is converted once into a joblib
+file under ``MODEL_CACHE_DIR`` (named after the pickle's content hash) and
+loaded with ``mmap_mode="r"``. NumPy arrays inside the artifact are then
+read-only views of the page cache, shared by every worker process instead
+of being copied into each one. Artifacts can also be loaded eagerly at
+startup with ``MODEL_EAGER_LOAD`` (see PulseConfig.ready).
+"""
+
+import logging
+import os
+import threading
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from feature_pipeline import FeaturePipeline
+from model_store import ModelStore
+from tree_ensemble import CompactEnsemble, export_ensemble
+
+from .cache import file_version
+from .features import FeatureRowBuilder, PipelineRowBuilder
+from .metrics import INFERENCE_DURATION, INFERENCE_ERRORS, INFERENCE_ROWS
+from .timing import stage
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Feature rows are plain NumPy arrays in training column order; sklearn warns
+# on every call that they carry no column names.
+warnings.filterwarnings(
+    "ignore", message="X does not have valid feature names", category=UserWarning
+)
+
+MODEL_FILES = {
+    "geological": BASE_DIR / "geological_model.pkl",
+    "climatic": BASE_DIR / "climatic_model.pkl",
+}
+
+
+def current_rss_bytes():
+    """Resident set size of this process (peak RSS where /proc is missing)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class LoadedModel:
+    """One loaded artifact plus the objects the views need to serve it"""
+
+    def __init__(
+        self,
+        name,
+        path,
+        data,
+        version,
+        load_seconds,
+        mmapped,
+        signature,
+        meta=None,
+        compact=None,
+        threads=1,
+        compact_max_rows=64,
+    ):
+        self.name = name
+        self.path = path
+        self.data = data
+        self.model = data["model"]
+        self.features = data["features"]
+        self.scaler = data.get("scaler")
+        self.version = version
+        self.load_seconds = load_seconds
+        self.mmapped = mmapped
+        # What _signature() returned when this artifact was picked
+        self.signature = signature
+        self.meta = meta or {}
+        # Flattened tree arrays used instead of model.predict when available
+        self.compact = compact
+        self.compact_max_rows = compact_max_rows
+        if hasattr(self.model, "n_jobs"):
+            # Training fits with every core; serving gets its own budget
+            self.model.n_jobs = threads
+        # Precompiled request → feature-row builder (fixed column-index map);
+        # artifacts saved with a feature pipeline also get its encodings and
+        # derived columns
+        if data.get("pipeline"):
+            self.pipeline = FeaturePipeline.from_state(data["pipeline"])
+            self.row_builder = PipelineRowBuilder(self.pipeline)
+        else:
+            self.pipeline = None
+            self.row_builder = FeatureRowBuilder(self.features)
+
+    def predict(self, rows):
+        start = time.perf_counter()
+        try:
+            if self.scaler:
+                with stage(f"{self.name}_scale"):
+                    rows = self.scaler.transform(rows)
+            with stage(f"{self.name}_model"):
+                if self.compact is not None and len(rows) <= self.compact_max_rows:
+                    scores = self.compact.predict(rows)
+                else:
+                    scores = self.model.predict(rows)
+        except Exception:
+            INFERENCE_ERRORS.inc(self.name)
+            raise
+        INFERENCE_DURATION.observe(time.perf_counter() - start, self.name)
+        INFERENCE_ROWS.inc(self.name, amount=len(rows))
+        return scores
+
+    def info(self):
+        return {
+            "version": self.version,
+            "source": self.signature[0],
+            "data_sha256": self.meta.get("data_sha256"),
+            "trained_at": self.meta.get("created_at"),
+            "path": str(self.path),
+            "features": len(self.features),
+            "compact_inference": self.compact is not None,
+            "feature_pipeline": self.pipeline is not None,
+            "load_seconds": round(self.load_seconds, 4),
+            "memory_mapped": self.mmapped,
+        }
+
+
+class ModelRegistry:
+    """
+    Lazily loads named model artifacts, once per process, and swaps in new
+    versions as they are activated.
+
+    ``get(name)`` returns a LoadedModel, or None when the artifact cannot be
+    loaded (the error is logged and the load is retried on the next call).
+    """
+
+    def __init__(
+        self,
+        files=None,
+        mmap=None,
+        cache_dir=None,
+        store=None,
+        reload_interval=None,
+        compact=None,
+    ):
+        self.files = dict(files or MODEL_FILES)
+        self.mmap = getattr(settings, "MODEL_MMAP", True) if mmap is None else mmap
+        self.cache_dir = Path(
+            cache_dir or getattr(settings, "MODEL_CACHE_DIR", BASE_DIR / "model_cache")
+        )
+        self.store = store or ModelStore(getattr(settings, "MODEL_STORE_DIR", None))
+        self.compact = (
+            getattr(settings, "MODEL_COMPACT_INFERENCE", True)
+            if compact is None
+            else compact
+        )
+        self.threads = getattr(settings, "MODEL_INFERENCE_THREADS", 1)
+        self.compact_max_rows = getattr(settings, "MODEL_COMPACT_MAX_ROWS", 64)
+        self.reload_interval = (
+            getattr(settings, "MODEL_RELOAD_INTERVAL", 5)
+            if reload_interval is None
+            else reload_interval
+        )
+        # name -> LoadedModel; replaced wholesale, never mutated in place
+        self._models = {}
+        self._checked_at = {}
+        self._lock = threading.Lock()
+        # One per model: a reload of one never delays the check of another
+        self._reloading = {name: threading.Lock() for name in self.files}
+
+    def get(self, name):
+        loaded = self._models.get(name)
+        if loaded is not None:
+            if self.reload_interval and (
+                time.monotonic() - self._checked_at.get(name, 0) >= self.reload_interval
+            ):
+                self._reload_in_background(name)
+            return loaded
+        with self._lock:
+            loaded = self._models.get(name)
+            if loaded is None:
+                try:
+                    loaded = self._load(name)
+                except Exception as e:
+                    logger.error(f"Error loading ML model '{name}': {str(e)}")
+                    return None
+                self._swap(name, loaded)
+            return loaded
+
+    async def aget(self, name):
+        """get() for async views; a first load runs off the event loop"""
+        if name in self._models:
+            return self.get(name)
+        return await sync_to_async(self.get, thread_sensitive=False)(name)
+
+    def load_all(self):
+        return {name: self.get(name) for name in self.files}
+
+    def reload(self, name=None):
+        """
+        Load and swap in any model whose active version changed. Returns the
+        names that were swapped.
+        """
+        swapped = []
+        for model_name in [name] if name else list(self._models):
+            current = self._models.get(model_name)
+            try:
+                if current and self._signature(model_name) == current.signature:
+                    continue
+                loaded = self._load(model_name)
+            except Exception as e:
+                logger.error(f"Error reloading ML model '{model_name}': {str(e)}")
+                continue
+            with self._lock:
+                self._swap(model_name, loaded)
+            swapped.append(model_name)
+            logger.info(f"Swapped ML model '{model_name}' to version {loaded.version}")
+        return swapped
+
+    def clear(self):
+        with self._lock:
+            self._models = {}
+            self._checked_at = {}
+
+    def _swap(self, name, loaded):
+        # Copy-on-write: readers see either the old dict or the new one
+        models = dict(self._models)
+        models[name] = loaded
+        self._models = models
+
+    def _reload_in_background(self, name):
+        # At most one reload per model at a time; requests keep using the
+        # current model. The check counts as done only once it has started.
+        reloading = self._reloading[name]
+        if not reloading.acquire(blocking=False):
+            return
+        self._checked_at[name] = time.monotonic()
+
+        def run():
+            try:
+                self.reload(name)
+            finally:
+                reloading.release()
+
+        threading.Thread(target=run, name=f"model-reload-{name}", daemon=True).start()
+
+    def _signature(self, name):
+        """Cheap identity of the artifact that should be serving ``name``"""
+        version = self.store.current_version(name)
+        if version:
+            return ("store", version)
+        stat = os.stat(self.files[name])
+        return ("file", stat.st_size, stat.st_mtime_ns)
+
+    def _cache_file(self, path, version, suffix, build):
+        """
+        Joblib file derived from one artifact version, written once into
+        cache_dir so its arrays can be memory-mapped
+        """
+        stem = Path(path).stem
+        target = self.cache_dir / f"{stem}.{version}.{suffix}"
+        if not target.exists():
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_suffix(f".{os.getpid()}.tmp")
+            joblib.dump(build(), tmp)
+            # Atomic, so concurrent workers never map a half-written file
+            os.replace(tmp, target)
+            for stale in self.cache_dir.glob(f"{stem}.*.{suffix}"):
+                if stale != target:
+                    stale.unlink(missing_ok=True)
+        return target
+
+    def _mmap_copy(self, path, version):
+        """Joblib copy of a pickle whose arrays can be memory-mapped"""
+        return self._cache_file(path, version, "joblib", lambda: joblib.load(path))
+
+    def _compact_ensemble(self, name, path, version, model):
+        """Flattened arrays of the model's trees, or None if not supported"""
+        try:
+            if not self.mmap:
+                return export_ensemble(model)
+            target = self._cache_file(
+                path, version, "trees", lambda: export_ensemble(model).to_dict()
+            )
+            return CompactEnsemble.from_dict(joblib.load(target, mmap_mode="r"))
+        except (NotImplementedError, AttributeError, OSError) as e:
+            logger.warning(f"Compact inference unavailable for '{name}': {e}")
+            return None
+
+    def _load(self, name):
+        start = time.perf_counter()
+        signature = self._signature(name)
+        meta = self.store.meta(name, signature[1]) if signature[0] == "store" else None
+        if meta:
+            path = self.store.artifact_path(name, meta)
+            version = meta["version"]
+        else:
+            path = self.files[name]
+            version = file_version(path)
+        mmapped = False
+        if self.mmap:
+            try:
+                data = joblib.load(self._mmap_copy(path, version), mmap_mode="r")
+                mmapped = True
+            except OSError as e:
+                logger.warning(f"Memory-mapping '{name}' failed, loading copy: {e}")
+                data = joblib.load(path)
+        else:
+            data = joblib.load(path)
+        compact = None
+        if self.compact:
+            compact = self._compact_ensemble(name, path, version, data["model"])
+        elapsed = time.perf_counter() - start
+        logger.info(f"Loaded ML model '{name}' ({version}) in {elapsed:.3f}s")
+        return LoadedModel(
+            name,
+            path,
+            data,
+            version,
+            elapsed,
+            mmapped,
+            signature,
+            meta,
+            compact=compact,
+            threads=self.threads,
+            compact_max_rows=self.compact_max_rows,
+        )
+
+    def stats(self):
+        models = self._models
+        return {
+            "pid": os.getpid(),
+            "rss_bytes": current_rss_bytes(),
+            "reload_interval": self.reload_interval,
+            "models": {
+                name: (models[name].info() if name in models else None)
+                for name in self.files
+            },
+        }
+
+
+model_registry = ModelRegistry()
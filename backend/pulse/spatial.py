@@ -0,0 +1,99 @@
+"""
+Spatial index over the dam dataset's Latitude/Longitude columns.
+
+Points are projected onto the unit sphere and stored in a KD-tree, so radius
+and k-nearest queries use true great-circle distances. Bounding-box queries
+use a latitude-sorted array and a binary search.
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _to_unit_xyz(lat, lon):
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def _km_to_chord(distance_km):
+    return 2.0 * np.sin(np.minimum(distance_km / EARTH_RADIUS_KM, np.pi) / 2.0)
+
+
+def _chord_to_km(chord):
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2.0, 0.0, 1.0))
+
+
+class DamSpatialIndex:
+    """
+    KD-tree + latitude-sorted index over rows carrying float Latitude/Longitude.
+
+    Query methods return row positions into the ``rows`` list the index was
+    built from; rows without coordinates are never returned.
+    """
+
+    def __init__(self, rows):
+        positions, lats, lons = [], [], []
+        for i, row in enumerate(rows):
+            lat, lon = row.get("Latitude"), row.get("Longitude")
+            if isinstance(lat, float) and isinstance(lon, float):
+                positions.append(i)
+                lats.append(lat)
+                lons.append(lon)
+
+        self.positions = np.asarray(positions, dtype=np.intp)
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.tree = cKDTree(_to_unit_xyz(self.lats, self.lons)) if positions else None
+
+        order = np.argsort(self.lats, kind="stable")
+        self._lat_order = order
+        self._sorted_lats = self.lats[order]
+
+    def __len__(self):
+        return len(self.positions)
+
+    def nearby(self, lat, lon, radius_km=None, k=None):
+        """
+        Return [(row_position, distance_km), ...] sorted by distance.
+
+        With only ``radius_km`` all points inside the radius are returned;
+        with ``k`` the k nearest (optionally capped by ``radius_km``).
+        """
+        if self.tree is None:
+            return []
+        point = _to_unit_xyz(lat, lon)[0]
+
+        if k is not None:
+            k = min(k, len(self))
+            bound = _km_to_chord(radius_km) if radius_km is not None else np.inf
+            chords, idx = self.tree.query(point, k=k, distance_upper_bound=bound)
+            chords, idx = np.atleast_1d(chords), np.atleast_1d(idx)
+            found = idx < len(self)
+            chords, idx = chords[found], idx[found]
+        else:
+            idx = np.asarray(
+                self.tree.query_ball_point(point, _km_to_chord(radius_km)),
+                dtype=np.intp,
+            )
+            chords = np.linalg.norm(self.tree.data[idx] - point, axis=1)
+            order = np.argsort(chords, kind="stable")
+            chords, idx = chords[order], idx[order]
+
+        distances = _chord_to_km(chords)
+        return [(int(self.positions[i]), float(d)) for i, d in zip(idx, distances)]
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """Return row positions inside the box, in dataset order"""
+        lo = np.searchsorted(self._sorted_lats, min_lat, side="left")
+        hi = np.searchsorted(self._sorted_lats, max_lat, side="right")
+        candidates = self._lat_order[lo:hi]
+        lons = self.lons[candidates]
+        if min_lon <= max_lon:
+            inside = (lons >= min_lon) & (lons <= max_lon)
+        else:  # box crosses the antimeridian
+            inside = (lons >= min_lon) | (lons <= max_lon)
+        return sorted(int(p) for p in self.positions[candidates[inside]])
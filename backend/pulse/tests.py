@@ -1,3 +1,1820 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import os
+import pickle
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from asgiref.sync import sync_to_async
+from scipy import stats
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+
+import columnar
+import model_store
+import dam_scoring
+import feature_pipeline
+import suitability_tiles
+import train_models
+import tree_ensemble
+
+from . import views
+from .bulk import BulkScorer
+from .cache import PredictionCache
+from .dams import import_dams
+from .dataset import (
+    NUMERIC_FIELDS,
+    REQUIRED_FIELDS,
+    DamsDataset,
+    dams_dataset,
+    parse_dams_csv,
+)
+from .encoding import AVAILABLE, negotiate
+from .features import (
+    FEATURE_MAPPING,
+    FeatureRowBuilder,
+    PipelineRowBuilder,
+    map_input_features,
+)
+from .inference import InferenceGate, InferenceOverloaded, run_inference
+from .metrics import Counter, Histogram, MetricsRegistry
+from .models import Contact, Dam, Feedback, LetUsKnow, OutboxEmail
+from .outbox import deliver_pending
+from .registry import ModelRegistry
+from .spatial import EARTH_RADIUS_KM
+from .throttle import RateLimiter, rate_limiter
+from .tiles import TileService
+from .timing import StageTimingControl, stage_timing
+from .writebehind import Submission, WriteBehindBuffer, form_buffer
+
+SAMPLE_SITE = {
+    "latitude": 22.4066,
+    "longitude": 73.38,
+    "elevation": 66.0,
+    "damType": "Earthen",
+    "length": 4390.0,
+    "maxHeight": 17.07,
+    "slope": 3.6036,
+    "seismicZone": "3",
+    "mainSoilType": "Vertisols",
+    "secondarySoilType": "Cambisols",
+    "rainfall2020": 1197.1,
+    "rainfall2021": 1131.9,
+    "rainfall2022": 1055.2,
+    "rainfall2023": 1143.2,
+    "rainfall2024": 1606.7,
+    "rainfall5YearAvg": 1226.82,
+    "rainfallStdDev5yr": 218.31,
+    "maxAnnualRainfall": 1606.7,
+    "minAnnualRainfall": 1055.2,
+    "avgTemperature5yr": 27.19,
+    "maxTemperatureLast5yr": 39.26,
+    "temperatureStdDev5yr": 5.01,
+    "heatwaveDaysPerYear": 0,
+    "ensoImpactIndex": 0.0,
+    "climateVulnerabilityIndex": 0.177,
+    "ndvi2025": 0.88,
+    "riverFlowRate": 31.30,
+    "riverDistance": 0.0,
+}
+
+
+def setUpModule():
+    # Every test client shares one address; ThrottleTests sets its own limits.
+    # Forms go through the default write-behind buffer (see FormBufferMixin).
+    # Metrics stay in this process (MetricsTests give their registries a
+    # directory).
+    global _test_settings
+    _test_settings = override_settings(RATE_LIMITS={}, METRICS_DIR=None)
+    _test_settings.enable()
+
+
+def tearDownModule():
+    _test_settings.disable()
+
+
+class FormBufferMixin:
+    """
+    For tests posting forms: the views group-commit their submissions from
+    the test's thread (and transaction), so none may be left in the buffer
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(lambda: self.assertEqual(form_buffer.flush(), 0))
+
+
+def post_json(client, url, payload):
+    return client.post(url, json.dumps(payload), content_type="application/json")
+
+
+class BatchPredictionTests(TestCase):
+    def setUp(self):
+        if views.model_registry.get("geological") is None:
+            self.skipTest("ML models not loaded")
+
+    def test_batch_matches_single_predictions(self):
+        sites = [
+            SAMPLE_SITE,
+            dict(SAMPLE_SITE, elevation=250.0, slope="Unknown"),
+            {"latitude": 21.0, "longitude": 72.0},
+        ]
+        batch = post_json(self.client, "/api/predict/batch/", {"sites": sites})
+        self.assertEqual(batch.status_code, 200)
+        results = batch.json()["results"]
+        self.assertEqual([r["index"] for r in results], [0, 1, 2])
+
+        for site, result in zip(sites, results):
+            single = post_json(self.client, "/api/predict/", site).json()
+            self.assertEqual(result["predictions"], single["predictions"])
+            self.assertEqual(
+                batch.json()["model_versions"], single["model_versions"]
+            )
+
+    def test_invalid_sites_reported_in_place(self):
+        response = post_json(self.client, "/api/predict/batch/", [SAMPLE_SITE, 42])
+        results = response.json()["results"]
+        self.assertEqual(results[0]["status"], "success")
+        self.assertEqual(results[1]["status"], "error")
+
+    def test_rejects_non_list_and_oversized_batches(self):
+        response = post_json(self.client, "/api/predict/batch/", {"sites": {}})
+        self.assertEqual(response.status_code, 400)
+        response = post_json(
+            self.client,
+            "/api/predict/batch/",
+            [SAMPLE_SITE] * (views.MAX_BATCH_SIZE + 1),
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(BULK_SCORE_CHUNK_ROWS=50)
+class BulkScoringTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.df = pd.read_csv(dams_dataset.path).head(120)
+        buf = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False)
+        with buf:
+            cls.df.to_csv(buf, index=False)
+        cls.path = buf.name
+
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.path)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.geo = views.model_registry.get("geological")
+        self.clim = views.model_registry.get("climatic")
+        if self.geo is None or self.clim is None:
+            self.skipTest("ML models not loaded")
+
+    def upload(self, query=""):
+        with open(self.path, "rb") as f:
+            response = self.client.post(
+                f"/api/predict/bulk/{query}",
+                {"file": SimpleUploadedFile("sites.csv", f.read())},
+            )
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_chunked_stream_matches_whole_file_scoring(self):
+        lines = self.upload().splitlines()
+        results = pd.DataFrame([json.loads(line) for line in lines])
+        self.assertEqual(results["index"].tolist(), list(range(len(self.df))))
+        self.assertEqual(results["Name"].tolist(), self.df["Name"].tolist())
+
+        geo = self.geo.predict(self.geo.pipeline.transform_frame(self.df))
+        clim = self.clim.predict(self.clim.pipeline.transform_frame(self.df))
+        np.testing.assert_allclose(
+            results["geological_suitability_score"], geo, atol=0.006
+        )
+        np.testing.assert_allclose(results["climate_impact_score"], clim, atol=0.006)
+        np.testing.assert_allclose(
+            results["overall_suitability_score"], geo * 0.6 + clim * 0.4, atol=0.006
+        )
+        rules = dam_scoring.process_dam_data(self.df.copy())
+        for column in ["Geological_Suitability_Score", "Overall_Category"]:
+            self.assertEqual(results[column].tolist(), rules[column].tolist())
+
+    def test_csv_format_matches_ndjson(self):
+        ndjson = pd.DataFrame(json.loads(line) for line in self.upload().splitlines())
+        from_csv = pd.read_csv(io.StringIO(self.upload("?format=csv")))
+        pd.testing.assert_frame_equal(from_csv, ndjson, check_dtype=False)
+
+    def test_raw_body_and_rejected_uploads(self):
+        with open(self.path, "rb") as f:
+            response = self.client.post(
+                "/api/predict/bulk/", f.read(), content_type="text/csv"
+            )
+        self.assertEqual(
+            len(b"".join(response.streaming_content).splitlines()), len(self.df)
+        )
+        response = self.client.post(
+            "/api/predict/bulk/", b"Name,Latitude\nx,1\n", content_type="text/csv"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Missing columns", response.json()["message"])
+        response = self.client.post(
+            "/api/predict/bulk/?format=xml", b"", content_type="text/csv"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_management_command_matches_endpoint(self):
+        out = io.StringIO()
+        call_command("score_csv", self.path, stdout=out, stderr=io.StringIO())
+        self.assertEqual(out.getvalue(), self.upload("?format=csv"))
+        scorer = BulkScorer(self.geo, self.clim, chunk_rows=7)
+        chunks = list(scorer.read(self.path))
+        self.assertEqual([len(c) for c in chunks][:2], [7, 7])
+
+
+class FeatureRowBuilderTests(TestCase):
+    def test_matches_pandas_reindex(self):
+        features = ["Slope(%)", "Latitude", "Derived_Column", "SoilType_Main"]
+        site = dict(SAMPLE_SITE, slope="unknown", latitude="  ", mainSoilType="x")
+        expected = (
+            pd.DataFrame([map_input_features(site)])
+            .reindex(columns=features, fill_value=0)
+            .to_numpy(dtype=float)
+        )
+        builder = FeatureRowBuilder(features)
+        np.testing.assert_array_equal(builder.build_row(site), expected)
+        np.testing.assert_array_equal(
+            builder.build_matrix([site, {}]), np.vstack([expected, [[0, 0, 0, 0]]])
+        )
+
+
+class DamsCsvTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        import_dams()
+
+    def test_returns_required_fields_with_validators(self):
+        response = self.client.get("/api/dams_csv/")
+        self.assertEqual(response.status_code, 200)
+        dams = json.loads(response.content)
+        self.assertEqual(list(dams[0].keys()), REQUIRED_FIELDS)
+        self.assertIsInstance(dams[0]["Latitude"], float)
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+    def test_conditional_get_returns_304(self):
+        etag = self.client.get("/api/dams_csv/")["ETag"]
+        response = self.client.get("/api/dams_csv/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_cache_invalidated_when_file_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "dams.csv"
+            path.write_text("Name,Latitude\nA,21.5\n", encoding="utf-8")
+            dataset = DamsDataset(path)
+            first = dataset.get()
+            self.assertIs(dataset.get(), first)
+
+            path.write_text("Name,Latitude\nA,21.5\nB,22.0\n", encoding="utf-8")
+            os.utime(path, ns=(0, 10**9))
+            second = dataset.get()
+            self.assertEqual([d["Name"] for d in second.rows], ["A", "B"])
+            self.assertNotEqual(first.etag, second.etag)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class SpatialQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        import_dams()
+
+    def setUp(self):
+        self.rows = json.loads(self.client.get("/api/dams_csv/").content)
+
+    def test_nearby_radius_matches_brute_force(self):
+        lat, lon, radius = 22.3, 73.2, 40.0
+        expected = sorted(
+            d["Name"]
+            for d in self.rows
+            if d["Latitude"] is not None
+            and haversine_km(lat, lon, d["Latitude"], d["Longitude"]) <= radius
+        )
+        response = self.client.get(
+            "/api/dams/nearby/", {"lat": lat, "lon": lon, "radius_km": radius}
+        )
+        results = response.json()["results"]
+        self.assertEqual(sorted(d["Name"] for d in results), expected)
+        distances = [d["distance_km"] for d in results]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_nearby_k_returns_nearest(self):
+        lat, lon = 21.5, 71.5
+        response = self.client.get(
+            "/api/dams/nearby/", {"lat": lat, "lon": lon, "k": 3}
+        )
+        results = response.json()["results"]
+        brute = sorted(
+            haversine_km(lat, lon, d["Latitude"], d["Longitude"])
+            for d in self.rows
+            if d["Latitude"] is not None
+        )[:3]
+        np.testing.assert_allclose(
+            [d["distance_km"] for d in results], brute, atol=1e-3
+        )
+
+    def test_bbox_matches_filter(self):
+        box = {"min_lat": 21.0, "min_lon": 70.0, "max_lat": 22.0, "max_lon": 71.5}
+        expected = [
+            d["Name"]
+            for d in self.rows
+            if d["Latitude"] is not None
+            and 21.0 <= d["Latitude"] <= 22.0
+            and 70.0 <= d["Longitude"] <= 71.5
+        ]
+        response = self.client.get("/api/dams/bbox/", box)
+        self.assertEqual([d["Name"] for d in response.json()["results"]], expected)
+
+    def test_invalid_parameters_rejected(self):
+        response = self.client.get("/api/dams/nearby/", {"lat": "abc", "lon": 70})
+        self.assertEqual(response.status_code, 400)
+        for params, message in [
+            ({"lat": 91, "lon": 70}, "'lat' must be between -90 and 90"),
+            ({"lat": 22, "lon": 70, "radius_km": -5}, "'radius_km' must be at least 0"),
+        ]:
+            response = self.client.get("/api/dams/nearby/", params)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["message"], f"Parameter {message}")
+        response = self.client.get(
+            "/api/dams/bbox/",
+            {"min_lat": 23, "min_lon": 70, "max_lat": 21, "max_lon": 71},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class DamImportTests(TestCase):
+    def write_csv(self, tmp, df):
+        path = Path(tmp) / "dams.csv"
+        df.to_csv(path, index=False)
+        return path
+
+    def test_served_rows_match_csv(self):
+        out = io.StringIO()
+        call_command("load_dams", stdout=out)
+        self.assertIn("505 created", out.getvalue())
+        served = json.loads(self.client.get("/api/dams_csv/").content)
+        expected = parse_dams_csv(dams_dataset.path.read_text(encoding="utf-8"))
+        # Empty numeric cells are null in the table rather than ""
+        for row in expected:
+            for field, value in row.items():
+                if value == "" and field in NUMERIC_FIELDS:
+                    row[field] = None
+        self.assertEqual(served, expected)
+
+        dam = Dam.objects.get(name="Aamli Chharchhoda Dam")
+        self.assertEqual(dam.district, "dahod")
+        self.assertEqual(dam.rule_overall_category, "Moderate")
+        self.assertEqual(len(dam.ndvi_2025_monthly), 12)
+        self.assertEqual(dam.ndvi_2025_monthly[0], 79.0)
+
+    def test_upsert_touches_only_changed_rows(self):
+        df = pd.read_csv(dams_dataset.path).head(50)
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(
+                import_dams(self.write_csv(tmp, df), batch_size=7)["created"], 50
+            )
+            etag = self.client.get("/api/dams_csv/")["ETag"]
+            counts = import_dams(self.write_csv(tmp, df))
+            self.assertEqual((counts["unchanged"], counts["updated"]), (50, 0))
+            self.assertEqual(self.client.get("/api/dams_csv/")["ETag"], etag)
+
+            df.loc[3, "Overall_Suitability_Score"] = 99.5
+            df = pd.concat([df.drop(index=49), df.head(1).assign(Name="New Dam")])
+            counts = import_dams(self.write_csv(tmp, df), batch_size=7, prune=True)
+        self.assertEqual(counts, dict(created=1, updated=1, unchanged=48, deleted=1))
+        self.assertEqual(Dam.objects.count(), 50)
+        self.assertEqual(
+            Dam.objects.get(
+                name=df.loc[3, "Name"], district=df.loc[3, "District"]
+            ).overall_score,
+            99.5,
+        )
+        self.assertNotEqual(self.client.get("/api/dams_csv/")["ETag"], etag)
+
+    def test_duplicate_dams_rejected(self):
+        df = pd.read_csv(dams_dataset.path).head(3)
+        df = pd.concat([df, df.head(1)])
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(CommandError):
+                call_command("load_dams", str(self.write_csv(tmp, df)))
+        self.assertEqual(Dam.objects.count(), 0)
+
+    def test_queries_use_indexes(self):
+        for queryset, index in [
+            (Dam.objects.filter(district="dahod"), "district"),
+            (Dam.objects.filter(overall_category="Good"), "overall_category"),
+            (
+                Dam.objects.filter(latitude__gte=21, latitude__lte=22),
+                "pulse_dam_latitud",
+            ),
+        ]:
+            self.assertIn(index, queryset.explain())
+
+
+class DamListingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        import_dams()
+
+    def setUp(self):
+        self.rows = json.loads(self.client.get("/api/dams_csv/").content)
+
+    def listing(self, **params):
+        response = self.client.get("/api/dams_csv/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def pages(self, **params):
+        names, cursor = [], None
+        while True:
+            page = self.listing(**params, **({"cursor": cursor} if cursor else {}))
+            names += [d["Name"] for d in page["results"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return names, page["total"]
+
+    def test_filters_match_brute_force(self):
+        rng = np.random.default_rng(3)
+        districts = sorted({d["District"] for d in self.rows})
+        for _ in range(25):
+            wanted = set(rng.choice(districts, 2))
+            category = rng.choice(["Good", "Fair", "Moderate", "Poor"])
+            low, high = sorted(rng.uniform(50, 90, 2).round(1))
+            expected = [
+                d["Name"]
+                for d in self.rows
+                if d["District"] in wanted
+                and d["Geological_Suitability_Category"] == category
+                and low <= d["Overall_Suitability_Score"] <= high
+            ]
+            page = self.listing(
+                district=",".join(w.upper() for w in wanted),
+                geological_category=category.lower(),
+                min_overall_score=low,
+                max_overall_score=high,
+                limit=500,
+            )
+            self.assertEqual([d["Name"] for d in page["results"]], expected)
+            self.assertEqual(page["total"], len(expected))
+
+    def test_projection_and_sort(self):
+        page = self.listing(
+            category="Good",
+            fields="Name,Overall_Suitability_Score",
+            sort="-Overall_Suitability_Score,Name",
+        )
+        self.assertEqual(
+            list(page["results"][0]), ["Name", "Overall_Suitability_Score"]
+        )
+        good = [d for d in self.rows if d["Overall_Suitability_Category"] == "Good"]
+        expected = sorted(
+            good, key=lambda d: (-d["Overall_Suitability_Score"], d["Name"].casefold())
+        )
+        self.assertEqual(
+            [d["Name"] for d in page["results"]], [d["Name"] for d in expected][:100]
+        )
+
+    def test_cursor_pages_cover_every_row_once(self):
+        for sort in ["", "District,-Elevation", "-Length (m)"]:
+            names, total = self.pages(sort=sort, fields="Name", limit=37)
+            self.assertEqual(total, len(self.rows))
+            self.assertEqual(sorted(names), sorted(d["Name"] for d in self.rows))
+        names, _ = self.pages(fields="Name", limit=100)
+        self.assertEqual(names, [d["Name"] for d in self.rows])
+
+    def test_cursor_survives_table_changes(self):
+        first = self.listing(sort="Name", fields="Name", limit=10)
+        Dam.objects.filter(name=first["results"][3]["Name"]).delete()
+        Dam.objects.create(name="Aaa New Dam", latitude=22.0, longitude=72.0)
+        rest, _ = self.pages(sort="Name", fields="Name", limit=200)
+        second = self.listing(
+            sort="Name", fields="Name", limit=5, cursor=first["next_cursor"]
+        )
+        expected = sorted((d["Name"] for d in self.rows), key=str.casefold)[10:15]
+        self.assertEqual([d["Name"] for d in second["results"]], expected)
+        self.assertEqual(len(rest), len(self.rows))
+
+    def test_conditional_get_and_invalid_parameters(self):
+        response = self.client.get("/api/dams_csv/", {"district": "Kachchh"})
+        again = self.client.get(
+            "/api/dams_csv/",
+            {"district": "Kachchh"},
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(again.status_code, 304)
+        other = self.client.get("/api/dams_csv/", {"district": "Amreli"})
+        self.assertNotEqual(other["ETag"], response["ETag"])
+
+        for params in [
+            {"min_overall_score": "high"},
+            {"fields": "Name,Secret"},
+            {"sort": "-Capacity"},
+            {"limit": 0},
+            {"cursor": "not-a-cursor"},
+        ]:
+            response = self.client.get("/api/dams_csv/", params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class DamWireFormatTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        import_dams()
+
+    def setUp(self):
+        self.rows = json.loads(self.client.get("/api/dams_csv/").content)
+
+    def test_columnar_decodes_to_rows(self):
+        data = self.client.get("/api/dams_csv/", {"format": "columnar"}).json()
+        self.assertEqual(data["count"], len(self.rows))
+        self.assertEqual(data["fields"], REQUIRED_FIELDS)
+        district = data["columns"]["District"]
+        self.assertEqual(
+            len(district["values"]), len({d["District"] for d in self.rows})
+        )
+        decoded = [{} for _ in range(data["count"])]
+        for field in data["fields"]:
+            column = data["columns"][field]
+            for i, dam in enumerate(decoded):
+                if isinstance(column, dict):
+                    dam[field] = column["values"][column["codes"][i]]
+                else:
+                    dam[field] = column[i]
+        self.assertEqual(decoded, self.rows)
+
+    def test_precompressed_variants(self):
+        plain = self.client.get("/api/dams_csv/", {"format": "columnar"})
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+        response = self.client.get(
+            "/api/dams_csv/",
+            {"format": "columnar"},
+            HTTP_ACCEPT_ENCODING="gzip, deflate",
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        rows = self.client.get("/api/dams_csv/")
+        self.assertLess(len(plain.content), len(rows.content) / 4)
+        self.assertLess(len(response.content), len(rows.content) / 10)
+        self.assertNotEqual(response["ETag"], plain["ETag"])
+
+        again = self.client.get(
+            "/api/dams_csv/",
+            {"format": "columnar"},
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(again.status_code, 304)
+        self.assertIn("Accept-Encoding", again["Vary"])
+
+        # Filtered pages are small and never compressed
+        page = self.client.get(
+            "/api/dams_csv/", {"district": "Kachchh"}, HTTP_ACCEPT_ENCODING="gzip"
+        )
+        self.assertNotIn("Content-Encoding", page)
+
+    def test_negotiate(self):
+        both = ["br", "gzip", "identity"]
+        self.assertEqual(negotiate(None, both), "identity")
+        self.assertEqual(negotiate("gzip, deflate, br", both), "br")
+        self.assertEqual(negotiate("gzip, deflate, br", ["gzip", "identity"]), "gzip")
+        self.assertEqual(negotiate("br;q=0.5, gzip", both), "gzip")
+        self.assertEqual(negotiate("gzip;q=0, deflate", both), "identity")
+        self.assertEqual(negotiate("*", both), "br")
+        self.assertEqual(negotiate("*, br;q=0", both), "gzip")
+        self.assertEqual(negotiate("identity, gzip;q=0.5", both), "identity")
+        self.assertEqual(negotiate("GZIP;Q=0.8", both), "gzip")
+        self.assertIn(negotiate("br, gzip"), AVAILABLE)
+
+    def test_invalid_format(self):
+        for params in [
+            {"format": "csv"},
+            {"format": "columnar", "district": "Kachchh"},
+        ]:
+            response = self.client.get("/api/dams_csv/", params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+def random_dam_frame(n, seed=0):
+    """Random rows hitting every rule boundary, with some missing values"""
+    rng = np.random.default_rng(seed)
+
+    def column(values):
+        col = rng.choice(np.asarray(values, dtype=float), n)
+        col[rng.random(n) < 0.05] = np.nan
+        return col
+
+    soils = ["Vertisols", "Cambisols", "Luvisols", "Leptosols", "Arenosols", "Unknown"]
+    return pd.DataFrame(
+        {
+            "Seismic_Zone": column([1, 2, 3, 4, 5, 3.5, 0]),
+            "SoilType_Main": rng.choice(soils + [None], n),
+            "SoilType_Secondary": rng.choice(soils, n),
+            "Elevation": column([10, 20, 49.9, 50, 200, 200.1, 300, 301]),
+            "Slope(%)": column([0, 2, 2.1, 5, 9.9, 10, 12]),
+            "Max Height above Foundation (m)": column([4, 5, 10, 30, 31, 50, 60]),
+            "Rainfall_5yr_Avg": column([300, 400, 600, 800, 1200, 1500, 1800, 2000]),
+            "MonsoonIntensityAvg(mm/wet_day)": column([4, 5, 10, 15, 20, 25, 30, 31]),
+            "Rainfall_StdDev_5yr": column([50, 99.9, 100, 199, 200, 400]),
+            "NDVI_2025(avg)": column([0.05, 0.1, 0.3, 0.6, 0.8, 0.9]),
+            "Temperature_StdDev_5yr": column([1, 2, 3.9, 4, 6]),
+            "Heatwave_Days_PerYear": column([0, 4, 5, 9, 10, 20]),
+            "Flood_Risk_Index": column([0.1, 0.3, 0.5, 0.6, 0.9]),
+            "Cyclone_Exposure": column([0, 1, 2, 0.5]),
+        }
+    )
+
+
+class VectorizedScoringTests(TestCase):
+    def assert_matches_row_wise(self, df):
+        expected = df.copy()
+        expected["Geological_Suitability_Score"] = df.apply(
+            dam_scoring.calculate_geological_suitability_score, axis=1
+        )
+        expected["Climatic_Effect_Score"] = df.apply(
+            dam_scoring.calculate_climatic_effect_score, axis=1
+        )
+        expected["Overall_Suitability_Score"] = expected.apply(
+            dam_scoring.calculate_overall_suitability_score, axis=1
+        )
+        for score, category in [
+            ("Geological_Suitability_Score", "Geological_Category"),
+            ("Climatic_Effect_Score", "Climatic_Category"),
+            ("Overall_Suitability_Score", "Overall_Category"),
+        ]:
+            expected[category] = expected[score].apply(dam_scoring.get_category)
+
+        result = dam_scoring.process_dam_data(df.copy())
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_matches_row_wise_on_random_rows(self):
+        self.assert_matches_row_wise(random_dam_frame(2000))
+
+    def test_matches_row_wise_on_dataset(self):
+        df = pd.read_csv(Path(dam_scoring.__file__).with_name("Dams_Gujarat.csv"))
+        self.assert_matches_row_wise(df)
+
+
+class RainfallFeatureTests(TestCase):
+    @staticmethod
+    def linregress_trend(row):
+        # Reference: the per-row implementation rainfall_trend replaced
+        if len(row) < 2 or np.all(row == row[0]):
+            return 0.0
+        slope = stats.linregress(np.arange(len(row)), row).slope
+        return 0.0 if np.isnan(slope) else float(slope)
+
+    def test_trend_matches_linregress(self):
+        rng = np.random.default_rng(0)
+        rain = rng.uniform(200, 2500, size=(500, 5))
+        rain[::7] = rain[::7, :1]  # constant rows
+        rain[3::11, 2] = np.nan
+        expected = [self.linregress_trend(row) for row in rain]
+        np.testing.assert_allclose(
+            feature_pipeline.rainfall_trend(rain), expected, rtol=1e-9, atol=1e-9
+        )
+        self.assertTrue((feature_pipeline.rainfall_trend(rain[::7]) == 0.0).all())
+
+    def test_trend_needs_two_years(self):
+        self.assertEqual(
+            list(feature_pipeline.rainfall_trend(np.ones((3, 1)))), [0, 0, 0]
+        )
+
+    def test_derived_columns_match_pandas(self):
+        path = Path(train_models.__file__).with_name("Dams_Gujarat.csv")
+        df = train_models.load_and_prepare_data(path)
+        raw = pd.read_csv(path)
+        rain = raw[[f"Rainfall_{year}" for year in range(2020, 2025)]]
+        for column, expected in [
+            ("Rainfall_Mean", rain.mean(axis=1)),
+            ("Rainfall_StdDev", rain.std(axis=1)),
+            ("Rainfall_Range", rain.max(axis=1) - rain.min(axis=1)),
+            ("Rainfall_Trend", rain.apply(self.linregress_trend, axis=1)),
+        ]:
+            np.testing.assert_allclose(df[column], expected, atol=1e-9)
+
+        flow = raw["RiverFlowRate(m/day)"].fillna(raw["RiverFlowRate(m/day)"].median())
+        impact = (flow / raw["RiverDistance(km)"]).replace([np.inf, -np.inf], np.nan)
+        np.testing.assert_allclose(
+            df["Flow_Rainfall_Ratio"], flow / (raw["Rainfall_5yr_Avg"] + 1e-6)
+        )
+        np.testing.assert_allclose(
+            df["River_Impact_Score"], impact.fillna(impact.median())
+        )
+
+
+class FeaturePipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        path = Path(train_models.__file__).with_name("Dams_Gujarat.csv")
+        cls.raw = pd.read_csv(path)
+        df = train_models.load_and_prepare_data(path)
+        cls.prepared = {
+            "geological": train_models.prepare_geological(df),
+            "climatic": train_models.prepare_climatic(df),
+        }
+
+    def request_for(self, row):
+        """Frontend request carrying one CSV row's raw values"""
+        return {
+            key: row[column]
+            for key, column in FEATURE_MAPPING.items()
+            if column in row and pd.notna(row[column])
+        }
+
+    def test_serving_rows_match_training_matrix(self):
+        p = self.prepared["climatic"]
+        builder = PipelineRowBuilder(p["pipeline"])
+        rows = self.raw.loc[p["X"].index]
+        np.testing.assert_array_equal(p["pipeline"].transform_frame(rows), p["X"])
+        sites = [self.request_for(row) for _, row in rows.head(50).iterrows()]
+        np.testing.assert_allclose(builder.build_matrix(sites), p["X"].head(50))
+        np.testing.assert_array_equal(
+            builder.build_row(sites[0]), builder.build_matrix(sites[:1])
+        )
+
+    def test_categorical_inputs_are_target_encoded(self):
+        pipeline = self.prepared["geological"]["pipeline"]
+        builder = PipelineRowBuilder(pipeline)
+        spec = pipeline.encodings["Type"]
+        column = pipeline.features.index("Type")
+        rows = builder.build_matrix(
+            [
+                {"damType": "Earthen / Gravity & Masonry"},
+                {"damType": " earthen / gravity & masonry "},
+                {"damType": "buttress"},
+                {},
+            ]
+        )
+        expected = spec["categories"]["earthen / gravity & masonry"]
+        self.assertEqual(rows[:, column].tolist()[:2], [expected, expected])
+        self.assertEqual(rows[:, column].tolist()[2:], [spec["default"]] * 2)
+
+    def test_state_round_trip(self):
+        pipeline = self.prepared["geological"]["pipeline"]
+        restored = feature_pipeline.FeaturePipeline.from_state(
+            pickle.loads(pickle.dumps(pipeline.state()))
+        )
+        rows = self.raw.head(20)
+        np.testing.assert_array_equal(
+            restored.transform_frame(rows), pipeline.transform_frame(rows)
+        )
+        with self.assertRaises(ValueError):
+            feature_pipeline.FeaturePipeline.from_state(
+                dict(pipeline.state(), version=0)
+            )
+
+    def test_served_artifacts_apply_the_pipeline(self):
+        clim = views.model_registry.get("climatic")
+        if clim is None or clim.pipeline is None:
+            self.skipTest("ML models with a feature pipeline not loaded")
+        row = clim.row_builder.build_row(SAMPLE_SITE)[0]
+        derived = dict(zip(clim.features, row))
+        self.assertAlmostEqual(derived["Rainfall_Mean"], 1226.82)
+        self.assertAlmostEqual(derived["Rainfall_Range"], 1606.7 - 1055.2)
+        self.assertNotEqual(derived["Rainfall_Trend"], 0.0)
+
+
+class TrainingPipelineTests(TestCase):
+    def test_worker_budget_never_oversubscribes(self):
+        for budget in [1, 2, 3, 8, 16, 64]:
+            processes, threads = train_models.worker_budget(12, budget)
+            self.assertLessEqual(processes, 12)
+            self.assertLessEqual(processes * threads, max(budget, 1))
+        self.assertEqual(train_models.worker_budget(12, 64), (12, 5))
+
+    def test_cv_fold_tasks_match_cross_val_score(self):
+        from sklearn.model_selection import cross_val_score
+
+        path = Path(train_models.__file__).with_name("Dams_Gujarat.csv")
+        prepared = {
+            "geological": train_models.prepare_geological(
+                train_models.load_and_prepare_data(path)
+            )
+        }
+        p = prepared["geological"]
+        expected = cross_val_score(
+            train_models.build_model("geological"),
+            p["X_train"],
+            p["y_train"],
+            cv=train_models.CV_FOLDS,
+            scoring="r2",
+        )
+        scores = []
+        for fold in range(train_models.CV_FOLDS):
+            name, _, score, record = train_models.run_task(
+                prepared, "geological", fold, 1
+            )
+            self.assertEqual(record["stage"], f"geological_cv_fold_{fold}")
+            self.assertGreaterEqual(record["peak_rss_mb"], record["rss_start_mb"])
+            scores.append(score)
+        np.testing.assert_allclose(scores, expected)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError("SMTP unavailable")
+
+
+class OutboxTests(FormBufferMixin, TestCase):
+    FORMS = [
+        ("/api/contact/submit/", Contact, {"subject": "Hi", "message": "Hello"}),
+        ("/api/letusknow/submit/", LetUsKnow, {"organization": "Dam", "message": "x"}),
+        ("/api/feedback/submit/", Feedback, {"feedback": "Great"}),
+    ]
+
+    def submit_feedback(self):
+        payload = {"name": "Asha", "email": "asha@example.com", "feedback": "x"}
+        post_json(self.client, "/api/feedback/submit/", payload)
+
+    def test_forms_queue_emails_without_sending(self):
+        for url, model, fields in self.FORMS:
+            payload = dict(fields, name="Asha", email="asha@example.com")
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = post_json(self.client, url, payload)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(model.objects.count(), 1)
+            self.assertEqual(len(callbacks), 1)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            OutboxEmail.objects.filter(status=OutboxEmail.STATUS_PENDING).count(), 6
+        )
+
+        self.assertEqual(deliver_pending(), 6)
+        self.assertEqual(len(mail.outbox), 6)
+        self.assertEqual(mail.outbox[1].subject, "Thank You for Reaching Out!")
+        self.assertFalse(
+            OutboxEmail.objects.exclude(status=OutboxEmail.STATUS_SENT).exists()
+        )
+        self.assertEqual(deliver_pending(), 0)
+
+    @override_settings(
+        EMAIL_BACKEND="pulse.tests.FailingEmailBackend", OUTBOX_RETRY_BACKOFF=60
+    )
+    def test_failure_schedules_retry_with_backoff(self):
+        self.submit_feedback()
+        self.assertEqual(deliver_pending(), 0)
+        for outbox_email in OutboxEmail.objects.all():
+            self.assertEqual(outbox_email.status, OutboxEmail.STATUS_PENDING)
+            self.assertEqual(outbox_email.attempts, 1)
+            self.assertIn("SMTP unavailable", outbox_email.last_error)
+            self.assertGreater(outbox_email.next_attempt_at, outbox_email.created_at)
+
+    @override_settings(
+        EMAIL_BACKEND="pulse.tests.FailingEmailBackend",
+        OUTBOX_RETRY_BACKOFF=0,
+        OUTBOX_MAX_ATTEMPTS=3,
+    )
+    def test_dead_letter_after_max_attempts(self):
+        self.submit_feedback()
+        deliver_pending()
+        statuses = set(OutboxEmail.objects.values_list("status", "attempts"))
+        self.assertEqual(statuses, {(OutboxEmail.STATUS_DEAD, 3)})
+
+
+class PredictionCacheTests(TestCase):
+    def test_lru_eviction_and_counters(self):
+        cache = PredictionCache(maxsize=2, ttl=60)
+        rows = [np.array([[float(i), -0.0]]) for i in range(3)]
+        for row in rows:
+            cache.get_or_compute("v1", row, lambda: row[0, 0])
+        self.assertEqual(cache.get_or_compute("v1", rows[2], lambda: -1), 2.0)
+        self.assertEqual(cache.get_or_compute("v1", rows[0], lambda: -1), -1)
+        self.assertEqual(cache.get_or_compute("v1", np.array([[2.0, 0.0]]), None), 2.0)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 4))
+        self.assertEqual(stats["evictions"], 2)
+
+    def test_model_version_and_ttl_invalidate(self):
+        cache = PredictionCache(maxsize=10, ttl=0)
+        row = np.zeros((1, 3))
+        cache.get_or_compute("v1", row, lambda: 1)
+        self.assertEqual(cache.get_or_compute("v1", row, lambda: 2), 2)
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+        cache.ttl = 60
+        cache.get_or_compute("v1", row, lambda: 3)
+        self.assertEqual(cache.get_or_compute("v2", row, lambda: 4), 4)
+        self.assertEqual(cache.get_or_compute("v1", row, lambda: 5), 3)
+
+    def test_repeated_request_hits_cache(self):
+        if views.model_registry.get("geological") is None:
+            self.skipTest("ML models not loaded")
+        views.prediction_cache.clear()
+        before = views.prediction_cache.stats()["hits"]
+        first = post_json(self.client, "/api/predict/", SAMPLE_SITE).json()
+        second = post_json(self.client, "/api/predict/", SAMPLE_SITE).json()
+        self.assertEqual(first, second)
+        stats = self.client.get("/api/predict/cache/").json()["cache"]
+        self.assertEqual(stats["hits"] - before, 2)
+
+
+class AsyncViewTests(FormBufferMixin, TestCase):
+    async def test_async_cache_computes_once(self):
+        cache = PredictionCache(maxsize=10, ttl=60)
+        row = np.ones((1, 2))
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return 7.0
+
+        self.assertEqual(await cache.aget_or_compute("v1", row, compute), 7.0)
+        self.assertEqual(await cache.aget_or_compute("v1", row, compute), 7.0)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    async def test_predict_runs_on_inference_pool(self):
+        geo = await views.model_registry.aget("geological")
+        if geo is None:
+            self.skipTest("ML models not loaded")
+        views.prediction_cache.clear()
+        site = dict(SAMPLE_SITE, latitude=21.5)
+        threads = []
+        predict = type(geo).predict
+
+        def recording_predict(model, X):
+            threads.append(threading.current_thread().name)
+            return predict(model, X)
+
+        with mock.patch.object(type(geo), "predict", recording_predict):
+            response = await self.async_client.post(
+                "/api/predict/", json.dumps(site), content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 200)
+        expected = geo.predict(geo.row_builder.build_row(site))[0]
+        self.assertEqual(
+            response.json()["predictions"]["geological_suitability"]["score"],
+            round(float(expected), 2),
+        )
+        self.assertTrue(threads)
+        self.assertTrue(all(name.startswith("inference") for name in threads))
+
+    async def test_dams_csv_conditional_get(self):
+        first = await self.async_client.get("/api/dams_csv/")
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first["Last-Modified"])
+        second = await self.async_client.get(
+            "/api/dams_csv/", headers={"if-none-match": first["ETag"]}
+        )
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    async def test_form_saves_row_and_outbox_together(self):
+        payload = {"name": "Asha", "email": "asha@example.com", "feedback": "x"}
+        response = await self.async_client.post(
+            "/api/feedback/submit/",
+            json.dumps(payload),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(await Feedback.objects.acount(), 1)
+        self.assertEqual(await OutboxEmail.objects.acount(), 2)
+
+        response = await self.async_client.post(
+            "/api/feedback/submit/", "{", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+def metric_value(text, sample):
+    """Value of one exposition line (name plus rendered labels), or 0"""
+    for line in text.splitlines():
+        name, _, value = line.rpartition(" ")
+        if name == sample:
+            return float(value)
+    return 0.0
+
+
+class MetricsTests(FormBufferMixin, TestCase):
+    def scrape(self):
+        response = self.client.get("/api/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        return response.content.decode()
+
+    def test_views_and_inference_are_recorded(self):
+        requests = 'pulse_http_requests_total{view="predict_suitability",method="POST",status="200"}'
+        duration = 'pulse_http_request_duration_seconds_count{view="predict_suitability",method="POST"}'
+        unmatched = (
+            'pulse_http_requests_total{view="unmatched",method="GET",status="404"}'
+        )
+        size = 'pulse_http_request_size_bytes_sum{view="predict_suitability"}'
+        inference = 'pulse_inference_duration_seconds_count{model="geological"}'
+        before = self.scrape()
+
+        views.prediction_cache.clear()
+        body = json.dumps(dict(SAMPLE_SITE, latitude=21.25))
+        response = self.client.post(
+            "/api/predict/", body, content_type="application/json"
+        )
+        self.client.get("/api/no-such-endpoint/")
+        after = self.scrape()
+
+        for sample in [requests, duration, unmatched]:
+            self.assertEqual(
+                metric_value(after, sample) - metric_value(before, sample), 1
+            )
+        self.assertEqual(
+            metric_value(after, size) - metric_value(before, size), len(body)
+        )
+        if "geological" in response.json().get("model_versions", {}):
+            self.assertEqual(
+                metric_value(after, inference) - metric_value(before, inference), 1
+            )
+
+    def test_email_sends_are_recorded(self):
+        sent = 'pulse_emails_total{result="sent"}'
+        before = self.scrape()
+        payload = {"name": "Asha", "email": "asha@example.com", "feedback": "x"}
+        post_json(self.client, "/api/feedback/submit/", payload)
+        deliver_pending()
+        after = self.scrape()
+        self.assertEqual(metric_value(after, sent) - metric_value(before, sent), 2)
+
+    def test_exposition_format(self):
+        registry = MetricsRegistry()
+        counter = Counter("demo_total", "Demo counter", ["path"], registry=registry)
+        histogram = Histogram(
+            "demo_seconds", "Demo histogram", buckets=(0.1, 1), registry=registry
+        )
+        counter.inc('a"b\\c')
+        counter.inc('a"b\\c', amount=2)
+        for value in [0.05, 0.1, 0.5, 3]:
+            histogram.observe(value)
+        with override_settings(METRICS_DIR=None):
+            text = registry.render()
+        self.assertIn("# TYPE demo_total counter", text)
+        self.assertIn('demo_total{path="a\\"b\\\\c"} 3', text)
+        self.assertIn("# TYPE demo_seconds histogram", text)
+        self.assertIn('demo_seconds_bucket{le="0.1"} 2', text)
+        self.assertIn('demo_seconds_bucket{le="1"} 3', text)
+        self.assertIn('demo_seconds_bucket{le="+Inf"} 4', text)
+        self.assertIn("demo_seconds_count 4", text)
+        self.assertIn("demo_seconds_sum 3.65", text)
+
+    def test_worker_processes_are_summed(self):
+        registry = MetricsRegistry()
+        counter = Counter("jobs_total", "Jobs", ["kind"], registry=registry)
+        histogram = Histogram("job_seconds", "Job time", registry=registry)
+        with tempfile.TemporaryDirectory() as tmp, override_settings(METRICS_DIR=tmp):
+            counter.inc("a")
+            histogram.observe(0.002)
+            children = []
+            for _ in range(3):
+                pid = os.fork()
+                if pid == 0:
+                    # A forked worker starts from zero and writes its own file
+                    code = 1
+                    try:
+                        counter.inc("a", amount=10)
+                        counter.inc("b")
+                        histogram.observe(0.2)
+                        registry.flush()
+                        code = 0
+                    finally:
+                        os._exit(code)
+                children.append(pid)
+            for pid in children:
+                self.assertEqual(os.waitpid(pid, 0)[1], 0)
+
+            self.assertTrue(list(Path(tmp).glob("*.json")))
+            text = registry.render()
+            self.assertIn('jobs_total{kind="a"} 31', text)
+            self.assertIn('jobs_total{kind="b"} 3', text)
+            self.assertIn("job_seconds_count 4", text)
+            self.assertIn('job_seconds_bucket{le="0.0025"} 1', text)
+
+            # The exited children's files (each child may already have taken
+            # over its exited siblings') were folded into this process's
+            # file, which is not counted twice
+            self.assertEqual(
+                [path.name for path in Path(tmp).iterdir()], [registry.file_name()]
+            )
+            registry.flush()
+            self.assertIn('jobs_total{kind="a"} 31', registry.render())
+
+            # A fresh process (registry) reading the directory sees the same
+            reader = MetricsRegistry()
+            Counter("jobs_total", "Jobs", ["kind"], registry=reader)
+            Histogram("job_seconds", "Job time", registry=reader)
+            self.assertIn('jobs_total{kind="a"} 31', reader.render())
+
+
+def server_timing(response):
+    """{stage: milliseconds} of a Server-Timing header"""
+    stages = {}
+    for part in response["Server-Timing"].split(","):
+        name, duration = part.strip().split(";dur=")
+        stages[name] = float(duration)
+    return stages
+
+
+class StageTimingTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings = override_settings(
+            DEBUG=True, METRICS_DIR=self.tmp.name, STAGE_TIMING_CHECK_INTERVAL=0
+        )
+        self.settings.enable()
+        stage_timing.reset()
+
+    def tearDown(self):
+        self.settings.disable()
+        stage_timing.reset()
+        self.tmp.cleanup()
+
+    def switch(self, **state):
+        response = post_json(self.client, "/api/debug/timings", state)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_off_by_default(self):
+        response = self.client.get("/api/models/")
+        self.assertNotIn("Server-Timing", response)
+        self.assertFalse(self.client.get("/api/debug/timings").json()["enabled"])
+
+    async def test_prediction_stages_and_samples(self):
+        geo = await views.model_registry.aget("geological")
+        if geo is None:
+            self.skipTest("ML models not loaded")
+        await sync_to_async(self.switch)(enabled=True, sample_rate=1)
+        views.prediction_cache.clear()
+        response = await self.async_client.post(
+            "/api/predict/",
+            json.dumps(dict(SAMPLE_SITE, latitude=21.75)),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        stages = server_timing(response)
+        for name in ["parse", "geo_features", "geo_predict", "serialize", "total"]:
+            self.assertIn(name, stages)
+        # Recorded on the inference pool's thread
+        self.assertIn("geological_model", stages)
+        self.assertLessEqual(stages["geological_model"], stages["geo_predict"])
+        self.assertLessEqual(stages["geo_predict"], stages["total"])
+
+        samples = (await self.async_client.get("/api/debug/timings")).json()["samples"]
+        self.assertEqual(samples[-1]["view"], "predict_suitability")
+        self.assertEqual(set(samples[-1]["stages_ms"]), set(stages) - {"total"})
+
+    def test_switch_is_shared_by_workers(self):
+        other_worker = StageTimingControl()
+        self.assertFalse(other_worker.enabled())
+        state = self.switch(enabled=True, sample_rate=0.25)
+        self.assertEqual((state["enabled"], state["sample_rate"]), (True, 0.25))
+        self.assertTrue(other_worker.enabled())
+        response = self.client.get(
+            "/api/dams/bbox/", {"min_lat": 0, "min_lon": 0, "max_lat": 1, "max_lon": 1}
+        )
+        self.assertIn("query", server_timing(response))
+
+        self.switch(enabled=False)
+        self.assertFalse(other_worker.enabled())
+        self.assertNotIn("Server-Timing", self.client.get("/api/models/"))
+
+    def test_switch_requires_staff_and_valid_state(self):
+        for state in [{}, {"enabled": "yes"}, {"enabled": True, "sample_rate": 2}]:
+            response = post_json(self.client, "/api/debug/timings", state)
+            self.assertEqual(response.status_code, 400, state)
+        with override_settings(DEBUG=False):
+            response = post_json(self.client, "/api/debug/timings", {"enabled": True})
+            self.assertEqual(response.status_code, 403)
+            self.assertEqual(self.client.get("/api/debug/timings").status_code, 403)
+        self.assertFalse(stage_timing.enabled())
+
+
+class ThrottleTests(TestCase):
+    def setUp(self):
+        rate_limiter.clear()
+
+    def tearDown(self):
+        rate_limiter.clear()
+
+    def test_token_bucket(self):
+        limiter = RateLimiter(max_clients=2)
+        self.assertEqual([limiter.take("a", 1, 3, now=0) for _ in range(3)], [0] * 3)
+        self.assertAlmostEqual(limiter.take("a", 1, 3, now=0), 1.0)
+        self.assertAlmostEqual(limiter.take("a", 1, 3, now=0.5), 0.5)
+        self.assertEqual(limiter.take("a", 1, 3, now=1.0), 0)
+        # Refills never exceed the burst
+        self.assertEqual(
+            [limiter.take("a", 1, 3, now=100) for _ in range(4)][-1] > 0, True
+        )
+        limiter.take("b", 1, 3, now=100)
+        limiter.take("c", 1, 3, now=100)
+        self.assertEqual(len(limiter), 2)  # "a" was least recently used
+        self.assertEqual(limiter.take("a", 1, 3, now=100), 0)
+
+    @override_settings(RATE_LIMITS={"predict": (1, 2), "feedback": (1 / 60, 1)})
+    def test_limits_per_client_and_endpoint(self):
+        statuses = [
+            self.client.post("/api/predict/", "{", content_type="application/json")
+            for _ in range(3)
+        ]
+        self.assertEqual([r.status_code for r in statuses], [400, 400, 429])
+        self.assertEqual(statuses[-1]["Retry-After"], "1")
+        other = self.client.post(
+            "/api/predict/",
+            "{",
+            content_type="application/json",
+            REMOTE_ADDR="10.1.1.1",
+        )
+        self.assertEqual(other.status_code, 400)
+
+        feedback = [
+            self.client.post(
+                "/api/feedback/submit/", "{", content_type="application/json"
+            )
+            for _ in range(2)
+        ]
+        self.assertEqual([r.status_code for r in feedback], [400, 429])
+        self.assertEqual(feedback[-1]["Retry-After"], "60")
+        # Unlimited scopes are untouched
+        self.assertEqual(
+            post_json(self.client, "/api/predict/batch/", {"sites": {}}).status_code,
+            400,
+        )
+
+    @override_settings(RATE_LIMITS={"predict": (1, 1)}, RATE_LIMIT_TRUSTED_PROXIES=1)
+    def test_client_address_behind_proxy(self):
+        def post(forwarded):
+            return self.client.post(
+                "/api/predict/",
+                "{",
+                content_type="application/json",
+                HTTP_X_FORWARDED_FOR=forwarded,
+            ).status_code
+
+        self.assertEqual(post("1.1.1.1, 2.2.2.2"), 400)
+        self.assertEqual(post("9.9.9.9, 2.2.2.2"), 429)  # spoofed first hop
+        self.assertEqual(post("1.1.1.1, 3.3.3.3"), 400)
+
+    def test_gate_caps_concurrency_and_queue(self):
+        gate = InferenceGate(limit=2, queue=3)
+        running, peak, lock = [0], [0], threading.Lock()
+
+        def work():
+            with gate.slot():
+                with lock:
+                    running[0] += 1
+                    peak[0] = max(peak[0], running[0])
+                threading.Event().wait(0.02)
+                with lock:
+                    running[0] -= 1
+
+        threads = [threading.Thread(target=work) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(peak[0], 2)
+
+        for _ in range(5):
+            gate.admit()
+        with self.assertRaises(InferenceOverloaded):
+            gate.admit()
+        with self.assertRaises(InferenceOverloaded):
+            gate.check()
+        gate.admit(wait=True)  # already admitted work is never refused
+        for _ in range(6):
+            gate.leave()
+        self.assertEqual(gate.stats()["admitted"], 0)
+
+    async def test_cancelled_caller_keeps_slot_until_inference_ends(self):
+        gate = InferenceGate(limit=1, queue=0)
+        started, release = threading.Event(), threading.Event()
+
+        def predict():
+            started.set()
+            release.wait(5)
+
+        with mock.patch("pulse.inference._gate", gate):
+            task = asyncio.ensure_future(run_inference(predict))
+            await asyncio.to_thread(started.wait, 5)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # The model is still running: no new caller is let in
+            with self.assertRaises(InferenceOverloaded):
+                gate.check()
+            release.set()
+            for _ in range(500):
+                if not gate.stats()["admitted"]:
+                    break
+                await asyncio.sleep(0.01)
+        self.assertEqual(gate.stats()["admitted"], 0)
+
+    def test_overloaded_inference_answers_503(self):
+        if views.model_registry.get("geological") is None:
+            self.skipTest("ML models not loaded")
+        gate = InferenceGate(limit=1, queue=0, retry_after=2)
+        gate.admit()  # the only slot is taken
+        views.prediction_cache.clear()
+        with mock.patch("pulse.inference._gate", gate):
+            single = post_json(
+                self.client, "/api/predict/", dict(SAMPLE_SITE, latitude=20.5)
+            )
+            batch = post_json(self.client, "/api/predict/batch/", [SAMPLE_SITE])
+            bulk = self.client.post(
+                "/api/predict/bulk/",
+                dams_dataset.path.read_bytes(),
+                content_type="text/csv",
+            )
+        for response in [single, batch, bulk]:
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "2")
+        gate.leave()
+
+
+# The writer thread never flushes on its own during these tests
+@override_settings(FORM_BUFFER_SIZE=10**6, FORM_BUFFER_INTERVAL=3600)
+class WriteBehindTests(TestCase):
+    def submissions(self):
+        return [
+            Submission(
+                Contact(name="A", email="a@example.com", subject="s", message="m"),
+                [OutboxEmail(subject="s", message="m", recipient="a@example.com")],
+            ),
+            Submission(Feedback(name="B", email="b@example.com", feedback="f")),
+            Submission(Feedback(name="C", email="c@example.com", feedback="g")),
+        ]
+
+    def test_flush_writes_batch_in_one_transaction(self):
+        buffer = WriteBehindBuffer()
+        submissions = self.submissions()
+        futures = [buffer.add(submission) for submission in submissions]
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(Feedback.objects.count(), 0)
+
+        with self.assertNumQueries(5), self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(Contact.objects.count(), 1)
+        self.assertEqual(
+            list(Feedback.objects.order_by("id").values_list("name", flat=True)),
+            ["B", "C"],
+        )
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_failed_batch_is_written_one_by_one(self):
+        buffer = WriteBehindBuffer()
+        good, bad = self.submissions()[1:]
+        bad.row.name = None  # NOT NULL
+        for submission in [good, bad]:
+            buffer.add(submission)
+        with self.assertLogs("pulse.writebehind", "ERROR"):
+            self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(list(Feedback.objects.values_list("name", flat=True)), ["B"])
+        self.assertIsNotNone(bad.future.exception())
+        self.assertEqual(len(buffer), 0)
+
+    def test_locked_database_keeps_submissions_buffered(self):
+        buffer = WriteBehindBuffer()
+        submission = self.submissions()[0]
+        buffer.add(submission)
+        locked = OperationalError("database is locked")
+        with mock.patch(
+            "pulse.writebehind.write_submissions", side_effect=[locked, locked]
+        ), self.assertLogs("pulse.writebehind", "WARNING"):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(len(buffer), 1)
+        self.assertFalse(submission.future.done())
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(Contact.objects.count(), 1)
+
+        # Exit flush writes what is left
+        buffer.add(self.submissions()[1])
+        buffer.close()
+        self.assertEqual(Feedback.objects.count(), 1)
+
+
+class WriteBehindViewTests(FormBufferMixin, TestCase):
+    async def test_concurrent_submissions_answer_after_commit(self):
+        batches = "pulse_form_batch_size_count"
+        written = "pulse_form_batch_size_sum"
+        before = (await self.async_client.get("/api/metrics")).content.decode()
+        payload = {"name": "Asha", "email": "asha@example.com", "feedback": "x"}
+        responses = await asyncio.gather(
+            *[
+                self.async_client.post(
+                    "/api/feedback/submit/",
+                    json.dumps(payload),
+                    content_type="application/json",
+                )
+                for _ in range(5)
+            ]
+        )
+        self.assertEqual([r.status_code for r in responses], [200] * 5)
+        # The views answered after their batch committed
+        self.assertEqual(await Feedback.objects.acount(), 5)
+        self.assertEqual(await OutboxEmail.objects.acount(), 10)
+        after = (await self.async_client.get("/api/metrics")).content.decode()
+        self.assertEqual(
+            metric_value(after, written) - metric_value(before, written), 5
+        )
+        self.assertLessEqual(
+            metric_value(after, batches) - metric_value(before, batches), 5
+        )
+
+
+class ModelRegistryTests(TestCase):
+    def test_lazy_memory_mapped_load_matches_pickle(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = ModelRegistry(mmap=True, cache_dir=tmp)
+            self.assertIsNone(registry.stats()["models"]["geological"])
+            mapped = registry.get("geological")
+            if mapped is None:
+                self.skipTest("ML models not loaded")
+            self.assertTrue(mapped.mmapped)
+            self.assertIs(registry.get("geological"), mapped)
+
+            plain = ModelRegistry(mmap=False).get("geological")
+            rows = mapped.row_builder.build_matrix([SAMPLE_SITE, {}])
+            np.testing.assert_array_equal(mapped.predict(rows), plain.predict(rows))
+            self.assertEqual(mapped.version, plain.version)
+            self.assertEqual(len(list(Path(tmp).glob("*.joblib"))), 1)
+
+    def test_missing_artifact_returns_none(self):
+        registry = ModelRegistry(files={"geological": "/nonexistent.pkl"}, mmap=False)
+        self.assertIsNone(registry.get("geological"))
+
+
+def publish_constant_model(store, tmp, value, version, activate=True):
+    """Publish a model that always predicts ``value`` as ``version``"""
+    from sklearn.dummy import DummyRegressor
+
+    model = DummyRegressor(strategy="constant", constant=value).fit([[0.0]], [0.0])
+    artifact = Path(tmp) / "geological_model.pkl"
+    artifact.write_bytes(pickle.dumps({"model": model, "features": ["Latitude"]}))
+    return store.publish(
+        "geological", version, artifact, {"data_sha256": "x" * 64}, activate
+    )
+
+
+class ModelStoreTests(TestCase):
+    def test_activated_version_is_hot_swapped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = model_store.ModelStore(Path(tmp) / "store")
+            publish_constant_model(store, tmp, 10.0, "v1")
+            registry = ModelRegistry(
+                files={"geological": "/nonexistent.pkl"},
+                mmap=False,
+                store=store,
+                reload_interval=0,
+            )
+            in_flight = registry.get("geological")
+            self.assertEqual(in_flight.version, "v1")
+            self.assertEqual(registry.reload(), [])
+
+            publish_constant_model(store, tmp, 20.0, "v2")
+            self.assertEqual(registry.reload(), ["geological"])
+            current = registry.get("geological")
+            self.assertEqual(current.version, "v2")
+            self.assertEqual(current.predict([[1.0]])[0], 20.0)
+            # A request still holding the old model keeps working
+            self.assertEqual(in_flight.predict([[1.0]])[0], 10.0)
+
+            store.activate("geological", "v1")
+            registry.reload()
+            self.assertEqual(registry.get("geological").version, "v1")
+            with self.assertRaises(KeyError):
+                store.activate("geological", "v3")
+
+    def test_reload_of_one_model_does_not_delay_another(self):
+        registry = ModelRegistry(
+            files={"geological": "/nonexistent.pkl", "climatic": "/nonexistent.pkl"},
+            reload_interval=3600,
+        )
+        for name in registry.files:
+            registry._swap(name, object())
+        started, running, release = [], threading.Semaphore(0), threading.Event()
+
+        def reload(name):
+            started.append(name)
+            running.release()
+            release.wait(5)
+
+        with mock.patch.object(registry, "reload", side_effect=reload):
+            try:
+                # As predict_suitability does: one right after the other
+                registry.get("geological")
+                registry.get("climatic")
+                for _ in range(2):
+                    self.assertTrue(running.acquire(timeout=5))
+                self.assertEqual(sorted(started), ["climatic", "geological"])
+                # A check skipped while its model reloads is not marked done
+                registry._checked_at.pop("geological")
+                registry.get("geological")
+                self.assertNotIn("geological", registry._checked_at)
+            finally:
+                release.set()
+
+    def test_prunes_old_versions_but_keeps_active(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = model_store.ModelStore(Path(tmp) / "store")
+            publish_constant_model(store, tmp, 0.0, "v0")
+            for i in range(1, model_store.KEEP_VERSIONS + 3):
+                publish_constant_model(store, tmp, float(i), f"v{i}", activate=False)
+            versions = [m["version"] for m in store.versions("geological")]
+            self.assertEqual(len(versions), model_store.KEEP_VERSIONS)
+            self.assertIn("v0", versions)
+            self.assertIn(f"v{model_store.KEEP_VERSIONS + 2}", versions)
+
+    def test_training_skipped_when_data_and_params_match(self):
+        path = Path(train_models.__file__).with_name("Dams_Gujarat.csv")
+        data_sha256 = model_store.file_sha256(path)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = model_store.ModelStore(tmp)
+            artifact = Path(tmp) / "artifact.pkl"
+            artifact.write_bytes(b"")
+            for name in train_models.ARTIFACTS:
+                version = model_store.artifact_version(
+                    name, data_sha256, train_models.training_params(name)
+                )
+                store.publish(name, version, artifact, {}, activate=False)
+
+            with mock.patch.object(train_models, "run_training") as run_training:
+                train_models.main(["--data", str(path), "--store", tmp])
+            run_training.assert_not_called()
+            self.assertIsNotNone(store.current_version("geological"))
+
+            changed = dict(train_models.GEO_PARAMS, max_depth=7)
+            with mock.patch.dict(train_models.GEO_PARAMS, changed):
+                self.assertFalse(
+                    store.has(
+                        "geological",
+                        model_store.artifact_version(
+                            "geological",
+                            data_sha256,
+                            train_models.training_params("geological"),
+                        ),
+                    )
+                )
+
+
+class TreeEnsembleTests(TestCase):
+    def assert_parity(self, model, X):
+        compact = tree_ensemble.export_ensemble(model)
+        np.testing.assert_allclose(
+            compact.predict(X), model.predict(X), rtol=1e-10, atol=1e-9
+        )
+        return compact
+
+    def training_data(self, n=400, seed=0):
+        rng = np.random.default_rng(seed)
+        X = rng.normal(size=(n, 6)) * [1, 10, 100, 1000, 0.01, 5]
+        y = X[:, 0] * 3 + np.sin(X[:, 1]) + X[:, 2] / 100 + rng.normal(size=n)
+        return X, y
+
+    def test_forest_parity(self):
+        from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+
+        X, y = self.training_data()
+        for cls in (ExtraTreesRegressor, RandomForestRegressor):
+            model = cls(n_estimators=25, min_samples_leaf=3, random_state=0).fit(X, y)
+            compact = self.assert_parity(model, self.training_data(seed=1)[0])
+            self.assertEqual(compact.n_trees, 25)
+            # One row, many rows, and batches spanning several chunks
+            self.assert_parity(model, X[:1])
+            self.assert_parity(
+                model, np.repeat(X, 3, axis=0)[: tree_ensemble.CHUNK_ROWS + 7]
+            )
+
+    def test_hist_gradient_boosting_parity_with_missing_values(self):
+        from sklearn.ensemble import HistGradientBoostingRegressor
+
+        X, y = self.training_data()
+        X[::7, 1] = np.nan
+        model = HistGradientBoostingRegressor(max_iter=50, random_state=0).fit(X, y)
+        test_X = self.training_data(seed=2)[0]
+        test_X[::3, 1] = np.nan
+        compact = self.assert_parity(model, test_X)
+        self.assertEqual(compact.predict(test_X, threads=2).shape, (len(test_X),))
+
+    def test_unsupported_models_rejected(self):
+        from sklearn.ensemble import ExtraTreesRegressor
+        from sklearn.linear_model import LinearRegression
+
+        X, y = self.training_data()
+        with self.assertRaises(NotImplementedError):
+            tree_ensemble.export_ensemble(LinearRegression().fit(X, y))
+        compact = tree_ensemble.export_ensemble(
+            ExtraTreesRegressor(n_estimators=2).fit(X, y)
+        )
+        with self.assertRaises(ValueError):
+            compact.predict(X[:, :3])
+
+    def test_served_models_match_sklearn(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = ModelRegistry(mmap=True, cache_dir=tmp, compact=True)
+            for name in ("geological", "climatic"):
+                loaded = registry.get(name)
+                if loaded is None:
+                    self.skipTest("ML models not loaded")
+                self.assertIsNotNone(loaded.compact)
+                rows = loaded.row_builder.build_matrix(
+                    [SAMPLE_SITE, {}, dict(SAMPLE_SITE, elevation=900.0)]
+                )
+                np.testing.assert_allclose(
+                    loaded.predict(rows), loaded.model.predict(rows), atol=1e-9
+                )
+
+
+class ColumnarCacheTests(TestCase):
+    def test_read_dataframe_matches_read_csv(self):
+        csv_path = dams_dataset.path
+        with tempfile.TemporaryDirectory() as tmp:
+            df = columnar.read_dataframe(csv_path, cache_dir=tmp)
+        expected = pd.read_csv(csv_path, float_precision="round_trip")
+        pd.testing.assert_frame_equal(df, expected)
+
+    def test_dataset_rows_match_csv_parser(self):
+        text = dams_dataset.path.read_text(encoding="utf-8")
+        self.assertEqual(dams_dataset.get().rows, parse_dams_csv(text))
+
+    def test_rebuilt_when_csv_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "sites.csv"
+            path.write_text("Name,Score\nA,1.5\nB,\n", encoding="utf-8")
+            first = columnar.open_table(path)
+            self.assertEqual(first.kind("Name"), "string")
+            np.testing.assert_array_equal(first.column("Score"), [1.5, np.nan])
+            self.assertEqual(columnar.open_table(path).path, first.path)
+
+            path.write_text("Name,Score\nA,2.5\n", encoding="utf-8")
+            os.utime(path, ns=(0, 10**9))
+            second = columnar.open_table(path)
+            self.assertNotEqual(second.version, first.version)
+            self.assertFalse(first.path.exists())
+            self.assertEqual(second.column("Score").tolist(), [2.5])
+
+
+class StaticRegistry:
+    """Stands in for the model registry with fixed (version, path) pairs"""
+
+    def __init__(self, models):
+        self.models = models
+
+    def get(self, name):
+        if name not in self.models:
+            return None
+        version, path = self.models[name]
+        return mock.Mock(version=version, path=path)
+
+
+class SuitabilityTileTests(TestCase):
+    def setUp(self):
+        self.geo = views.model_registry.get("geological")
+        self.clim = views.model_registry.get("climatic")
+        if self.geo is None or self.clim is None:
+            self.skipTest("ML models not loaded")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dams = columnar.read_dataframe(dams_dataset.path)
+
+    def service(self, clim_version=None):
+        registry = StaticRegistry(
+            {
+                "geological": (self.geo.version, self.geo.path),
+                "climatic": (clim_version or self.clim.version, self.clim.path),
+            }
+        )
+        return TileService(self.tmp.name, registry=registry, step=0.25, zooms=(5, 8))
+
+    def test_tiles_cover_the_grid(self):
+        spec = suitability_tiles.GridSpec.covering(
+            self.dams["Latitude"], self.dams["Longitude"], step=0.25
+        )
+        for z in (5, 9):
+            bounds = [
+                suitability_tiles.tile_bounds(z, x, y)
+                for x, y in suitability_tiles.tiles_covering(spec, z)
+            ]
+            self.assertLessEqual(min(b[0] for b in bounds), spec.west)
+            self.assertLessEqual(min(b[1] for b in bounds), spec.south)
+            self.assertGreaterEqual(max(b[2] for b in bounds), spec.east)
+            self.assertGreaterEqual(max(b[3] for b in bounds), spec.north)
+
+    def test_interpolation_reproduces_dam_records(self):
+        columns = ["Elevation", "Rainfall_2020", "SoilType_Main", "Seismic_Zone"]
+        interpolate = suitability_tiles.FeatureInterpolator(self.dams, columns)
+        dams = self.dams.drop_duplicates(["Latitude", "Longitude"], keep=False).head(20)
+        values, distance = interpolate(
+            dams["Latitude"].to_numpy(), dams["Longitude"].to_numpy()
+        )
+        np.testing.assert_allclose(distance, 0, atol=1e-9)
+        for column in columns:
+            expected = dams[column].to_numpy()
+            if column in suitability_tiles.NEAREST_COLUMNS:
+                self.assertEqual(list(values[column]), list(expected))
+            else:
+                np.testing.assert_allclose(values[column], expected, rtol=1e-6)
+
+    def test_grid_scores_do_not_depend_on_chunking(self):
+        spec = suitability_tiles.GridSpec.covering(
+            self.dams["Latitude"], self.dams["Longitude"], step=0.5
+        )
+        artifacts = {"geological": self.geo.path, "climatic": self.clim.path}
+        whole = suitability_tiles.score_grid(spec, self.dams, artifacts, workers=1)
+        chunked = suitability_tiles.score_grid(
+            spec, self.dams, artifacts, workers=1, chunk_points=7
+        )
+        for name in artifacts:
+            self.assertEqual(whole[name].shape, spec.shape)
+            np.testing.assert_array_equal(whole[name], chunked[name])
+        # Sea / far-away points stay empty, the rest is scored
+        self.assertTrue(np.isnan(whole["geological"]).any())
+        self.assertFalse(np.isnan(whole["geological"]).all())
+
+    def test_only_changed_models_are_rescored(self):
+        first, scored = self.service().build()
+        self.assertEqual(sorted(scored), ["climatic", "geological"])
+        self.assertEqual(self.service().build()[1], [])
+
+        second, scored = self.service(clim_version="retrained").build()
+        self.assertEqual(scored, ["climatic"])
+        self.assertNotEqual(second.key, first.key)
+        np.testing.assert_array_equal(second.grid, first.grid)
+
+    def test_stale_set_served_while_new_models_build(self):
+        built, _ = self.service().build()
+        service = self.service(clim_version="retrained")
+        with mock.patch.object(service, "_build_in_background") as build:
+            tile_set, stale = service.current()
+        build.assert_called_once()
+        self.assertEqual((tile_set.key, stale), (built.key, True))
+
+    @override_settings(TILES_MAX_RENDERED=2)
+    def test_tile_renders_are_bounded(self):
+        tile_set, _ = self.service().build()
+        with mock.patch.object(suitability_tiles, "render_tile") as render:
+            tile = tile_set.tile(6, 0, 0)  # far from the grid
+        render.assert_not_called()
+        self.assertEqual(tile, suitability_tiles.empty_tile())
+
+        drawn = [
+            (8, x, y)
+            for x, y in suitability_tiles.tiles_covering(tile_set.spec, 8)
+            if tile_set.tile(8, x, y) != suitability_tiles.empty_tile()
+        ]
+        self.assertGreater(len(drawn), 2)
+        on_disk = list(Path(tile_set.directory).glob("*/*/*.png"))
+        self.assertEqual(len(on_disk), 2)
+
+    def test_tile_endpoint(self):
+        service = self.service()
+        with mock.patch.object(views, "tile_service", service):
+            # Bad URLs are refused before anything is built
+            with mock.patch.object(service, "current") as current:
+                for url in ["/api/tiles/99/0/0", "/api/tiles/6/64/0"]:
+                    self.assertEqual(self.client.get(url).status_code, 404)
+            current.assert_not_called()
+
+            with mock.patch.object(service, "_build_in_background"):
+                response = self.client.get("/api/tiles/6/44/27")
+            self.assertEqual(response.status_code, 503)
+            self.assertIn("Retry-After", response)
+
+            service.build()
+            response = self.client.get("/api/tiles/6/44/27")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], "image/png")
+            self.assertTrue(response.content.startswith(b"\x89PNG"))
+            self.assertIn("max-age=", response["Cache-Control"])
+            cached = self.client.get(
+                "/api/tiles/6/44/27", HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+            self.assertEqual(cached.status_code, 304)
+            self.assertEqual(self.client.get("/api/tiles/2/1/1").status_code, 404)
+            self.assertEqual(self.client.get("/api/tiles/6/0/0").status_code, 200)
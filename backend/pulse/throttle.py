@@ -0,0 +1,151 @@
+"""
+Per-client token-bucket rate limiting for the inference and form endpoints.
+
+Each (scope, client IP) pair has a bucket holding up to ``burst`` tokens,
+refilled at ``rate`` tokens per second; a request takes one token or is
+answered 429 with Retry-After (the seconds until a token is back). Scopes
+and their limits come from ``RATE_LIMITS`` (``{scope: (rate, burst)}``); a
+scope that is missing or None is not limited.
+
+Buckets live in this process, so with N workers a client gets up to N times
+the limit. ``RATE_LIMIT_MAX_CLIENTS`` caps the number of buckets kept: the
+least recently used are dropped first (a dropped bucket comes back full).
+Behind reverse proxies, ``RATE_LIMIT_TRUSTED_PROXIES`` is how many of them
+append to X-Forwarded-For; the client IP is read from that position.
+"""
+
+import functools
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+from .inference import InferenceOverloaded
+from .metrics import REJECTED
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def client_ip(request):
+    """The client's address, skipping the trusted proxies' hops"""
+    proxies = _setting("RATE_LIMIT_TRUSTED_PROXIES", 0)
+    if proxies:
+        hops = [
+            hop.strip()
+            for hop in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")
+            if hop.strip()
+        ]
+        if len(hops) >= proxies:
+            return hops[-proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+class RateLimiter:
+    """Token buckets keyed by (scope, client), least recently used first"""
+
+    def __init__(self, max_clients=None):
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        # key -> [tokens, monotonic time of last refill]
+        self._buckets = OrderedDict()
+
+    def take(self, key, rate, burst, now=None):
+        """
+        Take a token from ``key``'s bucket. Returns 0 when allowed, or the
+        seconds until a token is available.
+        """
+        now = time.monotonic() if now is None else now
+        max_clients = self.max_clients or _setting("RATE_LIMIT_MAX_CLIENTS", 100000)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(burst), now]
+                while len(self._buckets) > max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate if rate > 0 else math.inf
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+rate_limiter = RateLimiter()
+
+
+def _retry_response(status, message, retry_after):
+    response = JsonResponse({"status": "error", "message": message}, status=status)
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def overloaded_response(error):
+    """503 for a request the inference gate refused"""
+    return _retry_response(
+        503, "Server is busy, please retry shortly", error.retry_after
+    )
+
+
+def _check(scope, request):
+    limit = _setting("RATE_LIMITS", {}).get(scope)
+    if not limit:
+        return None
+    rate, burst = limit
+    wait = rate_limiter.take((scope, client_ip(request)), rate, burst)
+    if not wait:
+        return None
+    REJECTED.inc(scope, "rate_limited")
+    if math.isinf(wait):
+        wait = 3600
+    return _retry_response(429, "Too many requests", wait)
+
+
+def rate_limit(scope):
+    """
+    View decorator: limit each client to ``RATE_LIMITS[scope]``, and answer
+    503 when the view raises InferenceOverloaded.
+    """
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+
+            @functools.wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                refused = _check(scope, request)
+                if refused is not None:
+                    return refused
+                try:
+                    return await view(request, *args, **kwargs)
+                except InferenceOverloaded as e:
+                    return overloaded_response(e)
+
+        else:
+
+            @functools.wraps(view)
+            def wrapper(request, *args, **kwargs):
+                refused = _check(scope, request)
+                if refused is not None:
+                    return refused
+                try:
+                    return view(request, *args, **kwargs)
+                except InferenceOverloaded as e:
+                    return overloaded_response(e)
+
+        return wrapper
+
+    return decorator
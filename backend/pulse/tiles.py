@@ -0,0 +1,154 @@
+"""
+Serving side of the suitability tiles (see suitability_tiles.py).
+
+``TileService.current()`` picks the tile set matching the dataset
+version and the model versions the registry is serving. After a model is
+hot-swapped, or the CSV changes, that set does not exist yet: one background
+thread builds it, rescoring only the models whose grid is not cached, while
+requests keep getting tiles from the previous set with a short max-age.
+Tiles are rendered from a set's score grid on first request and cached on
+disk, up to ``TILES_MAX_RENDERED`` per set; tiles outside the grid are
+served empty without rendering.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+import columnar
+import suitability_tiles
+from suitability_tiles import GridSpec, TileStore
+
+from .dataset import dams_dataset
+from .registry import BASE_DIR, model_registry
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAMES = ("geological", "climatic")
+# Seconds before a failed background build is attempted again
+RETRY_SECONDS = 60
+
+
+class TileService:
+    def __init__(self, root=None, registry=None, dataset=None, step=None, zooms=None):
+        self.store = TileStore(
+            root or getattr(settings, "TILES_DIR", BASE_DIR / "tile_cache"),
+            max_tiles=getattr(settings, "TILES_MAX_RENDERED", 20000),
+        )
+        self.registry = registry or model_registry
+        self.dataset = dataset or dams_dataset
+        self.step = step or getattr(
+            settings, "TILES_GRID_STEP", suitability_tiles.DEFAULT_STEP
+        )
+        self.zooms = zooms or (
+            getattr(settings, "TILES_MIN_ZOOM", 5),
+            getattr(settings, "TILES_MAX_ZOOM", 12),
+        )
+        self.workers = getattr(settings, "TILES_WORKERS", None)
+        self._spec = (None, None)
+        # key -> opened TileSet; grids are memory-mapped, so keeping them is cheap
+        self._sets = {}
+        self._building = threading.Lock()
+        self._failed_at = None
+
+    def _grid_spec(self):
+        snapshot = self.dataset.get()
+        version, spec = self._spec
+        if version != snapshot.version:
+            index = snapshot.spatial_index
+            spec = GridSpec.covering(
+                index.lats, index.lons, step=self.step, dataset_version=snapshot.version
+            )
+            self._spec = (snapshot.version, spec)
+        return spec
+
+    def target(self):
+        """
+        (grid spec, {name: version}, {name: artifact path}) of the set that
+        should be served, or None while the geological model is unavailable
+        """
+        models = {name: self.registry.get(name) for name in MODEL_NAMES}
+        models = {name: m for name, m in models.items() if m is not None}
+        if "geological" not in models:
+            return None
+        return (
+            self._grid_spec(),
+            {name: m.version for name, m in models.items()},
+            {name: str(m.path) for name, m in models.items()},
+        )
+
+    def in_range(self, z, x, y):
+        """Whether z/x/y is a tile of the configured zooms (checked before any build)"""
+        min_zoom, max_zoom = self.zooms
+        return min_zoom <= z <= max_zoom and 0 <= x < 2**z and 0 <= y < 2**z
+
+    def _open(self, key):
+        tile_set = self._sets.get(key)
+        if tile_set is None:
+            tile_set = self.store.open(key)
+            if tile_set is not None:
+                self._sets = {key: tile_set}
+        return tile_set
+
+    def current(self):
+        """
+        (TileSet, stale): the set for the served model versions, or the
+        latest built one while that is being built (stale=True). TileSet is
+        None when nothing has been built yet.
+        """
+        target = self.target()
+        if target is None:
+            return None, False
+        spec, versions, _ = target
+        tile_set = self._open(self.store.set_key(spec, versions))
+        if tile_set is not None:
+            return tile_set, False
+        self._build_in_background()
+        latest = self.store.latest()
+        return latest, latest is not None
+
+    def build(self, prerender=False):
+        """Build the set for the served model versions now; returns (TileSet, rescored models)"""
+        target = self.target()
+        if target is None:
+            raise RuntimeError("Geological model not loaded")
+        spec, versions, artifacts = target
+        dams = columnar.read_dataframe(self.dataset.path)
+        tile_set, scored = self.store.build(
+            spec,
+            dams,
+            artifacts,
+            versions,
+            self.zooms,
+            workers=self.workers,
+            prerender=prerender,
+        )
+        logger.info(
+            f"Suitability tiles {tile_set.key} ready "
+            f"(rescored: {', '.join(scored) or 'none'})"
+        )
+        return tile_set, scored
+
+    def _build_in_background(self):
+        # At most one build at a time; requests keep using the previous set
+        if self._failed_at and time.monotonic() - self._failed_at < RETRY_SECONDS:
+            return
+        if not self._building.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.build()
+                self._failed_at = None
+            except Exception as e:
+                self._failed_at = time.monotonic()
+                logger.error(f"Building suitability tiles failed: {e}", exc_info=True)
+            finally:
+                self._building.release()
+
+        threading.Thread(target=run, name="suitability-tiles", daemon=True).start()
+
+
+tile_service = TileService()
@@ -0,0 +1,227 @@
+"""
+Per-request stage timers, reported in a ``Server-Timing`` response header.
+
+Views and the code they call wrap their steps in ``stage("name")``:
+
+    with stage("parse"):
+        data = json.loads(request.body)
+
+pulse.middleware.StageTimingMiddleware puts a StageTimer in a context
+variable for each request while timing is enabled, so stages are recorded
+from anywhere below the view, including the inference pool (run_inference
+carries the context over). The header lists each stage's total duration in
+milliseconds plus ``total``; browsers show it in the network panel.
+
+A fraction (``sample_rate``) of timed requests is also kept, with its full
+breakdown, in a per-process ring buffer of ``STAGE_TIMING_BUFFER_SIZE``
+entries that GET /api/debug/timings dumps.
+
+Timing is switched at runtime by POST /api/debug/timings. The state is
+kept in ``<METRICS_DIR>/stage_timing.json``, which every worker re-reads at
+most once per ``STAGE_TIMING_CHECK_INTERVAL`` seconds; ``STAGE_TIMING``
+(``{"enabled": ..., "sample_rate": ...}``) is the state before any switch.
+While off, a request costs one cached check and each ``stage()`` returns a
+shared no-op context manager.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CONTROL_FILE = "stage_timing.json"
+
+_current = ContextVar("stage_timer", default=None)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class StageTimer:
+    """Durations of the named stages of one request, in seconds"""
+
+    __slots__ = ("start", "stages")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        # name -> total seconds, in order of first use
+        self.stages = {}
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def header(self, total):
+        parts = [f"{name};dur={s * 1e3:.3f}" for name, s in self.stages.items()]
+        parts.append(f"total;dur={total * 1e3:.3f}")
+        return ", ".join(parts)
+
+
+class _Stage:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name):
+    """Context manager timing ``name`` on the current request's timer, if any"""
+    timer = _current.get()
+    if timer is None:
+        return _NO_STAGE
+    return _Stage(timer, name)
+
+
+def start_request():
+    """Install a fresh timer for this request; returns (timer, reset token)"""
+    timer = StageTimer()
+    return timer, _current.set(timer)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+# ------------------------------------------------------
+# Runtime switch and sample buffer
+# ------------------------------------------------------
+class StageTimingControl:
+    """
+    Whether timing is on and the sampled breakdowns of this process.
+    The switch is shared by every worker through the control file.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._file_mtime = None
+        self._state = None
+        self.samples = deque(maxlen=_setting("STAGE_TIMING_BUFFER_SIZE", 200))
+
+    def _default(self):
+        state = {"enabled": False, "sample_rate": 0.0}
+        state.update(_setting("STAGE_TIMING", {}))
+        return state
+
+    def _control_path(self):
+        directory = _setting("METRICS_DIR", None)
+        return os.path.join(directory, CONTROL_FILE) if directory else None
+
+    def state(self):
+        """{"enabled", "sample_rate"}, re-read from the control file when due"""
+        now = time.monotonic()
+        checked_at = self._checked_at
+        interval = _setting("STAGE_TIMING_CHECK_INTERVAL", 1)
+        if checked_at is not None and now - checked_at < interval:
+            return self._state
+        with self._lock:
+            if self._checked_at is None or now - self._checked_at >= interval:
+                self._state = self._read()
+                self._checked_at = now
+            return self._state
+
+    def _read(self):
+        path = self._control_path()
+        if path is None:
+            return self._state or self._default()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self._file_mtime = None
+            return self._default()
+        if mtime == self._file_mtime and self._state is not None:
+            return self._state
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = {**self._default(), **json.load(f)}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable stage timing control {path}: {e}")
+            return self._state or self._default()
+        self._file_mtime = mtime
+        return state
+
+    def enabled(self):
+        return self.state()["enabled"]
+
+    def switch(self, enabled, sample_rate=None):
+        """Turn timing on or off in this process and, via the file, the others"""
+        state = dict(self.state())
+        state["enabled"] = bool(enabled)
+        if sample_rate is not None:
+            state["sample_rate"] = min(max(float(sample_rate), 0.0), 1.0)
+        path = self._control_path()
+        if path is not None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, path)
+        with self._lock:
+            self._state = state
+            self._checked_at = time.monotonic()
+            if path is not None:
+                self._file_mtime = os.stat(path).st_mtime_ns
+        return state
+
+    def record(self, timer, total, view, method, status):
+        """Keep this request's breakdown if it falls in the sample"""
+        rate = self._state["sample_rate"] if self._state else 0.0
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return
+        self.samples.append(
+            {
+                "at": time.time(),
+                "view": view,
+                "method": method,
+                "status": status,
+                "total_ms": round(total * 1e3, 3),
+                "stages_ms": {
+                    name: round(s * 1e3, 3) for name, s in timer.stages.items()
+                },
+            }
+        )
+
+    def dump(self):
+        return {**self.state(), "pid": os.getpid(), "samples": list(self.samples)}
+
+    def reset(self):
+        with self._lock:
+            self._checked_at = None
+            self._file_mtime = None
+            self._state = None
+        self.samples.clear()
+
+
+stage_timing = StageTimingControl()
@@ -3,7 +3,16 @@ from . import views
 
 urlpatterns = [
     path('predict/', views.predict_suitability, name='predict_suitability'),
+    path('predict/cache/', views.prediction_cache_stats, name='prediction_cache_stats'),
+    path('models/', views.model_status, name='model_status'),
+    path('metrics', views.metrics, name='metrics'),
+    path('debug/timings', views.stage_timings, name='stage_timings'),
+    path('predict/batch/', views.predict_suitability_batch, name='predict_suitability_batch'),
+    path('predict/bulk/', views.predict_suitability_bulk, name='predict_suitability_bulk'),
     path('dams_csv/', views.dams_csv, name='dams_csv'),
+    path('dams/nearby/', views.dams_nearby, name='dams_nearby'),
+    path('dams/bbox/', views.dams_bbox, name='dams_bbox'),
+    path('tiles/<int:z>/<int:x>/<int:y>', views.suitability_tile, name='suitability_tile'),
     path('contact/submit/', views.submit_contact_form, name='submit_contact_form'),
     path('letusknow/submit/', views.submit_letusknow_form, name='submit_letusknow_form'),
     path('feedback/submit/', views.submit_feedback_form, name='submit_feedback_form'),  # ✅ New route
@@ -1,19 +1,30 @@
-from django.http import JsonResponse, HttpResponse
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
-from django.core.mail import send_mail
+from django.views.decorators.http import condition, require_http_methods
 from django.conf import settings
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+import hashlib
 import json
-import os
-from pathlib import Path
-import joblib
-import csv
 import logging
-import pandas as pd  # FIXED - used for aligning features with ML models
 import numpy as np
 
 from .models import Dam, Contact, LetUsKnow, Feedback
+from .bulk import FORMATS, BulkScorer, BulkScoringError
+from .cache import PredictionCache
+from . import dams
+from .dam_index import DamQuery, DamQueryError
+from .encoding import IDENTITY, negotiate
+from .inference import InferenceOverloaded, inference_gate, run_inference
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics_registry
+from .registry import model_registry
+from .tiles import tile_service
+from .throttle import rate_limit
+from .timing import stage, stage_timing
+from .outbox import build_email
+from .writebehind import Submission, form_buffer
 
 # ------------------------------------------------------
 # Logging configuration
@@ -23,20 +34,21 @@ logger = logging.getLogger(__name__)
 # ------------------------------------------------------
 # Load ML models
 # ------------------------------------------------------
-BASE_DIR = Path(__file__).resolve().parent.parent
-try:
-    geo_model_data = joblib.load(os.path.join(BASE_DIR, "geological_model.pkl"))
-    clim_model_data = joblib.load(os.path.join(BASE_DIR, "climatic_model.pkl"))
-    geo_model = geo_model_data["model"]
-    clim_model = clim_model_data["model"]
-except Exception as e:
-    logger.error(f"Error loading ML models: {str(e)}")
-    geo_model_data, clim_model_data, geo_model, clim_model = None, None, None, None
+# Artifacts load lazily on first use (or at startup with MODEL_EAGER_LOAD),
+# memory-mapped where possible; see pulse.registry.
+prediction_cache = PredictionCache(
+    maxsize=getattr(settings, "PREDICTION_CACHE_SIZE", 4096),
+    ttl=getattr(settings, "PREDICTION_CACHE_TTL", 3600),
+)
 
 
 # ------------------------------------------------------
 # Helpers
 # ------------------------------------------------------
+# Upper bound on sites accepted by a single batch prediction request
+MAX_BATCH_SIZE = 1000
+
+
 def get_suitability_level(score):
     if score >= 80:
         return "Excellent"
@@ -50,18 +62,13 @@ def get_suitability_level(score):
         return "Poor"
 
 
-def send_thank_you_email(name, email):
-    """Send thank-you email after form submissions"""
-    try:
-        send_mail(
-            subject="Thank You for Reaching Out!",
-            message=f"Dear {name},\n\nThank you for contacting PlanetPulse. We appreciate your input and will respond if necessary.\n\nBest regards,\nTeam PlanetPulse",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            fail_silently=True,
-        )
-    except Exception as e:
-        logger.warning(f"Failed to send thank-you email to {email}: {str(e)}")
+def thank_you_email(name, email):
+    """Thank-you email queued with every form submission"""
+    return build_email(
+        subject="Thank You for Reaching Out!",
+        message=f"Dear {name},\n\nThank you for contacting PlanetPulse. We appreciate your input and will respond if necessary.\n\nBest regards,\nTeam PlanetPulse",
+        recipient=email,
+    )
 
 
 # ------------------------------------------------------
@@ -69,81 +76,34 @@ def send_thank_you_email(name, email):
 # ------------------------------------------------------
 @csrf_exempt
 @require_http_methods(["POST"])
-def predict_suitability(request):
+@rate_limit("predict")
+async def predict_suitability(request):
+    # Native async: model inference runs on the bounded inference pool, so a
+    # slow prediction never blocks the event loop (see pulse.inference)
     try:
-        data = json.loads(request.body)
+        with stage("parse"):
+            data = json.loads(request.body)
         logger.info("Incoming data keys: %s", list(data.keys()))
 
-        if geo_model is None:
+        geo = await model_registry.aget("geological")
+        if geo is None:
             return JsonResponse(
                 {"status": "error", "message": "Geological model not loaded"},
                 status=500,
             )
 
-        # -------- FEATURE MAPPING (frontend → training features) --------
-        feature_mapping = {
-            # Geo
-            "latitude": "Latitude",
-            "longitude": "Longitude",
-            "elevation": "Elevation",
-            "slope": "Slope(%)",
-            "mainSoilType": "SoilType_Main",
-            "secondarySoilType": "SoilType_Secondary",
-            "seismicZone": "Seismic_Zone",
-            "damType": "Type",
-            "length": "Length (m)",
-            "maxHeight": "Max Height above Foundation (m)",
-            "riverDistance": "RiverDistance(km)",
-            "riverFlowRate": "RiverFlowRate(m/day)",
-            # Climate
-            "rainfall2020": "Rainfall_2020",
-            "rainfall2021": "Rainfall_2021",
-            "rainfall2022": "Rainfall_2022",
-            "rainfall2023": "Rainfall_2023",
-            "rainfall2024": "Rainfall_2024",
-            "rainfall5YearAvg": "Rainfall_5yr_Avg",
-            "rainfallStdDev5yr": "Rainfall_StdDev_5yr",
-            "maxAnnualRainfall": "Max_Annual_Rainfall",
-            "minAnnualRainfall": "Min_Annual_Rainfall",
-            "monsoonIntensity": "MonsoonIntensityAvg(mm/wet_day)",
-            "extremeRainfallDays": "Extreme_Rainfall_Days",
-            "floodRiskIndex": "Flood_Risk_Index",
-            "cycloneExposure": "Cyclone_Exposure",
-            "avgTemperature5yr": "Avg_Temperature_5yr",
-            "maxTemperatureLast5yr": "Max_Temperature_Last5yr",
-            "temperatureStdDev5yr": "Temperature_StdDev_5yr",
-            "heatwaveDaysPerYear": "Heatwave_Days_PerYear",
-            "ensoImpactIndex": "ENSO_Impact_Index",
-            "climateVulnerabilityIndex": "Climate_Vulnerability_Index",
-            "ndvi2025": "NDVI_2025(avg)",
-        }
-
-        # Apply mapping
-        mapped_data = {v: data[k] for k, v in feature_mapping.items() if k in data}
-        logger.info("Mapped data: %s", mapped_data)
-
-        # ---------- Sanitize Input (convert 'Unknown' / non-numeric to 0) ----------
-        for key, val in mapped_data.items():
-            try:
-                if isinstance(val, str) and (
-                    val.strip().lower() == "unknown" or not val.strip()
-                ):
-                    mapped_data[key] = 0
-                else:
-                    mapped_data[key] = float(val)
-            except Exception:
-                mapped_data[key] = 0
-
         # -------- Geological Prediction --------
         try:
-            geo_features = geo_model_data["features"]
-            geo_scaler = geo_model_data.get("scaler")
-            geo_df = pd.DataFrame([mapped_data]).reindex(
-                columns=geo_features, fill_value=0
-            )
-            if geo_scaler:
-                geo_df = geo_scaler.transform(geo_df)
-            geo_score = geo_model.predict(geo_df)[0]
+            with stage("geo_features"):
+                geo_row = geo.row_builder.build_row(data)
+            with stage("geo_predict"):
+                geo_score = await prediction_cache.aget_or_compute(
+                    ("geo", geo.version),
+                    geo_row,
+                    lambda: run_inference(lambda: geo.predict(geo_row)[0]),
+                )
+        except InferenceOverloaded:
+            raise
         except Exception as e:
             logger.error(f"Geo prediction error: {str(e)}", exc_info=True)
             return JsonResponse(
@@ -162,19 +122,21 @@ def predict_suitability(request):
                     "level": get_suitability_level(geo_score),
                 }
             },
+            "model_versions": {"geological": geo.version},
         }
 
         # -------- Climatic Prediction --------
-        if clim_model:
+        clim = await model_registry.aget("climatic")
+        if clim:
             try:
-                clim_features = clim_model_data["features"]
-                clim_scaler = clim_model_data.get("scaler")
-                clim_df = pd.DataFrame([mapped_data]).reindex(
-                    columns=clim_features, fill_value=0
-                )
-                if clim_scaler:
-                    clim_df = clim_scaler.transform(clim_df)
-                clim_score = clim_model.predict(clim_df)[0]
+                with stage("clim_features"):
+                    clim_row = clim.row_builder.build_row(data)
+                with stage("clim_predict"):
+                    clim_score = await prediction_cache.aget_or_compute(
+                        ("clim", clim.version),
+                        clim_row,
+                        lambda: run_inference(lambda: clim.predict(clim_row)[0]),
+                    )
 
                 response["predictions"]["climate_impact"] = {
                     "score": round(float(clim_score), 2),
@@ -186,16 +148,22 @@ def predict_suitability(request):
                     "score": round(overall_score, 2),
                     "level": get_suitability_level(overall_score),
                 }
+                response["model_versions"]["climatic"] = clim.version
+            except InferenceOverloaded:
+                raise
             except Exception as e:
                 logger.error(f"Climate prediction error: {str(e)}")
                 response["warnings"] = f"Climate impact prediction skipped: {str(e)}"
         else:
             logger.warning("Climate model not loaded, skipping climate prediction")
 
-        return JsonResponse(response)
+        with stage("serialize"):
+            return JsonResponse(response)
 
     except json.JSONDecodeError:
         return JsonResponse({"status": "error", "message": "Invalid JSON"}, status=400)
+    except InferenceOverloaded:
+        raise
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}", exc_info=True)
         return JsonResponse(
@@ -204,105 +172,561 @@ def predict_suitability(request):
         )
 
 
+@require_http_methods(["GET"])
+def prediction_cache_stats(request):
+    """Hit / miss / eviction counters of the prediction cache"""
+    return JsonResponse({"status": "success", "cache": prediction_cache.stats()})
+
+
+@require_http_methods(["GET"])
+def model_status(request):
+    """Loaded model versions, load times and this process's RSS"""
+    return JsonResponse({"status": "success", **model_registry.stats()})
+
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """Counters and latency histograms of every worker, Prometheus text format"""
+    return HttpResponse(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def stage_timings(request):
+    """
+    Stage timing switch and this process's sampled breakdowns (see
+    pulse.timing). GET dumps them; POST {"enabled": bool, "sample_rate":
+    0..1} switches timing for every worker. Staff users only, unless DEBUG.
+    """
+    if not (settings.DEBUG or request.user.is_staff):
+        return JsonResponse(
+            {"status": "error", "message": "Staff access required"}, status=403
+        )
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            if not isinstance(data, dict) or not isinstance(data.get("enabled"), bool):
+                raise ValueError('Expected {"enabled": true|false}')
+            sample_rate = data.get("sample_rate")
+            if sample_rate is not None:
+                sample_rate = float(sample_rate)
+                if not 0 <= sample_rate <= 1:
+                    raise ValueError("sample_rate must be between 0 and 1")
+        except (ValueError, TypeError) as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
+        stage_timing.switch(data["enabled"], sample_rate)
+    return JsonResponse({"status": "success", **stage_timing.dump()})
+
+
+# ------------------------------------------------------
+# Batch ML Prediction Endpoint
+# ------------------------------------------------------
+@csrf_exempt
+@require_http_methods(["POST"])
+@rate_limit("predict_batch")
+def predict_suitability_batch(request):
+    """
+    Score many candidate sites in one request.
+
+    Accepts either a JSON array of site objects or {"sites": [...]}, with each
+    site using the same keys as /api/predict/. Each model runs once over the
+    whole feature matrix; results (or per-site errors) are returned in input
+    order.
+    """
+    try:
+        with stage("parse"):
+            data = json.loads(request.body)
+        sites = data.get("sites") if isinstance(data, dict) else data
+
+        if not isinstance(sites, list):
+            return JsonResponse(
+                {"status": "error", "message": "Expected a list of sites"},
+                status=400,
+            )
+        if len(sites) > MAX_BATCH_SIZE:
+            return JsonResponse(
+                {
+                    "status": "error",
+                    "message": f"Batch too large (max {MAX_BATCH_SIZE} sites)",
+                },
+                status=400,
+            )
+        geo = model_registry.get("geological")
+        if geo is None:
+            return JsonResponse(
+                {"status": "error", "message": "Geological model not loaded"},
+                status=500,
+            )
+        clim = model_registry.get("climatic")
+
+        results = [None] * len(sites)
+        valid_indices, valid_sites = [], []
+        for i, site in enumerate(sites):
+            if not isinstance(site, dict):
+                results[i] = {
+                    "index": i,
+                    "status": "error",
+                    "message": "Site must be a JSON object",
+                }
+                continue
+            valid_indices.append(i)
+            valid_sites.append(site)
+
+        logger.info(
+            "Batch prediction: %d sites (%d valid)", len(sites), len(valid_sites)
+        )
+
+        geo_scores, clim_scores, warning = None, None, None
+        if valid_sites:
+            # The batch holds one inference slot; a full queue raises
+            # InferenceOverloaded, answered 503 by rate_limit
+            with inference_gate().slot():
+                try:
+                    with stage("geo_features"):
+                        geo_matrix = geo.row_builder.build_matrix(valid_sites)
+                    with stage("geo_predict"):
+                        geo_scores = geo.predict(geo_matrix)
+                except Exception as e:
+                    logger.error(f"Batch geo prediction error: {str(e)}", exc_info=True)
+                    return JsonResponse(
+                        {
+                            "status": "error",
+                            "message": f"Geological prediction failed: {str(e)}",
+                        },
+                        status=500,
+                    )
+
+                if clim:
+                    try:
+                        with stage("clim_features"):
+                            clim_matrix = clim.row_builder.build_matrix(valid_sites)
+                        with stage("clim_predict"):
+                            clim_scores = clim.predict(clim_matrix)
+                    except Exception as e:
+                        logger.error(f"Batch climate prediction error: {str(e)}")
+                        warning = f"Climate impact prediction skipped: {str(e)}"
+                else:
+                    logger.warning(
+                        "Climate model not loaded, skipping climate prediction"
+                    )
+
+        for pos, i in enumerate(valid_indices):
+            geo_score = float(geo_scores[pos])
+            predictions = {
+                "geological_suitability": {
+                    "score": round(geo_score, 2),
+                    "level": get_suitability_level(geo_score),
+                }
+            }
+            if clim_scores is not None:
+                clim_score = float(clim_scores[pos])
+                overall_score = geo_score * 0.6 + clim_score * 0.4
+                predictions["climate_impact"] = {
+                    "score": round(clim_score, 2),
+                    "level": get_suitability_level(clim_score),
+                }
+                predictions["overall_suitability"] = {
+                    "score": round(overall_score, 2),
+                    "level": get_suitability_level(overall_score),
+                }
+            results[i] = {"index": i, "status": "success", "predictions": predictions}
+
+        response = {"status": "success", "count": len(results), "results": results}
+        response["model_versions"] = {"geological": geo.version}
+        if clim_scores is not None:
+            response["model_versions"]["climatic"] = clim.version
+        if warning:
+            response["warnings"] = warning
+        with stage("serialize"):
+            return JsonResponse(response)
+
+    except json.JSONDecodeError:
+        return JsonResponse({"status": "error", "message": "Invalid JSON"}, status=400)
+    except InferenceOverloaded:
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction error: {str(e)}", exc_info=True)
+        return JsonResponse(
+            {"status": "error", "message": "An error occurred during prediction"},
+            status=500,
+        )
+
+
+# ------------------------------------------------------
+# Bulk CSV Scoring Endpoint
+# ------------------------------------------------------
+@csrf_exempt
+@require_http_methods(["POST"])
+@rate_limit("predict_bulk")
+def predict_suitability_bulk(request):
+    """
+    Score every row of an uploaded CSV laid out like Dams_Gujarat.csv.
+
+    The CSV is sent as a multipart "file" field or as a raw text/csv body.
+    Results stream back as NDJSON (default) or CSV (?format=csv), one line
+    per input row, while the upload is read and scored in fixed-size chunks
+    (see pulse.bulk).
+    """
+    fmt = request.GET.get("format", "ndjson")
+    if fmt not in FORMATS:
+        return JsonResponse(
+            {"status": "error", "message": f"Unsupported format '{fmt}'"}, status=400
+        )
+    geo = model_registry.get("geological")
+    if geo is None:
+        return JsonResponse(
+            {"status": "error", "message": "Geological model not loaded"}, status=500
+        )
+    clim = model_registry.get("climatic")
+    if clim is None:
+        logger.warning("Climate model not loaded, skipping climate prediction")
+
+    if request.content_type == "multipart/form-data":
+        source = request.FILES.get("file")
+        if source is None:
+            return JsonResponse(
+                {"status": "error", "message": "Missing 'file' upload"}, status=400
+            )
+    else:
+        # Raw body: parsed straight off the request stream, never buffered whole
+        source = request
+
+    # Refused up front when inference is saturated; once streaming, each chunk
+    # waits for a slot instead
+    gate = inference_gate()
+    gate.check()
+    scorer = BulkScorer(geo, clim, gate=gate)
+    try:
+        chunks = scorer.read(source)
+    except BulkScoringError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+    response = StreamingHttpResponse(
+        scorer.stream(chunks, fmt), content_type=FORMATS[fmt]
+    )
+    response["X-Model-Versions"] = ",".join(
+        f"{name}={version}" for name, version in scorer.model_versions().items()
+    )
+    if fmt == "csv":
+        response["Content-Disposition"] = 'attachment; filename="scores.csv"'
+    return response
+
+
 # ------------------------------------------------------
 # CSV Loader
 # ------------------------------------------------------
-def dams_csv(request):
+def _query_etag(etag, request):
+    """ETag of one filtered listing: the table version plus the query"""
+    query = sorted((k, v) for k, values in request.GET.lists() for v in values)
+    digest = hashlib.sha256(json.dumps(query).encode()).hexdigest()[:16]
+    return f'"{etag.strip(chr(34))}-{digest}"'
+
+
+def _variant_etag(etag, fmt, coding):
+    """ETag of one representation of the full listing"""
+    if fmt == "rows" and coding == IDENTITY:
+        return etag
+    suffix = fmt if coding == IDENTITY else f"{fmt}-{coding}"
+    return f'"{etag.strip(chr(34))}-{suffix}"'
+
+
+async def dams_csv(request):
     """
-    Return JSON list of dams loaded from Dams_Gujarat.csv.
-    Only returns required fields.
+    Return JSON list of all dams (the Dams_Gujarat.csv fields the frontend
+    needs), read from the Dam table.
+
+    The serialized list is cached in memory until the table changes;
+    ETag / Last-Modified let repeat visitors get a 304. Checking the cache
+    costs one aggregate query; rebuilding it runs in a thread.
+
+    ?format=columnar sends one array per field instead (see pulse.encoding).
+    Both formats are also gzip (and, with the brotli package, br) compressed
+    once per version, and served as the request's Accept-Encoding prefers.
+
+    With any of the listing parameters (district, category, score ranges,
+    fields, sort, limit, cursor) the response is a page instead:
+    {"status", "total", "count", "results", "next_cursor"}, answered from
+    the in-memory indexes of the cached version (see pulse.dam_index).
     """
-    csv_path = Path(__file__).resolve().parent.parent / "Dams_Gujarat.csv"
-    required_fields = [
-        "Name",
-        "Latitude",
-        "Longitude",
-        "Purpose",
-        "River",
-        "Nearest City",
-        "District",
-        "Elevation",
-        "Type",
-        "Length (m)",
-        "Max Height above Foundation (m)",
-        "Geological_Suitability_Score",
-        "Climatic_Effect_Score",
-        "Overall_Suitability_Score",
-        "Geological_Suitability_Category",
-        "Climatic_Effect_Category",
-        "Overall_Suitability_Category",
-        "NearestRiver",
-        "RiverDistance(km)",
-        "RiverFlowRate(m/day)",
-    ]
+    fmt = request.GET.get("format", "rows")
+    if fmt not in dams.LISTING_FORMATS:
+        formats = ", ".join(dams.LISTING_FORMATS)
+        return JsonResponse(
+            {
+                "status": "error",
+                "message": f"Parameter 'format' must be one of: {formats}",
+            },
+            status=400,
+        )
+
+    query = None
+    if DamQuery.applies(request.GET):
+        if fmt != "rows":
+            return JsonResponse(
+                {
+                    "status": "error",
+                    "message": "format=columnar is only available for the full listing",
+                },
+                status=400,
+            )
+        try:
+            query = DamQuery.from_params(request.GET)
+        except DamQueryError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
+        coding = IDENTITY
+    else:
+        coding = negotiate(request.headers.get("Accept-Encoding"))
 
-    dams = []
     try:
-        with open(csv_path, newline="", encoding="utf-8") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                dam_data = {field: row.get(field, None) for field in required_fields}
-                for numeric_field in [
-                    "Latitude",
-                    "Longitude",
-                    "Elevation",
-                    "Length (m)",
-                    "Max Height above Foundation (m)",
-                    "Geological_Suitability_Score",
-                    "Climatic_Effect_Score",
-                    "Overall_Suitability_Score",
-                    "RiverDistance(km)",
-                    "RiverFlowRate(m/day)",
-                ]:
-                    if dam_data[numeric_field]:
-                        try:
-                            dam_data[numeric_field] = float(dam_data[numeric_field])
-                        except ValueError:
-                            dam_data[numeric_field] = None
-                dams.append(dam_data)
-    except FileNotFoundError:
-        logger.error(f"CSV file not found at {csv_path}")
+        with stage("version"):
+            etag, last_modified = await dams.atable_version()
+        if query:
+            response_etag = _query_etag(etag, request)
+        else:
+            response_etag = _variant_etag(etag, fmt, coding)
+        last_modified = int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=response_etag, last_modified=last_modified
+        )
+        if response is None:
+            listing = dams.cached_listing(etag)
+            if listing is None:
+                with stage("build_listing"):
+                    listing = await sync_to_async(dams.build_listing)(etag)
+            if query is None:
+                response = HttpResponse(
+                    listing.body(fmt, coding), content_type="application/json"
+                )
+                if coding != IDENTITY:
+                    response["Content-Encoding"] = coding
+            else:
+                with stage("query"):
+                    total, results, next_cursor = listing.index.query(query)
+                response = JsonResponse(
+                    {
+                        "status": "success",
+                        "total": total,
+                        "count": len(results),
+                        "results": results,
+                        "next_cursor": next_cursor,
+                    }
+                )
+    except DamQueryError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error reading dams: {str(e)}", exc_info=True)
         return JsonResponse(
-            {"status": "error", "message": "Dams CSV file not found"}, status=500
+            {"status": "error", "message": "Error reading dams data"}, status=500
         )
+
+    response["Cache-Control"] = "no-cache"
+    response["ETag"] = response_etag
+    response["Last-Modified"] = http_date(last_modified)
+    if query is None:
+        patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+# ------------------------------------------------------
+# Spatial Dam Queries
+# ------------------------------------------------------
+# Upper bound on rows returned by the spatial query endpoints
+MAX_SPATIAL_RESULTS = 500
+
+
+def _float_param(request, name, required=True, minimum=None, maximum=None):
+    raw = request.GET.get(name)
+    if raw in (None, ""):
+        if required:
+            raise ValueError(f"Missing required parameter '{name}'")
+        return None
+    try:
+        value = float(raw)
+    except ValueError:
+        raise ValueError(f"Parameter '{name}' must be a number")
+    if not np.isfinite(value):
+        raise ValueError(f"Parameter '{name}' must be a number")
+    if (minimum is not None and value < minimum) or (
+        maximum is not None and value > maximum
+    ):
+        if maximum is None:
+            bounds = f"at least {minimum}"
+        elif minimum is None:
+            bounds = f"at most {maximum}"
+        else:
+            bounds = f"between {minimum} and {maximum}"
+        raise ValueError(f"Parameter '{name}' must be {bounds}")
+    return value
+
+
+@require_http_methods(["GET"])
+def dams_nearby(request):
+    """
+    Return dams near a point, nearest first.
+
+    Query: lat, lon, and radius_km and/or k (k nearest, default 10 when no
+    radius is given). Each dam carries an extra "distance_km" field.
+    """
+    try:
+        lat = _float_param(request, "lat", minimum=-90, maximum=90)
+        lon = _float_param(request, "lon", minimum=-180, maximum=180)
+        radius_km = _float_param(request, "radius_km", required=False, minimum=0)
+        k = _float_param(
+            request, "k", required=False, minimum=1, maximum=MAX_SPATIAL_RESULTS
+        )
+        k = int(k) if k is not None else (None if radius_km is not None else 10)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+    try:
+        with stage("query"):
+            matches = dams.nearby(lat, lon, radius_km=radius_km, k=k)
+    except Exception as e:
+        logger.error(f"Error querying dams: {str(e)}", exc_info=True)
+        return JsonResponse(
+            {"status": "error", "message": "Error reading dams data"}, status=500
+        )
+
+    results = [
+        dict(row, distance_km=round(distance, 3))
+        for row, distance in matches[:MAX_SPATIAL_RESULTS]
+    ]
+    return JsonResponse(
+        {"status": "success", "count": len(results), "results": results}
+    )
+
+
+@require_http_methods(["GET"])
+def dams_bbox(request):
+    """
+    Return dams inside a bounding box, in dataset order.
+
+    Query: min_lat, min_lon, max_lat, max_lon. A box with min_lon > max_lon
+    is treated as crossing the antimeridian.
+    """
+    try:
+        min_lat = _float_param(request, "min_lat", minimum=-90, maximum=90)
+        min_lon = _float_param(request, "min_lon", minimum=-180, maximum=180)
+        max_lat = _float_param(request, "max_lat", minimum=-90, maximum=90)
+        max_lon = _float_param(request, "max_lon", minimum=-180, maximum=180)
+        if min_lat > max_lat:
+            raise ValueError("min_lat must not exceed max_lat")
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+    try:
+        with stage("query"):
+            results = dams.bbox(min_lat, min_lon, max_lat, max_lon)
     except Exception as e:
-        logger.error(f"Error reading dams CSV: {str(e)}")
+        logger.error(f"Error querying dams: {str(e)}", exc_info=True)
         return JsonResponse(
             {"status": "error", "message": "Error reading dams data"}, status=500
         )
 
-    return JsonResponse(dams, safe=False)
+    return JsonResponse(
+        {"status": "success", "count": len(results), "results": results}
+    )
+
+
+# ------------------------------------------------------
+# Suitability Tiles
+# ------------------------------------------------------
+def _tile_etag(request, z, x, y):
+    if not tile_service.in_range(z, x, y):
+        return None
+    try:
+        tile_set, _ = tile_service.current()
+    except Exception:
+        return None
+    return tile_set.key if tile_set else None
+
+
+@require_http_methods(["GET"])
+@condition(etag_func=_tile_etag)
+def suitability_tile(request, z, x, y):
+    """
+    256 px PNG tile of the overall suitability heatmap (see pulse.tiles).
+
+    Tiles of the current model versions are cached for TILES_MAX_AGE; while a
+    new set is built after a model change, the previous set is served with a
+    short max-age. The ETag changes with the set.
+    """
+    # Before current(): a bad URL must not start a build
+    if not tile_service.in_range(z, x, y):
+        return JsonResponse(
+            {"status": "error", "message": "Tile out of range"}, status=404
+        )
+    try:
+        tile_set, stale = tile_service.current()
+    except Exception as e:
+        logger.error(f"Error reading suitability tiles: {str(e)}", exc_info=True)
+        return JsonResponse(
+            {"status": "error", "message": "Error reading suitability tiles"},
+            status=500,
+        )
+    if tile_set is None:
+        response = JsonResponse(
+            {"status": "error", "message": "Suitability tiles are being built"},
+            status=503,
+        )
+        response["Retry-After"] = "30"
+        return response
+    if not tile_set.in_range(z, x, y):
+        return JsonResponse(
+            {"status": "error", "message": "Tile out of range"}, status=404
+        )
+
+    with stage("render"):
+        tile = tile_set.tile(z, x, y)
+    response = HttpResponse(tile, content_type="image/png")
+    max_age = 60 if stale else getattr(settings, "TILES_MAX_AGE", 3600)
+    response["Cache-Control"] = f"public, max-age={max_age}"
+    response["X-Model-Versions"] = ",".join(
+        f"{name}={version}" for name, version in tile_set.versions.items()
+    )
+    return response
 
 
 # ------------------------------------------------------
 # Form Handlers
 # ------------------------------------------------------
+async def save_submission(model, fields, notification, name, email):
+    """
+    Save a form row and queue its emails in one transaction, batched with
+    other submissions by the write-behind buffer (see pulse.writebehind).
+    """
+    row = model(**fields, created_at=timezone.now())
+    emails = [
+        build_email(recipient=email, **notification),
+        thank_you_email(name, email),
+    ]
+    await form_buffer.asave(Submission(row, emails))
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
-def submit_contact_form(request):
+@rate_limit("contact")
+async def submit_contact_form(request):
     try:
-        data = json.loads(request.body)
+        with stage("parse"):
+            data = json.loads(request.body)
         name = data.get("name", "")
         email = data.get("email", "")
         subject = data.get("subject", "")
         message = data.get("message", "")
 
-        Contact.objects.create(
-            name=name,
-            email=email,
-            subject=subject,
-            message=message,
-            created_at=timezone.now(),
-        )
-
-        send_mail(
-            subject=f"New Contact Form: {subject}",
-            message=f"From: {name} <{email}>\n\nMessage:\n{message}",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            fail_silently=True,
-        )
-        send_thank_you_email(name, email)
+        # Row and its emails commit together; delivery happens in the background
+        with stage("save"):
+            await save_submission(
+                Contact,
+                dict(name=name, email=email, subject=subject, message=message),
+                dict(
+                    subject=f"New Contact Form: {subject}",
+                    message=f"From: {name} <{email}>\n\nMessage:\n{message}",
+                ),
+                name,
+                email,
+            )
 
         return JsonResponse(
             {"status": "success", "message": "Contact form submitted successfully"}
@@ -318,30 +742,29 @@ def submit_contact_form(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def submit_letusknow_form(request):
+@rate_limit("letusknow")
+async def submit_letusknow_form(request):
     try:
-        data = json.loads(request.body)
+        with stage("parse"):
+            data = json.loads(request.body)
         name = data.get("name", "")
         email = data.get("email", "")
         organization = data.get("organization", "")
         message = data.get("message", "")
 
-        LetUsKnow.objects.create(
-            name=name,
-            email=email,
-            organization=organization,
-            message=message,
-            created_at=timezone.now(),
-        )
-
-        send_mail(
-            subject=f"New LetUsKnow Form from {name}",
-            message=f"Organization (Dam Name): {organization}\nEmail: {email}\n\nMessage:\n{message}",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            fail_silently=True,
-        )
-        send_thank_you_email(name, email)
+        with stage("save"):
+            await save_submission(
+                LetUsKnow,
+                dict(
+                    name=name, email=email, organization=organization, message=message
+                ),
+                dict(
+                    subject=f"New LetUsKnow Form from {name}",
+                    message=f"Organization (Dam Name): {organization}\nEmail: {email}\n\nMessage:\n{message}",
+                ),
+                name,
+                email,
+            )
 
         return JsonResponse(
             {"status": "success", "message": "LetUsKnow form submitted successfully"}
@@ -358,25 +781,26 @@ def submit_letusknow_form(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def submit_feedback_form(request):
+@rate_limit("feedback")
+async def submit_feedback_form(request):
     try:
-        data = json.loads(request.body)
+        with stage("parse"):
+            data = json.loads(request.body)
         name = data.get("name", "")
         email = data.get("email", "")
         feedback_msg = data.get("feedback", "")
 
-        Feedback.objects.create(
-            name=name, email=email, feedback=feedback_msg, created_at=timezone.now()
-        )
-
-        send_mail(
-            subject=f"New Feedback from {name}",
-            message=f"Email: {email}\n\nMessage:\n{feedback_msg}",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            fail_silently=True,
-        )
-        send_thank_you_email(name, email)
+        with stage("save"):
+            await save_submission(
+                Feedback,
+                dict(name=name, email=email, feedback=feedback_msg),
+                dict(
+                    subject=f"New Feedback from {name}",
+                    message=f"Email: {email}\n\nMessage:\n{feedback_msg}",
+                ),
+                name,
+                email,
+            )
 
         return JsonResponse(
             {"status": "success", "message": "Feedback submitted successfully"}
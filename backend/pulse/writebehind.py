@@ -0,0 +1,257 @@
+"""
+Write-behind buffer for form submissions.
+
+Each submission is a Contact / LetUsKnow / Feedback row plus its outbox
+emails. Instead of one transaction per submission, the views add them to
+``form_buffer``, and everything pending is written in one transaction (a
+``bulk_create`` per model), so a burst takes the SQLite write lock a few
+times instead of once per request. Rows and their emails commit together.
+
+By default (``FORM_BUFFER_WAIT``) a view answers only once its submission
+is committed: group commit. The request appends its submission and takes
+the write lock; whoever holds it writes everything pending, so requests
+that arrived during a write find theirs committed by the next one. No
+acknowledged submission can be lost.
+
+``FORM_BUFFER_WAIT = False`` opts into fire-and-forget: the view answers
+as soon as the submission is buffered, and a background thread writes once
+``FORM_BUFFER_SIZE`` submissions are pending or the oldest has waited
+``FORM_BUFFER_INTERVAL`` seconds. Pending submissions are written at
+interpreter exit, but a killed process (OOM, SIGKILL) loses up to
+``FORM_BUFFER_INTERVAL`` seconds of submissions its users were told were
+saved. With ``FORM_BUFFER_MAX_PENDING`` pending, the adding request writes
+them itself.
+
+When a batch fails, its submissions are written one by one: those failing
+with a database OperationalError (e.g. still locked after the busy
+timeout) go back to the buffer and the background thread retries them,
+any other failure is logged and reported to the waiting view.
+``FORM_BUFFER = False`` writes each submission in its own transaction.
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, transaction
+
+from .metrics import FORM_BATCH_SIZE, FORM_WRITE_DURATION
+from .models import OutboxEmail
+from .outbox import notify_outbox
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class Submission:
+    """A form row and its outbox emails, unsaved until written"""
+
+    __slots__ = ("row", "emails", "future")
+
+    def __init__(self, row, emails=()):
+        self.row = row
+        self.emails = [e for e in emails if e is not None]
+        # Resolved once the row is committed (or failed for good)
+        self.future = Future()
+
+
+def write_submissions(submissions):
+    """Save ``submissions`` in one transaction; the outbox wakes on commit"""
+    by_model = {}
+    for submission in submissions:
+        by_model.setdefault(type(submission.row), []).append(submission.row)
+    emails = [e for submission in submissions for e in submission.emails]
+    try:
+        with transaction.atomic():
+            for model, rows in by_model.items():
+                model.objects.bulk_create(rows)
+            if emails:
+                OutboxEmail.objects.bulk_create(emails)
+                notify_outbox()
+    except Exception:
+        # Ids handed out by the rolled-back inserts may go to other rows
+        for submission in submissions:
+            for obj in [submission.row, *submission.emails]:
+                obj.pk = None
+        raise
+
+
+class WriteBehindBuffer:
+    """Pending submissions of this process and the thread that writes them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Wakes the writer when a batch starts and when it is full
+        self._full = threading.Condition(self._lock)
+        # One write at a time; waiting requests queue here behind the
+        # one writing (reentrant: flush() takes it too)
+        self._write_lock = threading.RLock()
+        self._pending = []
+        self._pending_since = None
+        self._writer = None
+        ref = weakref.ref(self)
+
+        def after_fork():
+            buffer = ref()
+            if buffer is not None:
+                buffer._after_fork()
+
+        os.register_at_fork(after_in_child=after_fork)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, submission, wake=True):
+        """
+        Queue ``submission`` for the next batch; returns its future. With
+        ``wake`` the background thread writes it in due course.
+        """
+        size = _setting("FORM_BUFFER_SIZE", 100)
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append(submission)
+            pending = len(self._pending)
+            if wake:
+                self._wake_writer(pending >= size)
+        return submission.future
+
+    async def asave(self, submission):
+        """
+        Save ``submission`` the way the settings ask for (see module doc);
+        raises the error that dropped it, if any
+        """
+        if not _setting("FORM_BUFFER", True):
+            await sync_to_async(write_submissions)([submission])
+            return
+        if not _setting("FORM_BUFFER_WAIT", True):
+            self.add(submission)
+            if len(self) >= _setting("FORM_BUFFER_MAX_PENDING", 1000):
+                await sync_to_async(self.flush)()
+            return
+        self.add(submission, wake=False)
+        await sync_to_async(self.commit)(submission)
+        await asyncio.wrap_future(submission.future)
+
+    def commit(self, submission):
+        """Return once ``submission`` (already added) is written or retried"""
+        with self._write_lock:
+            if not submission.future.done():
+                self.flush()
+        if not submission.future.done():
+            # Left buffered (database locked): the background thread retries
+            with self._lock:
+                self._wake_writer(True)
+
+    def flush(self):
+        """Write every pending submission now; returns how many were written"""
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            start = time.perf_counter()
+            try:
+                write_submissions(batch)
+                written = batch
+            except Exception as e:
+                logger.warning(
+                    f"Writing {len(batch)} form submissions failed, "
+                    f"retrying one by one: {e}"
+                )
+                written = self._write_each(batch)
+            FORM_WRITE_DURATION.observe(time.perf_counter() - start)
+            if written:
+                FORM_BATCH_SIZE.observe(len(written))
+            for submission in written:
+                submission.future.set_result(submission.row)
+            return len(written)
+
+    def _write_each(self, batch):
+        written, retry = [], []
+        for submission in batch:
+            try:
+                write_submissions([submission])
+            except OperationalError as e:
+                logger.warning(f"Form submission left buffered: {e}")
+                retry.append(submission)
+                continue
+            except Exception as e:
+                logger.error(
+                    f"Dropping {type(submission.row).__name__} submission: {e}",
+                    exc_info=True,
+                )
+                submission.future.set_exception(e)
+                continue
+            written.append(submission)
+        if retry:
+            with self._lock:
+                if not self._pending:
+                    self._pending_since = time.monotonic()
+                self._pending[:0] = retry
+        return written
+
+    def close(self):
+        """Write what is left (registered to run at interpreter exit)"""
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Final form buffer flush failed: {e}", exc_info=True)
+        if self._pending:
+            logger.error(f"{len(self._pending)} form submissions were not saved")
+
+    def _wake_writer(self, now):
+        # Called with self._lock held
+        if self._writer is None:
+            self._writer = threading.Thread(
+                target=self._run_writer, name="form-writer", daemon=True
+            )
+            self._writer.start()
+            atexit.register(self.close)
+        if now or len(self._pending) == 1:
+            self._full.notify()
+
+    def _wait_for_batch(self):
+        interval = _setting("FORM_BUFFER_INTERVAL", 0.2)
+        size = _setting("FORM_BUFFER_SIZE", 100)
+        with self._lock:
+            while True:
+                if self._pending:
+                    remaining = self._pending_since + interval - time.monotonic()
+                    if remaining <= 0 or len(self._pending) >= size:
+                        return
+                    self._full.wait(remaining)
+                else:
+                    self._full.wait()
+
+    def _run_writer(self):
+        while True:
+            self._wait_for_batch()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Form writer error: {str(e)}", exc_info=True)
+            finally:
+                close_old_connections()
+
+    def _after_fork(self):
+        # The parent writes its own pending submissions; the child starts empty
+        self._lock = threading.Lock()
+        self._full = threading.Condition(self._lock)
+        self._write_lock = threading.RLock()
+        self._pending = []
+        self._pending_since = None
+        self._writer = None
+
+
+form_buffer = WriteBehindBuffer()
@@ -0,0 +1,645 @@
+"""
+Suitability raster tiles over the dam dataset's bounding box.
+
+The models are evaluated over a regular lat/lon grid (``step`` degrees)
+covering every dam plus a margin. Each grid point gets its model inputs by
+inverse-distance weighting of the ``NEIGHBOURS`` nearest dams; categorical
+and zone-like columns take the nearest dam's value instead. Points further
+than ``max_distance_km`` from any dam are left empty. The grid is scored in
+chunks across a process pool, each worker loading the model artifacts and
+the dam records once.
+
+Score grids are cached per model version, so when only one model changes
+only its grid is recomputed. A tile set combines them into the overall
+score (0.6 geological + 0.4 climatic, as in /api/predict/) and renders
+256 px web-mercator PNG tiles from it on demand (only tiles overlapping
+the grid, and at most ``max_tiles`` of them kept on disk per set):
+
+    <root>/grids/<model>.<model version>.<grid key>.npy
+    <root>/<set key>/manifest.json      model versions, grid, zoom range
+    <root>/<set key>/overall.npy        overall score grid
+    <root>/<set key>/<z>/<x>/<y>.png
+
+The set key hashes the grid key (dataset version, bounding box, step,
+interpolation settings) and the model versions. Served by
+/api/tiles/<z>/<x>/<y> (see pulse.tiles); ``python manage.py build_tiles``
+builds and pre-renders a set.
+"""
+
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+from scipy.spatial import cKDTree
+
+from feature_pipeline import CATEGORICAL_COLUMNS, FeaturePipeline
+
+TILE_SIZE = 256
+FORMAT_VERSION = 1
+# Grid settings
+DEFAULT_STEP = 0.02
+MARGIN_DEGREES = 0.1
+NEIGHBOURS = 8
+IDW_POWER = 2
+MAX_DISTANCE_KM = 50
+# Grid points per scoring task
+CHUNK_POINTS = 8192
+# Taken from the nearest dam rather than averaged
+NEAREST_COLUMNS = set(CATEGORICAL_COLUMNS) | {"Seismic_Zone", "Cyclone_Exposure"}
+# Colour ramp: score -> RGB (scores are clipped to the outer stops)
+SCORE_STOPS = [55.0, 62.0, 69.0, 76.0, 83.0]
+COLOUR_STOPS = [
+    (215, 48, 39),
+    (252, 141, 89),
+    (254, 224, 139),
+    (145, 207, 96),
+    (26, 152, 80),
+]
+ALPHA = 170
+# Previous tile sets kept on disk besides the newest
+KEEP_SETS = 1
+
+# Grid points are scored as plain arrays in training column order
+warnings.filterwarnings(
+    "ignore", message="X does not have valid feature names", category=UserWarning
+)
+
+
+def _hash(payload):
+    data = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _km_xy(lat, lon, lat0):
+    """Equirectangular projection to km; fine at the scale of one state"""
+    return np.column_stack(
+        (
+            np.asarray(lon) * 111.32 * math.cos(math.radians(lat0)),
+            np.asarray(lat) * 110.57,
+        )
+    )
+
+
+# ------------------------------------------------------
+# Grid
+# ------------------------------------------------------
+class GridSpec:
+    """Regular lat/lon grid; row i is latitude south + i * step"""
+
+    def __init__(self, south, west, north, east, step, dataset_version=None):
+        self.south, self.west = float(south), float(west)
+        self.north, self.east = float(north), float(east)
+        self.step = float(step)
+        self.dataset_version = dataset_version
+        self.lats = self.south + self.step * np.arange(
+            int(round((self.north - self.south) / self.step)) + 1
+        )
+        self.lons = self.west + self.step * np.arange(
+            int(round((self.east - self.west) / self.step)) + 1
+        )
+
+    @classmethod
+    def covering(cls, lat, lon, step=DEFAULT_STEP, margin=MARGIN_DEGREES, **kw):
+        """Grid over the bounding box of the given points, snapped to step"""
+        lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        ok = ~(np.isnan(lat) | np.isnan(lon))
+        snap = lambda v, f: round(f(v / step) * step, 10)  # noqa: E731
+        return cls(
+            snap(lat[ok].min() - margin, math.floor),
+            snap(lon[ok].min() - margin, math.floor),
+            snap(lat[ok].max() + margin, math.ceil),
+            snap(lon[ok].max() + margin, math.ceil),
+            step,
+            **kw,
+        )
+
+    @property
+    def shape(self):
+        return len(self.lats), len(self.lons)
+
+    def points(self):
+        lat, lon = np.meshgrid(self.lats, self.lons, indexing="ij")
+        return lat.ravel(), lon.ravel()
+
+    def to_dict(self):
+        return {
+            "south": self.south,
+            "west": self.west,
+            "north": self.north,
+            "east": self.east,
+            "step": self.step,
+            "dataset_version": self.dataset_version,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def key(self):
+        return _hash(
+            dict(
+                self.to_dict(),
+                format=FORMAT_VERSION,
+                neighbours=NEIGHBOURS,
+                power=IDW_POWER,
+                max_distance_km=MAX_DISTANCE_KM,
+            )
+        )
+
+
+class FeatureInterpolator:
+    """Model input columns at arbitrary points, from the dam records"""
+
+    def __init__(self, dams, columns, neighbours=NEIGHBOURS, power=IDW_POWER):
+        lat = dams["Latitude"].to_numpy(dtype=float)
+        lon = dams["Longitude"].to_numpy(dtype=float)
+        ok = ~(np.isnan(lat) | np.isnan(lon))
+        dams = dams[ok]
+        self.lat0 = float(np.mean(lat[ok]))
+        self.tree = cKDTree(_km_xy(lat[ok], lon[ok], self.lat0))
+        self.k = min(neighbours, len(dams))
+        self.power = power
+        columns = [c for c in columns if c not in ("Latitude", "Longitude")]
+        self.nearest = {
+            c: dams[c].to_numpy(dtype=object) for c in columns if c in NEAREST_COLUMNS
+        }
+        self.numeric = [c for c in columns if c not in NEAREST_COLUMNS]
+        self.values = (
+            np.column_stack(
+                [dams[c].to_numpy(dtype=float, na_value=np.nan) for c in self.numeric]
+            )
+            if self.numeric
+            else np.empty((len(dams), 0))
+        )
+
+    def __call__(self, lat, lon):
+        """
+        Returns (columns, distance_km): raw column name -> values at each
+        point, and the distance to the nearest dam.
+        """
+        distance, idx = self.tree.query(_km_xy(lat, lon, self.lat0), k=self.k)
+        distance, idx = distance.reshape(len(lat), -1), idx.reshape(len(lat), -1)
+        weights = 1.0 / np.maximum(distance, 1e-6) ** self.power
+        columns = {
+            "Latitude": np.asarray(lat, float),
+            "Longitude": np.asarray(lon, float),
+        }
+        if self.numeric:
+            values = self.values[idx]  # (points, k, columns)
+            present = ~np.isnan(values)
+            w = weights[:, :, None] * present
+            with np.errstate(invalid="ignore"):
+                mean = (w * np.where(present, values, 0.0)).sum(axis=1) / w.sum(axis=1)
+            for i, column in enumerate(self.numeric):
+                columns[column] = mean[:, i]
+        for column, values in self.nearest.items():
+            columns[column] = values[idx[:, 0]]
+        return columns, distance[:, 0]
+
+
+class GridScorer:
+    """
+    Scores points with the model artifacts ({name: path}), interpolating
+    their inputs from the dam records.
+    """
+
+    def __init__(self, dams, artifacts):
+        self.models = {}
+        needed = set()
+        for name, path in artifacts.items():
+            data = joblib.load(path)
+            pipeline = data.get("pipeline") and FeaturePipeline.from_state(
+                data["pipeline"]
+            )
+            if hasattr(data["model"], "n_jobs"):
+                # The pool provides the parallelism
+                data["model"].n_jobs = 1
+            self.models[name] = (data, pipeline)
+            needed |= set(
+                pipeline.raw_columns + pipeline.categorical
+                if pipeline
+                else data["features"]
+            )
+        self.interpolate = FeatureInterpolator(dams, sorted(needed))
+
+    def _matrix(self, data, pipeline, columns):
+        if pipeline is not None:
+            numeric = {c: columns[c].astype(float) for c in pipeline.raw_columns}
+            categories = {
+                c: [None if v != v else v for v in columns[c]]
+                for c in pipeline.categorical
+            }
+            return pipeline.transform_columns(numeric, categories)
+        # Legacy artifacts: raw feature columns, missing values as 0
+        n = len(columns["Latitude"])
+        matrix = np.zeros((n, len(data["features"])))
+        for i, feature in enumerate(data["features"]):
+            if feature in columns:
+                try:
+                    matrix[:, i] = np.nan_to_num(columns[feature].astype(float))
+                except (TypeError, ValueError):
+                    pass
+        return matrix
+
+    def score(self, lat, lon, names=None, max_distance_km=MAX_DISTANCE_KM):
+        """{name: scores}, NaN for points too far from any dam"""
+        columns, distance = self.interpolate(lat, lon)
+        near = distance <= max_distance_km
+        columns = {c: v[near] for c, v in columns.items()}
+        out = {}
+        for name in names or self.models:
+            data, pipeline = self.models[name]
+            scores = np.full(len(lat), np.nan)
+            if near.any():
+                matrix = self._matrix(data, pipeline, columns)
+                if data.get("scaler"):
+                    matrix = data["scaler"].transform(matrix)
+                scores[near] = data["model"].predict(matrix)
+            out[name] = scores
+        return out
+
+
+_worker_state = {}
+
+
+def _init_worker(dams, artifacts):
+    # Runs once per pool process: models and dam records load once, not per chunk
+    _worker_state["scorer"] = GridScorer(dams, artifacts)
+
+
+def _score_chunk(lat, lon, names):
+    return _worker_state["scorer"].score(lat, lon, names)
+
+
+def score_grid(
+    spec, dams, artifacts, names=None, workers=None, chunk_points=CHUNK_POINTS
+):
+    """
+    Score every grid point with the named models. Chunks run in a process
+    pool when more than one worker is available. Returns {name: 2-D grid}.
+    """
+    names = list(names or artifacts)
+    lat, lon = spec.points()
+    chunks = [
+        (lat[i : i + chunk_points], lon[i : i + chunk_points])
+        for i in range(0, len(lat), chunk_points)
+    ]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks)))
+    if workers == 1:
+        scorer = GridScorer(dams, artifacts)
+        results = [scorer.score(a, b, names) for a, b in chunks]
+    else:
+        # spawn: the server starts rebuilds from a thread, where fork is unsafe
+        with ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(dams, artifacts),
+        ) as pool:
+            futures = [pool.submit(_score_chunk, a, b, names) for a, b in chunks]
+            results = [future.result() for future in futures]
+    return {
+        name: np.concatenate([r[name] for r in results]).reshape(spec.shape)
+        for name in names
+    }
+
+
+def overall_scores(grids):
+    """Overall suitability as in /api/predict/; geological alone without climate"""
+    if "climatic" in grids:
+        return grids["geological"] * 0.6 + grids["climatic"] * 0.4
+    return grids["geological"]
+
+
+# ------------------------------------------------------
+# Tiles
+# ------------------------------------------------------
+def tile_bounds(z, x, y):
+    """(west, south, east, north) of a web-mercator tile in degrees"""
+    n = 2**z
+    return (
+        x / n * 360.0 - 180.0,
+        _tile_lat(y + 1, n),
+        (x + 1) / n * 360.0 - 180.0,
+        _tile_lat(y, n),
+    )
+
+
+def _tile_lat(y, n):
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+
+def _tile_index(lat, lon, z):
+    n = 2**z
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_covering(spec, z):
+    """(x, y) of every tile at zoom z that overlaps the grid"""
+    x0, y0 = _tile_index(spec.north, spec.west, z)
+    x1, y1 = _tile_index(spec.south, spec.east, z)
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def sample_grid(grid, spec, lat, lon):
+    """Bilinear interpolation of grid at lat (rows) x lon (columns); NaN outside"""
+    fi = (np.asarray(lat) - spec.south) / spec.step
+    fj = (np.asarray(lon) - spec.west) / spec.step
+    rows, cols = grid.shape
+    inside_i = (fi >= 0) & (fi <= rows - 1)
+    inside_j = (fj >= 0) & (fj <= cols - 1)
+    i0 = np.clip(np.floor(fi).astype(int), 0, rows - 2)
+    j0 = np.clip(np.floor(fj).astype(int), 0, cols - 2)
+    ti = (fi - i0)[:, None]
+    tj = (fj - j0)[None, :]
+    i0, j0 = i0[:, None], j0[None, :]
+    values = (
+        grid[i0, j0] * (1 - ti) * (1 - tj)
+        + grid[i0 + 1, j0] * ti * (1 - tj)
+        + grid[i0, j0 + 1] * (1 - ti) * tj
+        + grid[i0 + 1, j0 + 1] * ti * tj
+    )
+    values[~(inside_i[:, None] & inside_j[None, :])] = np.nan
+    return values
+
+
+def _palette():
+    """Index 0 is transparent; 1..255 ramp through COLOUR_STOPS"""
+    scores = np.linspace(SCORE_STOPS[0], SCORE_STOPS[-1], 255)
+    rgb = np.zeros((256, 3), dtype=np.uint8)
+    for channel in range(3):
+        rgb[1:, channel] = np.interp(
+            scores, SCORE_STOPS, [colour[channel] for colour in COLOUR_STOPS]
+        ).round()
+    alpha = np.full(256, ALPHA, dtype=np.uint8)
+    alpha[0] = 0
+    return rgb.tobytes(), alpha.tobytes()
+
+
+PALETTE, PALETTE_ALPHA = _palette()
+
+
+def colour_indices(values):
+    """Palette index of each score (0 for NaN)"""
+    lo, hi = SCORE_STOPS[0], SCORE_STOPS[-1]
+    scaled = (np.nan_to_num(values, nan=lo) - lo) / (hi - lo) * 254
+    indices = np.clip(scaled, 0, 254).round().astype(np.uint8) + 1
+    indices[np.isnan(values)] = 0
+    return indices
+
+
+def encode_png(indices):
+    """Palette PNG of an index image (smaller and faster to encode than RGBA)"""
+    from PIL import Image
+
+    image = Image.fromarray(indices)
+    image.putpalette(PALETTE)
+    buf = io.BytesIO()
+    image.save(buf, format="PNG", transparency=PALETTE_ALPHA)
+    return buf.getvalue()
+
+
+def render_tile(grid, spec, z, x, y):
+    """PNG bytes of one tile, or None if it has no scored pixels"""
+    n = 2**z
+    pixels = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+    lon = (x + pixels) / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + pixels) / n))))
+    values = sample_grid(grid, spec, lat, lon)
+    if np.isnan(values).all():
+        return None
+    return encode_png(colour_indices(values))
+
+
+EMPTY_TILE = None
+
+
+def empty_tile():
+    """Fully transparent tile, served where there is nothing to draw"""
+    global EMPTY_TILE
+    if EMPTY_TILE is None:
+        EMPTY_TILE = encode_png(np.zeros((TILE_SIZE, TILE_SIZE), dtype=np.uint8))
+    return EMPTY_TILE
+
+
+# ------------------------------------------------------
+# On-disk tile sets
+# ------------------------------------------------------
+def _atomic_write(path, write):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _save_array(path, array):
+    def write(tmp):
+        # np.save would append .npy to the temporary name
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+
+    _atomic_write(path, write)
+
+
+class TileSet:
+    """
+    One rendered set: an overall score grid plus its cached tiles.
+
+    At most ``max_tiles`` rendered tiles are written to disk (None: no
+    limit); past that, tiles are rendered for each request and not kept.
+    The count is per process, started from the files already on disk.
+    """
+
+    def __init__(self, directory, manifest, grid, max_tiles=None):
+        self.directory = Path(directory)
+        self.manifest = manifest
+        self.key = manifest["key"]
+        self.spec = GridSpec.from_dict(manifest["grid"])
+        self.min_zoom, self.max_zoom = manifest["zooms"]
+        self.grid = grid
+        self.max_tiles = max_tiles
+        self._written = None
+        self._lock = threading.Lock()
+
+    @property
+    def versions(self):
+        return self.manifest["versions"]
+
+    def in_range(self, z, x, y):
+        return self.min_zoom <= z <= self.max_zoom and 0 <= x < 2**z and 0 <= y < 2**z
+
+    def overlaps(self, z, x, y):
+        """Whether tile z/x/y intersects the scored grid"""
+        west, south, east, north = tile_bounds(z, x, y)
+        spec = self.spec
+        return (
+            west <= spec.east
+            and east >= spec.west
+            and south <= spec.north
+            and north >= spec.south
+        )
+
+    def tile(self, z, x, y):
+        """
+        PNG bytes of tile z/x/y (an empty tile outside the scored area),
+        rendered and written to disk on first use
+        """
+        if not self.overlaps(z, x, y):
+            return empty_tile()
+        path = self.directory / str(z) / str(x) / f"{y}.png"
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            pass
+        png = render_tile(self.grid, self.spec, z, x, y)
+        if png is None:
+            return empty_tile()
+        if self._reserve():
+            _atomic_write(path, lambda tmp: tmp.write_bytes(png))
+        return png
+
+    def _reserve(self):
+        """Count one more tile on disk, unless that would exceed max_tiles"""
+        if self.max_tiles is None:
+            return True
+        with self._lock:
+            if self._written is None:
+                self._written = sum(1 for _ in self.directory.glob("*/*/*.png"))
+            if self._written >= self.max_tiles:
+                return False
+            self._written += 1
+            return True
+
+    def prerender(self):
+        count = 0
+        for z in range(self.min_zoom, self.max_zoom + 1):
+            for x, y in tiles_covering(self.spec, z):
+                self.tile(z, x, y)
+                count += 1
+        return count
+
+
+class TileStore:
+    def __init__(self, root, max_tiles=None):
+        self.root = Path(root)
+        # Rendered tiles kept on disk per set (see TileSet)
+        self.max_tiles = max_tiles
+
+    def _grid_path(self, name, version, spec):
+        return self.root / "grids" / f"{name}.{version}.{spec.key()}.npy"
+
+    def set_key(self, spec, versions):
+        return _hash({"grid": spec.key(), "versions": versions})
+
+    def open(self, key):
+        """TileSet for key, or None if it has not been built"""
+        directory = self.root / key
+        try:
+            manifest = json.loads(
+                (directory / "manifest.json").read_text(encoding="utf-8")
+            )
+            grid = np.load(directory / "overall.npy", mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        return TileSet(directory, manifest, grid, max_tiles=self.max_tiles)
+
+    def latest(self):
+        """Most recently built TileSet, or None"""
+        sets = []
+        for manifest in self.root.glob("*/manifest.json"):
+            try:
+                sets.append((manifest.stat().st_mtime, manifest.parent.name))
+            except OSError:
+                continue
+        for _, key in sorted(sets, reverse=True):
+            tile_set = self.open(key)
+            if tile_set is not None:
+                return tile_set
+        return None
+
+    def build(
+        self, spec, dams, artifacts, versions, zooms, workers=None, prerender=False
+    ):
+        """
+        Build (or reuse) the tile set for these model versions. Only models
+        without a cached grid for their version are scored.
+
+        artifacts: {name: artifact path}; versions: {name: version}
+        """
+        key = self.set_key(spec, versions)
+        existing = self.open(key)
+        if existing is not None:
+            if prerender:
+                existing.prerender()
+            return existing, []
+
+        start = time.perf_counter()
+        grids, missing = {}, []
+        for name in artifacts:
+            path = self._grid_path(name, versions[name], spec)
+            if path.exists():
+                grids[name] = np.load(path)
+            else:
+                missing.append(name)
+        if missing:
+            scored = score_grid(spec, dams, artifacts, names=missing, workers=workers)
+            for name, grid in scored.items():
+                _save_array(self._grid_path(name, versions[name], spec), grid)
+                grids[name] = grid
+
+        directory = self.root / key
+        _save_array(directory / "overall.npy", overall_scores(grids))
+        manifest = {
+            "key": key,
+            "versions": versions,
+            "grid": spec.to_dict(),
+            "shape": list(spec.shape),
+            "zooms": list(zooms),
+            "scored": missing,
+            "build_seconds": round(time.perf_counter() - start, 3),
+            "created_at": time.time(),
+        }
+        _atomic_write(
+            directory / "manifest.json",
+            lambda tmp: tmp.write_text(
+                json.dumps(manifest, indent=2), encoding="utf-8"
+            ),
+        )
+        tile_set = self.open(key)
+        if prerender:
+            tile_set.prerender()
+        self.prune(keep=key)
+        return tile_set, missing
+
+    def prune(self, keep, keep_sets=KEEP_SETS):
+        """Drop old tile sets and grids no remaining set was built from"""
+        sets = sorted(
+            (m.stat().st_mtime, m.parent) for m in self.root.glob("*/manifest.json")
+        )
+        others = [d for _, d in sets if d.name != keep]
+        for directory in others[: max(0, len(others) - keep_sets)]:
+            shutil.rmtree(directory, ignore_errors=True)
+        used = set()
+        for manifest in self.root.glob("*/manifest.json"):
+            data = json.loads(manifest.read_text(encoding="utf-8"))
+            spec = GridSpec.from_dict(data["grid"])
+            used |= {
+                self._grid_path(n, v, spec).name for n, v in data["versions"].items()
+            }
+        for grid in (self.root / "grids").glob("*.npy"):
+            if grid.name not in used:
+                grid.unlink(missing_ok=True)
@@ -1,14 +1,21 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.model_selection import train_test_split, KFold, GridSearchCV
 from sklearn.ensemble import HistGradientBoostingRegressor, ExtraTreesRegressor, GradientBoostingRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_squared_error, r2_score
 from sklearn.preprocessing import TargetEncoder
 from sklearn.utils.class_weight import compute_sample_weight
-import pickle, json, warnings
-from scipy import stats
+from threadpoolctl import threadpool_limits
+from concurrent.futures import ProcessPoolExecutor
+import pickle, json, warnings, os, threading, time, argparse
+import sklearn
+from columnar import read_dataframe
+from model_store import ModelStore, artifact_version, file_sha256
+from feature_pipeline import (
+    CATEGORICAL_COLUMNS, DERIVED_INPUTS, PIPELINE_VERSION, FeaturePipeline, derive_features, fit_stats
+)
 
 warnings.filterwarnings('ignore')
 np.random.seed(42)
@@ -16,8 +23,23 @@ np.random.seed(42)
 # ==================================================
 # Data Preparation
 # ==================================================
+def add_derived_features(df, stats=None):
+    """
+    Engineered columns from feature_pipeline (the same code the server runs),
+    added to df in place over whole NumPy columns. The training statistics
+    they need are fitted on df unless given, and kept in df.attrs.
+    """
+    columns = {c: df[c].to_numpy(dtype=float) for c in DERIVED_INPUTS if c in df.columns}
+    stats = fit_stats(columns) if stats is None else stats
+    for name, values in derive_features(columns, stats).items():
+        if name not in columns or name == 'RiverFlowRate(m/day)':
+            df[name] = values
+    df.attrs['feature_stats'] = stats
+    return df
+
 def load_and_prepare_data(filepath):
-    df = pd.read_csv(filepath)
+    # Typed columnar copy of the CSV, rebuilt automatically when it changes
+    df = read_dataframe(filepath)
 
     # Ensure numeric conversions
     num_cols = [
@@ -29,38 +51,7 @@ def load_and_prepare_data(filepath):
             df[col] = pd.to_numeric(df[col], errors='coerce')
 
     # ---------- Feature Engineering ----------
-    rainfall_cols = [f'Rainfall_{year}' for year in range(2020, 2025) if f'Rainfall_{year}' in df.columns]
-    if rainfall_cols:
-        df['Rainfall_Mean'] = df[rainfall_cols].mean(axis=1)
-        df['Rainfall_StdDev'] = df[rainfall_cols].std(axis=1)
-        df['Rainfall_Range'] = df[rainfall_cols].max(axis=1) - df[rainfall_cols].min(axis=1)
-
-        def calc_trend(row):
-            y = row[rainfall_cols].values.astype(float)
-            if len(y) < 2 or np.all(y == y[0]): 
-                return 0.0
-            x = np.arange(len(y))
-            slope, _, _, _, _ = stats.linregress(x, y)
-            return float(slope) if not np.isnan(slope) else 0.0
-        df['Rainfall_Trend'] = df.apply(calc_trend, axis=1)
-
-    if 'RiverFlowRate(m/day)' in df.columns and 'RiverDistance(km)' in df.columns:
-        df['RiverFlowRate(m/day)'] = df['RiverFlowRate(m/day)'].fillna(df['RiverFlowRate(m/day)'].median())
-        if 'Rainfall_5yr_Avg' in df.columns:
-            df['Flow_Rainfall_Ratio'] = df['RiverFlowRate(m/day)'] / (df['Rainfall_5yr_Avg'] + 1e-6)
-            df['River_Impact_Score'] = (df['RiverFlowRate(m/day)'] / df['RiverDistance(km)']).replace([np.inf, -np.inf], np.nan)
-            df['River_Impact_Score'] = df['River_Impact_Score'].fillna(df['River_Impact_Score'].median())
-
-    if 'Avg_Temperature_5yr' in df.columns:
-        df['Temp_Anomaly'] = df['Avg_Temperature_5yr'] - df['Avg_Temperature_5yr'].mean()
-        if 'Heatwave_Days_PerYear' in df.columns:
-            df['Heat_Stress_Index'] = df['Heatwave_Days_PerYear'] * (df['Avg_Temperature_5yr'] / 30.0)
-
-    if 'Flood_Risk_Index' in df.columns and 'Rainfall_5yr_Avg' in df.columns:
-        df['Flood_Risk_Adjusted'] = df['Flood_Risk_Index'] * (df['Rainfall_5yr_Avg'] / 1000)
-
-    if 'Climate_Vulnerability_Index' in df.columns and 'Extreme_Rainfall_Days' in df.columns:
-        df['Climate_Risk_Score'] = df['Climate_Vulnerability_Index'] * (1 + df['Extreme_Rainfall_Days'] / 100)
+    add_derived_features(df)
 
     return df
     
@@ -81,27 +72,135 @@ def evaluate_model(model, X_train, y_train, X_test, y_test, label=""):
     print(f"Test  MSE: {results['test_mse']:.2f}, R²: {results['test_r2']:.3f}")
     return results
 
+def rss_bytes():
+    """Resident set size of this process (peak RSS where /proc is missing)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class StageMonitor:
+    """
+    Wall time and peak RSS of one training stage. RSS is sampled from a
+    background thread every `interval` seconds while the stage runs.
+    """
+    def __init__(self, stage, interval=0.01, sample=True):
+        self.record = {'stage': stage, 'pid': os.getpid()}
+        self.interval = interval
+        self.sample = sample
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._peak = max(self._peak, rss_bytes())
+
+    def __enter__(self):
+        self._peak = rss_bytes()
+        self.record['rss_start_mb'] = round(self._peak / 2**20, 1)
+        self._thread = threading.Thread(target=self._sample, daemon=True) if self.sample else None
+        if self._thread:
+            self._thread.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.record['wall_seconds'] = round(time.perf_counter() - self._start, 3)
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self._peak = max(self._peak, rss_bytes())
+        self.record['peak_rss_mb'] = round(self._peak / 2**20, 1)
+        return False
+
+# ==================================================
+# Model Specs
+# ==================================================
+GEO_FEATURES = [
+    'Latitude', 'Longitude', 'Elevation', 'Slope(%)',
+    'SoilType_Main', 'SoilType_Secondary', 'Seismic_Zone', 'Type',
+    'Length (m)', 'Max Height above Foundation (m)',
+    'RiverDistance(km)', 'RiverFlowRate(m/day)'
+]
+GEO_PARAMS = dict(
+    max_depth=6,
+    learning_rate=0.05,
+    max_iter=400,
+    min_samples_leaf=20,
+    l2_regularization=1.0,
+    early_stopping=True,
+    random_state=42
+)
+
+CLIM_FEATURES = [
+    'Rainfall_2020','Rainfall_2021','Rainfall_2022','Rainfall_2023','Rainfall_2024',
+    'Rainfall_5yr_Avg','Rainfall_StdDev_5yr','Max_Annual_Rainfall','Min_Annual_Rainfall',
+    'MonsoonIntensityAvg(mm/wet_day)','Extreme_Rainfall_Days','Flood_Risk_Index',
+    'Cyclone_Exposure','Avg_Temperature_5yr','Max_Temperature_Last5yr',
+    'Temperature_StdDev_5yr','Heatwave_Days_PerYear','ENSO_Impact_Index',
+    'Climate_Vulnerability_Index','NDVI_2025(avg)',
+    'Rainfall_Mean','Rainfall_StdDev','Rainfall_Range','Rainfall_Trend',
+    'Flow_Rainfall_Ratio','River_Impact_Score','Temp_Anomaly',
+    'Heat_Stress_Index','Flood_Risk_Adjusted','Climate_Risk_Score'
+]
+# Regularized ExtraTrees; n_jobs comes from the worker budget
+CLIM_PARAMS = dict(
+    n_estimators=400,
+    max_depth=20,
+    min_samples_split=10,
+    min_samples_leaf=5,
+    max_features="sqrt",
+    bootstrap=True,
+    random_state=42
+)
+
+CV_FOLDS = 5
+
+ARTIFACTS = {'geological': 'geological_model.pkl', 'climatic': 'climatic_model.pkl'}
+
+def training_params(name):
+    """Everything besides the data that determines a trained artifact"""
+    if name == 'geological':
+        params = {'model': GEO_PARAMS, 'features': GEO_FEATURES}
+    else:
+        params = {'model': CLIM_PARAMS, 'features': CLIM_FEATURES}
+    return dict(params, cv_folds=CV_FOLDS, pipeline=PIPELINE_VERSION, sklearn=sklearn.__version__)
+
+def feature_stats(df):
+    stats = df.attrs.get('feature_stats')
+    if stats is None:
+        stats = fit_stats({c: df[c].to_numpy(dtype=float) for c in DERIVED_INPUTS if c in df.columns})
+    return stats
+
+def save_artifact(model_data, path):
+    # Write then rename, so a running server never reads a partial pickle
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(model_data, f)
+    os.replace(tmp, path)
+
+def build_model(name, n_jobs=1):
+    if name == 'geological':
+        return HistGradientBoostingRegressor(**GEO_PARAMS)
+    return ExtraTreesRegressor(**CLIM_PARAMS, n_jobs=n_jobs)
+
 # ==================================================
 # Geological Model 
 # ==================================================
-def train_geological_model(df):
-    print("\nTraining Geological Model...")
-    geo_features = [
-        'Latitude', 'Longitude', 'Elevation', 'Slope(%)',
-        'SoilType_Main', 'SoilType_Secondary', 'Seismic_Zone', 'Type',
-        'Length (m)', 'Max Height above Foundation (m)',
-        'RiverDistance(km)', 'RiverFlowRate(m/day)'
-    ]
+def prepare_geological(df):
     target = 'Geological_Suitability_Score'
-
-    available = [f for f in geo_features if f in df.columns]
+    available = [f for f in GEO_FEATURES if f in df.columns]
     geo_df = df[available + [target]].dropna()
 
-    # Target encoding for categorical columns
-    cat_cols = [c for c in ['SoilType_Main','SoilType_Secondary','Type'] if c in geo_df.columns]
-    te = TargetEncoder()
+    # Target encoding for categorical columns: cross-fitted values to train
+    # on, one fitted encoder per column for the serving pipeline
+    cat_cols = [c for c in CATEGORICAL_COLUMNS if c in geo_df.columns]
+    encoders = {}
     for col in cat_cols:
-        geo_df[col] = te.fit_transform(geo_df[[col]], geo_df[target])
+        encoders[col] = TargetEncoder()
+        geo_df[col] = encoders[col].fit_transform(geo_df[[col]], geo_df[target])
+    pipeline = FeaturePipeline.from_training(available, feature_stats(df), encoders)
 
     X = geo_df.drop(target, axis=1)
     y = geo_df[target]
@@ -109,57 +208,38 @@ def train_geological_model(df):
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42
     )
+    return {
+        'features': available, 'pipeline': pipeline, 'X': X,
+        'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test,
+        'sw_train': None
+    }
 
-    model = HistGradientBoostingRegressor(
-        max_depth=6,
-        learning_rate=0.05,
-        max_iter=400,
-        min_samples_leaf=20,
-        l2_regularization=1.0,
-        early_stopping=True,
-        random_state=42
-    )
-    model.fit(X_train, y_train)
-
-    # Cross-validation
-    cv_scores = cross_val_score(model, X_train, y_train, cv=5, scoring="r2")
+def finish_geological(prepared, model, cv_scores):
+    print("\nGeological Model")
     print(f"Cross-val R²: {cv_scores} | Mean: {np.mean(cv_scores):.3f}")
-
-    metrics = evaluate_model(model, X_train, y_train, X_test, y_test, label="Geological")
+    p = prepared
+    metrics = evaluate_model(model, p['X_train'], p['y_train'], p['X_test'], p['y_test'], label="Geological")
 
     model_data = {
         'model': model,
-        'encoder': te,
-        'features': available,
+        'pipeline': p['pipeline'].state(),
+        'features': p['features'],
         'metrics': metrics
     }
-    with open('geological_model.pkl', 'wb') as f:
-        pickle.dump(model_data, f)
+    save_artifact(model_data, ARTIFACTS['geological'])
     return model_data
 
 # ==================================================
 # Climatic Model
 # ==================================================
-def train_climatic_model(df):
-    print("\nTraining Climatic Model...")
-    clim_features = [
-        'Rainfall_2020','Rainfall_2021','Rainfall_2022','Rainfall_2023','Rainfall_2024',
-        'Rainfall_5yr_Avg','Rainfall_StdDev_5yr','Max_Annual_Rainfall','Min_Annual_Rainfall',
-        'MonsoonIntensityAvg(mm/wet_day)','Extreme_Rainfall_Days','Flood_Risk_Index',
-        'Cyclone_Exposure','Avg_Temperature_5yr','Max_Temperature_Last5yr',
-        'Temperature_StdDev_5yr','Heatwave_Days_PerYear','ENSO_Impact_Index',
-        'Climate_Vulnerability_Index','NDVI_2025(avg)',
-        'Rainfall_Mean','Rainfall_StdDev','Rainfall_Range','Rainfall_Trend',
-        'Flow_Rainfall_Ratio','River_Impact_Score','Temp_Anomaly',
-        'Heat_Stress_Index','Flood_Risk_Adjusted','Climate_Risk_Score'
-    ]
+def prepare_climatic(df):
     target = 'Climatic_Effect_Score'
-
-    available = [f for f in clim_features if f in df.columns]
+    available = [f for f in CLIM_FEATURES if f in df.columns]
     clim_df = df[available + [target]].dropna()
 
     X = clim_df.drop(target, axis=1)
     y = clim_df[target]
+    pipeline = FeaturePipeline.from_training(available, feature_stats(df))
 
     # Sample weights to balance underrepresented scores
     sample_weights = compute_sample_weight("balanced", y)
@@ -167,25 +247,18 @@ def train_climatic_model(df):
     X_train, X_test, y_train, y_test, sw_train, sw_test = train_test_split(
         X, y, sample_weights, test_size=0.2, random_state=42
     )
+    return {
+        'features': available, 'pipeline': pipeline, 'X': X,
+        'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test,
+        'sw_train': sw_train
+    }
 
-    # Regularized ExtraTrees
-    model = ExtraTreesRegressor(
-        n_estimators=400,
-        max_depth=20,
-        min_samples_split=10,
-        min_samples_leaf=5,
-        max_features="sqrt",
-        bootstrap=True,
-        random_state=42,
-        n_jobs=-1
-    )
-    model.fit(X_train, y_train, sample_weight=sw_train)
-
-    # Cross-validation
-    cv_scores = cross_val_score(model, X_train, y_train, cv=5, scoring="r2")
+def finish_climatic(prepared, model, cv_scores):
+    print("\nClimatic Model")
     print(f"Cross-val R²: {cv_scores} | Mean: {np.mean(cv_scores):.3f}")
-
-    metrics = evaluate_model(model, X_train, y_train, X_test, y_test, label="Climatic")
+    p = prepared
+    X = p['X']
+    metrics = evaluate_model(model, p['X_train'], p['y_train'], p['X_test'], p['y_test'], label="Climatic")
 
     # Feature importance plot
     importances = model.feature_importances_
@@ -197,30 +270,162 @@ def train_climatic_model(df):
     plt.xlabel("Importance")
     plt.tight_layout()
     plt.savefig("climatic_feature_importance.png")
+    plt.close()
 
     pd.DataFrame({'feature': X.columns, 'importance': importances}).to_csv("climatic_feature_importance.csv", index=False)
 
     model_data = {
         'model': model,
-        'features': available,
+        'pipeline': p['pipeline'].state(),
+        'features': p['features'],
         'metrics': metrics,
         'feature_importances': dict(zip(X.columns, importances))
     }
-    with open('climatic_model.pkl', 'wb') as f:
-        pickle.dump(model_data, f)
+    save_artifact(model_data, ARTIFACTS['climatic'])
     return model_data
 
+PREPARE = {'geological': prepare_geological, 'climatic': prepare_climatic}
+FINISH = {'geological': finish_geological, 'climatic': finish_climatic}
+
 # ==================================================
-# Main
+# Orchestration
 # ==================================================
-def main():
-    df = load_and_prepare_data("Dams_Gujarat.csv")
-    geo_model = train_geological_model(df)
-    clim_model = train_climatic_model(df)
+def worker_budget(n_tasks, workers=None):
+    """
+    Split a CPU budget (workers, $TRAINING_WORKERS or all cores) into pool
+    processes x threads per process, so pool size times each model's
+    n_jobs / OpenMP threads never exceeds the budget.
+    """
+    budget = workers or int(os.environ.get('TRAINING_WORKERS', 0)) or os.cpu_count() or 1
+    processes = max(1, min(budget, n_tasks))
+    return processes, max(1, budget // processes)
+
+def run_task(prepared, name, fold, threads):
+    """
+    Fit one model: the final fit on the whole training split (fold=None) or
+    one cross-validation fold. Folds are the KFold splits cross_val_score
+    uses, scored with R², so results match the serial run exactly.
+    """
+    p = prepared[name]
+    model = build_model(name, n_jobs=threads)
+    stage = f"{name}_fit" if fold is None else f"{name}_cv_fold_{fold}"
+    with threadpool_limits(threads), StageMonitor(stage) as monitor:
+        if fold is None:
+            model.fit(p['X_train'], p['y_train'], sample_weight=p['sw_train'])
+            result = model
+        else:
+            train_idx, test_idx = list(KFold(CV_FOLDS).split(p['X_train']))[fold]
+            X, y = p['X_train'], p['y_train']
+            model.fit(X.iloc[train_idx], y.iloc[train_idx])
+            result = r2_score(y.iloc[test_idx], model.predict(X.iloc[test_idx]))
+    return name, fold, result, monitor.record
+
+_worker_state = {}
+
+def _init_worker(prepared, threads):
+    # Runs once per pool process: the prepared data is sent once, not per task
+    _worker_state['prepared'] = prepared
+    _worker_state['threads'] = threads
+
+def _run_worker_task(name, fold):
+    return run_task(_worker_state['prepared'], name, fold, _worker_state['threads'])
+
+def run_training(df, names=('climatic', 'geological'), workers=None):
+    """
+    Train the named models from one prepared DataFrame. The final fits and
+    all CV folds run as independent tasks in a process pool.
+
+    Returns ({name: model_data}, training_report).
+    """
+    stages = []
+    with StageMonitor('prepare_model_inputs') as monitor:
+        prepared = {name: PREPARE[name](df) for name in names}
+    stages.append(monitor.record)
+
+    # Slowest (ExtraTrees) tasks first so they are not left for the end
+    tasks = [(name, fold) for name in names for fold in [None, *range(CV_FOLDS)]]
+    processes, threads = worker_budget(len(tasks), workers)
+    print(f"\nTraining {', '.join(names)}: {len(tasks)} tasks on {processes} process(es) x {threads} thread(s)")
+
+    # No RSS sampler thread in the parent while the pool forks its workers
+    with StageMonitor('fit_and_cross_validate', sample=False) as monitor:
+        if processes == 1:
+            results = [run_task(prepared, name, fold, threads) for name, fold in tasks]
+        else:
+            with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(prepared, threads)) as pool:
+                futures = [pool.submit(_run_worker_task, name, fold) for name, fold in tasks]
+                results = [future.result() for future in futures]
+    stages.append(monitor.record)
+
+    fitted, cv_scores = {}, {name: [0.0] * CV_FOLDS for name in names}
+    for name, fold, result, record in results:
+        stages.append(record)
+        if fold is None:
+            fitted[name] = result
+        else:
+            cv_scores[name][fold] = result
+
+    outputs = {}
+    for name in names:
+        with StageMonitor(f"{name}_evaluate_and_save") as monitor:
+            outputs[name] = FINISH[name](prepared[name], fitted[name], np.array(cv_scores[name]))
+        stages.append(monitor.record)
+
+    report = {'processes': processes, 'threads_per_process': threads, 'stages': stages}
+    return outputs, report
+
+def train_geological_model(df, workers=None):
+    return run_training(df, names=('geological',), workers=workers)[0]['geological']
+
+def train_climatic_model(df, workers=None):
+    return run_training(df, names=('climatic',), workers=workers)[0]['climatic']
 
+# ==================================================
+# Main
+# ==================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the geological and climatic models")
+    parser.add_argument('--data', default="Dams_Gujarat.csv")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="CPU budget for training (default: $TRAINING_WORKERS or all cores)")
+    parser.add_argument('--store', default=None, help="model store directory (default: backend/model_store)")
+    parser.add_argument('--force', action='store_true', help="retrain even if a matching version exists")
+    args = parser.parse_args(argv)
+
+    # An artifact is identified by the CSV's content hash and its training params
+    store = ModelStore(args.store)
+    data_sha256 = file_sha256(args.data)
+    versions = {name: artifact_version(name, data_sha256, training_params(name)) for name in ARTIFACTS}
+    names = [name for name in ('climatic', 'geological') if args.force or not store.has(name, versions[name])]
+    for name in ARTIFACTS:
+        if name not in names:
+            store.activate(name, versions[name])
+            print(f"{name}: version {versions[name]} already trained on this data, skipping")
+    if not names:
+        return
+
+    start = time.perf_counter()
+    with StageMonitor('load_and_prepare_data') as monitor:
+        df = load_and_prepare_data(args.data)
+    outputs, report = run_training(df, names=tuple(names), workers=args.workers)
+    report['stages'].insert(0, monitor.record)
+    report['wall_seconds'] = round(time.perf_counter() - start, 3)
+    report['peak_rss_mb'] = max(stage['peak_rss_mb'] for stage in report['stages'])
+
+    for name in names:
+        store.publish(name, versions[name], ARTIFACTS[name], {
+            'data_path': str(args.data),
+            'data_sha256': data_sha256,
+            'params': training_params(name),
+            'metrics': outputs[name]['metrics']
+        })
+        print(f"{name}: published version {versions[name]}")
+
+    metrics = {name: (outputs[name]['metrics'] if name in outputs else store.meta(name, versions[name])['metrics'])
+               for name in ARTIFACTS}
     summary = {
-        "Geological": geo_model['metrics'],
-        "Climatic": clim_model['metrics']
+        "Geological": metrics['geological'],
+        "Climatic": metrics['climatic']
     }
     print("\n==============================")
     print(" FINAL TRAINING SUMMARY")
@@ -228,6 +433,8 @@ def main():
     print(json.dumps(summary, indent=2))
     print("==============================")
 
+    summary["Versions"] = versions
+    summary["Training"] = report
     with open("model_metrics.json", "w") as f:
         json.dump(summary, f, indent=2)
 
@@ -0,0 +1,192 @@
+"""
+Compact array-based inference for the fitted tree ensembles.
+
+``export_ensemble`` flattens a fitted ExtraTrees / RandomForest regressor or
+HistGradientBoostingRegressor into a handful of contiguous NumPy arrays
+holding every node of every tree:
+
+    feature    int32     split feature (0 at leaves)
+    threshold  float64   go left when x <= threshold (+inf at leaves)
+    children   int32     (n_nodes, 2) global ids of the right / left child;
+                         leaves point at themselves
+    nan_left   bool      where a missing value goes
+    value      float64   leaf value (0 for internal nodes)
+    roots      int32     root node of each tree
+
+``CompactEnsemble.predict`` walks all trees of a batch at once, one level
+per step, so a single row costs ``max_depth`` vectorized steps instead of a
+trip through sklearn's validation and thread pool. This is aimed at small
+batches; for hundreds of rows sklearn's compiled per-tree loops are faster
+(see benchmarks/bench_tree_inference.py). Predictions match sklearn to
+floating-point rounding (see the parity tests).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ARRAYS = ("feature", "threshold", "children", "nan_left", "value", "roots")
+# Rows walked together; bounds the (rows x trees) working arrays
+CHUNK_ROWS = 1024
+
+
+class CompactEnsemble:
+    def __init__(self, arrays, meta):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.kind = meta["kind"]
+        self.n_features = meta["n_features"]
+        self.max_depth = meta["max_depth"]
+        self.baseline = meta["baseline"]
+        self.scale = meta["scale"]
+        # sklearn's decision trees compare float32 inputs
+        self.float32_inputs = meta["float32_inputs"]
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def to_dict(self):
+        return {
+            "arrays": {name: getattr(self, name) for name in ARRAYS},
+            "meta": self.meta,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["arrays"], data["meta"])
+
+    def _predict_chunk(self, X):
+        nodes = np.broadcast_to(self.roots, (len(X), self.n_trees))
+        rows = np.arange(len(X))[:, None]
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = (x <= self.threshold[nodes]) | (
+                np.isnan(x) & self.nan_left[nodes]
+            )
+            nodes = self.children[nodes, go_left.view(np.int8)]
+        return self.baseline + self.value[nodes].sum(axis=1) * self.scale
+
+    def predict(self, X, threads=1):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(
+                f"X has {X.shape[-1]} features, but the ensemble expects {self.n_features}"
+            )
+        if self.float32_inputs:
+            X = X.astype(np.float32).astype(np.float64)
+        if len(X) <= CHUNK_ROWS:
+            return self._predict_chunk(X)
+        chunks = [X[i : i + CHUNK_ROWS] for i in range(0, len(X), CHUNK_ROWS)]
+        if threads > 1:
+            with ThreadPoolExecutor(threads) as pool:
+                return np.concatenate(list(pool.map(self._predict_chunk, chunks)))
+        return np.concatenate([self._predict_chunk(chunk) for chunk in chunks])
+
+
+def _flatten(trees):
+    """
+    trees: iterable of (feature, threshold, left, right, nan_left, value,
+    is_leaf, depth) per tree, with tree-local child ids.
+    """
+    parts = {name: [] for name in ARRAYS}
+    offset, max_depth = 0, 0
+    for feature, threshold, left, right, nan_left, value, is_leaf, depth in trees:
+        n = len(feature)
+        ids = np.arange(offset, offset + n)
+        parts["feature"].append(np.where(is_leaf, 0, feature))
+        parts["threshold"].append(np.where(is_leaf, np.inf, threshold))
+        # Column 0 is taken when go_left is False, column 1 when True
+        parts["children"].append(
+            np.column_stack(
+                [
+                    np.where(is_leaf, ids, right + offset),
+                    np.where(is_leaf, ids, left + offset),
+                ]
+            )
+        )
+        parts["nan_left"].append(np.where(is_leaf, False, nan_left))
+        parts["value"].append(np.where(is_leaf, value, 0.0))
+        parts["roots"].append([offset])
+        offset += n
+        max_depth = max(max_depth, depth)
+    arrays = {
+        "feature": np.concatenate(parts["feature"]).astype(np.int32),
+        "threshold": np.concatenate(parts["threshold"]).astype(np.float64),
+        "children": np.ascontiguousarray(
+            np.concatenate(parts["children"]), dtype=np.int32
+        ),
+        "nan_left": np.concatenate(parts["nan_left"]).astype(bool),
+        "value": np.concatenate(parts["value"]).astype(np.float64),
+        "roots": np.concatenate(parts["roots"]).astype(np.int32),
+    }
+    return arrays, max_depth
+
+
+def _forest_trees(model):
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        nan_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count))
+        yield (
+            tree.feature,
+            tree.threshold,
+            tree.children_left,
+            tree.children_right,
+            np.asarray(nan_left).astype(bool),
+            tree.value[:, 0, 0],
+            is_leaf,
+            tree.max_depth,
+        )
+
+
+def _hgb_trees(model):
+    for predictors in model._predictors:
+        nodes = predictors[0].nodes
+        if nodes["is_categorical"].any():
+            raise NotImplementedError("categorical splits are not supported")
+        yield (
+            nodes["feature_idx"],
+            nodes["num_threshold"],
+            nodes["left"].astype(np.int64),
+            nodes["right"].astype(np.int64),
+            nodes["missing_go_to_left"].astype(bool),
+            nodes["value"],
+            nodes["is_leaf"].astype(bool),
+            int(nodes["depth"].max()),
+        )
+
+
+def export_ensemble(model):
+    """Flatten a fitted sklearn tree ensemble into a CompactEnsemble"""
+    from sklearn.ensemble import (
+        ExtraTreesRegressor,
+        HistGradientBoostingRegressor,
+        RandomForestRegressor,
+    )
+
+    if isinstance(model, (ExtraTreesRegressor, RandomForestRegressor)):
+        if model.n_outputs_ != 1:
+            raise NotImplementedError("multi-output forests are not supported")
+        arrays, max_depth = _flatten(_forest_trees(model))
+        meta = dict(
+            kind="forest",
+            baseline=0.0,
+            scale=1.0 / len(model.estimators_),
+            float32_inputs=True,
+        )
+    elif isinstance(model, HistGradientBoostingRegressor):
+        if model.loss not in ("squared_error", "absolute_error", "quantile"):
+            raise NotImplementedError(f"loss {model.loss!r} is not supported")
+        arrays, max_depth = _flatten(_hgb_trees(model))
+        meta = dict(
+            kind="hist_gradient_boosting",
+            baseline=float(np.ravel(model._baseline_prediction)[0]),
+            scale=1.0,
+            float32_inputs=False,
+        )
+    else:
+        raise NotImplementedError(f"{type(model).__name__} is not supported")
+    meta.update(n_features=int(model.n_features_in_), max_depth=int(max_depth))
+    return CompactEnsemble(arrays, meta)
@@ -1,16 +1,29 @@
 import React, { useEffect, useRef, useState } from "react";
 import L from "leaflet";
 
+// Rebuild one object per dam from the columnar listing; dictionary-encoded
+// columns hold their distinct values once plus one code per dam
+const fromColumns = ({ count, fields, columns }) => {
+  const dams = Array.from({ length: count }, () => ({}));
+  fields.forEach(field => {
+    const column = columns[field];
+    dams.forEach((dam, i) => {
+      dam[field] = Array.isArray(column) ? column[i] : column.values[column.codes[i]];
+    });
+  });
+  return dams;
+};
+
 const GujaratMap = () => {
   const mapContainer = useRef(null);
   const map = useRef(null);
   const [dams, setDams] = useState([]);
 
-  // Fetch dam data from backend CSV endpoint
+  // Fetch dam data from backend CSV endpoint (one array per field)
   useEffect(() => {
-    fetch("http://localhost:8000/api/dams_csv/")
+    fetch("http://localhost:8000/api/dams_csv/?format=columnar")
       .then(res => res.json())
-      .then(data => setDams(data))
+      .then(data => setDams(fromColumns(data)))
       .catch(() => setDams([]));
   }, []);
 
@@ -28,6 +41,14 @@ const GujaratMap = () => {
         '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors',
     }).addTo(map.current);
 
+    // Model suitability heatmap, pre-rendered by the backend (zoom 5-12)
+    L.tileLayer("http://localhost:8000/api/tiles/{z}/{x}/{y}", {
+      minZoom: 5,
+      maxNativeZoom: 12,
+      opacity: 0.7,
+      attribution: "Suitability: PlanetPulse models",
+    }).addTo(map.current);
+
     return () => {
       if (map.current) {
         map.current.remove();